@@ -0,0 +1,395 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+性能基准测试脚本
+
+生成确定性的合成图片语料（1/12/24/50/100 MP，JPEG/PNG/TIFF/BMP，L/RGB/RGBA/P/CMYK），
+分阶段计时处理流程，并将结果写入JSON文件，便于发布前与上一版本对比。
+
+用法:
+    python benchmark_watermark.py                       # 完整矩阵
+    python benchmark_watermark.py --sizes 1 12 --formats jpeg png
+    python benchmark_watermark.py --compare old.json    # 与之前的结果对比
+
+语料按参数确定性生成并缓存在 --corpus 目录中，再次运行时直接复用。
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import tempfile
+from datetime import datetime
+
+from PIL import Image, ImageDraw
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from PyQt6.QtCore import Qt, QT_VERSION_STR, PYQT_VERSION_STR
+from PyQt6.QtGui import QPainter
+from core.image_processor import ImageProcessor
+from core.watermark_renderer import (WatermarkRenderer, WatermarkSpec, DEFAULT_REFERENCE_BOX,
+                                     ensure_gui_application)
+from ui.preview_cache import decode_preview
+
+BENCHMARK_VERSION = 2
+
+# 语料参数
+SIZES_MP = [1, 12, 24, 50, 100]
+FORMATS = {"jpeg": ".jpg", "png": ".png", "tiff": ".tif", "bmp": ".bmp"}
+MODES = ["L", "RGB", "RGBA", "P", "CMYK"]
+# 各格式支持的模式
+FORMAT_MODES = {
+    "jpeg": {"L", "RGB", "CMYK"},
+    "png": {"L", "RGB", "RGBA", "P"},
+    "tiff": {"L", "RGB", "RGBA", "P", "CMYK"},
+    "bmp": {"L", "RGB", "RGBA", "P"},
+}
+ASPECT_RATIO = 3 / 2
+CORPUS_SEED = 20240501
+
+# 预览区域尺寸（默认窗口大小下的预览区域）
+PREVIEW_BOX = DEFAULT_REFERENCE_BOX
+# 缩放阶段使用的导出设置
+RESIZE_SETTINGS = {"size_mode": 1, "percent_scale": 50}
+# 保存阶段使用的导出设置
+SAVE_SETTINGS = {"format": "jpeg", "quality": 90, "size_mode": 0}
+
+STAGES = [
+    "load_image",        # ImageProcessor.load_image + 解码
+    "pil_to_pixmap",     # PIL -> QPixmap（预览路径）
+    "load_qimage",       # 导出路径的解码（可直接绘制的QImage）
+    "preview_scale",     # 整幅图片缩放到预览区域
+    "preview_decode",    # 按预览尺寸解码（draft + 缩放）
+    "draw_text",         # 文本水印绘制（每次清空精灵缓存，包含文字排版和描边阴影生成）
+    "draw_image",        # 图片水印绘制（每次清空素材缓存，包含水印图片加载和缩放）
+    "draw_text_warm",    # 文本水印绘制（精灵缓存命中，只有贴图）
+    "draw_image_warm",   # 图片水印绘制（素材缓存命中，只有贴图）
+    "resize",            # 按导出设置缩放
+    "save_jpeg",         # 按导出设置保存JPEG
+    "export_total",      # export_file 端到端
+]
+
+
+def image_size_for(megapixels):
+    """按 3:2 比例计算指定像素数的图片尺寸"""
+    width = round((megapixels * 1_000_000 * ASPECT_RATIO) ** 0.5)
+    return width, round(width / ASPECT_RATIO)
+
+
+def make_base_image(width, height, seed):
+    """
+    生成确定性的RGB底图：水平/垂直渐变加上由固定种子生成的纹理，
+    纹理使编码耗时接近真实照片，而不是纯色图片
+    """
+    rng = random.Random(seed)
+    tile_size = 256
+    noise = Image.frombytes("L", (tile_size, tile_size),
+                            bytes(rng.randrange(256) for _ in range(tile_size * tile_size)))
+    red = Image.linear_gradient("L").rotate(90).resize((width, height), Image.Resampling.BILINEAR)
+    green = Image.linear_gradient("L").resize((width, height), Image.Resampling.BILINEAR)
+    blue = noise.resize((width, height), Image.Resampling.BICUBIC)
+    image = Image.merge("RGB", (red, green, blue))
+
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        radius = rng.randrange(max(2, width // 40), max(3, width // 8))
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=color)
+    return image
+
+
+def convert_mode(image, mode):
+    """将RGB底图转换为目标模式（RGBA带有渐变透明度）"""
+    if mode == "RGBA":
+        alpha = Image.linear_gradient("L").resize(image.size, Image.Resampling.BILINEAR)
+        result = image.convert("RGBA")
+        result.putalpha(alpha.point(lambda value: 64 + value * 3 // 4))
+        return result
+    if mode == "P":
+        return image.quantize(colors=256, method=Image.Quantize.MEDIANCUT)
+    return image.convert(mode)
+
+
+def iter_corpus_specs(sizes, formats, modes):
+    """产出 (MP, 格式, 模式) 组合，跳过格式不支持的模式"""
+    for megapixels in sizes:
+        for format_name in formats:
+            for mode in modes:
+                if mode in FORMAT_MODES[format_name]:
+                    yield megapixels, format_name, mode
+
+
+def ensure_corpus(corpus_dir, sizes, formats, modes):
+    """
+    生成（或复用）语料
+
+    Returns:
+        list: [{path, megapixels, format, mode, width, height}, ...]
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    entries = []
+    base_images = {}
+    for megapixels, format_name, mode in iter_corpus_specs(sizes, formats, modes):
+        width, height = image_size_for(megapixels)
+        path = os.path.join(corpus_dir, f"{megapixels}mp_{mode}{FORMATS[format_name]}")
+        if not os.path.exists(path):
+            print(f"生成语料: {os.path.basename(path)} ({width}x{height})")
+            if megapixels not in base_images:
+                base_images.clear()  # 同一时间只保留一种尺寸的底图
+                base_images[megapixels] = make_base_image(width, height, CORPUS_SEED + megapixels)
+            image = convert_mode(base_images[megapixels], mode)
+            save_options = {"quality": 90} if format_name == "jpeg" else {}
+            temp_path = path + ".tmp"
+            image.save(temp_path, format_name.upper(), **save_options)
+            os.replace(temp_path, path)
+        entries.append({"path": path, "megapixels": megapixels, "format": format_name,
+                        "mode": mode, "width": width, "height": height})
+    return entries
+
+
+def make_logo(corpus_dir):
+    """生成确定性的图片水印素材"""
+    path = os.path.join(corpus_dir, "logo.png")
+    if not os.path.exists(path):
+        logo = Image.new("RGBA", (400, 200), (255, 255, 255, 0))
+        draw = ImageDraw.Draw(logo)
+        draw.rectangle([10, 10, 390, 190], fill=(255, 0, 0, 128), outline=(0, 0, 0, 255), width=6)
+        draw.ellipse([140, 40, 260, 160], fill=(255, 255, 255, 200))
+        logo.save(path)
+    return path
+
+
+def make_spec(logo_path):
+    """基准测试使用的水印参数（坐标以预览区域为基准，和实际导出一致）"""
+    return WatermarkSpec(
+        text="PhotoWatermark2 基准测试",
+        font_size=32,
+        font_bold=True,
+        text_color=(255, 255, 255, 255),
+        text_opacity=80,
+        text_position=(60, 80),
+        rotation=15,
+        shadow=True,
+        stroke=True,
+        image_enabled=True,
+        image_path=logo_path,
+        image_width=160,
+        image_height=80,
+        image_opacity=70,
+        image_position=(450, 260),
+        reference_box=PREVIEW_BOX,
+    )
+
+
+def time_call(func, repeat, setup=None):
+    """
+    多次执行并计时
+
+    first_ms 是第一次（冷缓存）的耗时；重复多次时 min/median/max 只统计之后的执行。
+    setup 在每次执行前调用，不计入耗时。
+
+    Returns:
+        tuple: (计时结果字典, 最后一次的返回值)
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        result = None  # 先释放上一次的结果，避免同时占用两份内存
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    warm = timings[1:] or timings
+    return {
+        "first_ms": round(timings[0], 3),
+        "min_ms": round(min(warm), 3),
+        "median_ms": round(statistics.median(warm), 3),
+        "max_ms": round(max(warm), 3),
+    }, result
+
+
+def benchmark_image(entry, spec, renderer, output_dir, repeat):
+    """对一张语料图片分阶段计时"""
+    path = entry["path"]
+    stages = {}
+
+    def load():
+        image = ImageProcessor.load_image(path)
+        image.load()
+        return image
+
+    stages["load_image"], pil_image = time_call(load, repeat)
+    stages["pil_to_pixmap"], _ = time_call(lambda: ImageProcessor.pil_to_pixmap(pil_image), repeat)
+    pil_image = None
+
+    stages["load_qimage"], image = time_call(lambda: ImageProcessor.load_qimage(path), repeat)
+    stages["preview_scale"], _ = time_call(lambda: image.scaled(
+        PREVIEW_BOX[0], PREVIEW_BOX[1],
+        Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation), repeat)
+    stages["preview_decode"], _ = time_call(lambda: decode_preview(path, *PREVIEW_BOX), repeat)
+
+    scale_x, scale_y = spec.scale_for(image.width(), image.height())
+
+    def draw(paint):
+        # 在同一幅图片上反复绘制，计时不包含复制图片
+        painter = QPainter(image)
+        paint(painter)
+        painter.end()
+
+    def draw_text():
+        draw(lambda painter: renderer.paint_text(painter, spec, scale_x, scale_y))
+
+    def draw_image():
+        draw(lambda painter: renderer.paint_image(painter, spec, image.width(), scale_x, scale_y))
+
+    # 渲染器在所有图片间共享，冷缓存阶段每次执行前清空缓存，否则只测到了缓存贴图
+    stages["draw_text"], _ = time_call(draw_text, repeat, renderer.text_sprites.clear)
+    stages["draw_image"], _ = time_call(draw_image, repeat, renderer.image_assets.clear)
+    stages["draw_text_warm"], _ = time_call(draw_text, repeat)
+    stages["draw_image_warm"], _ = time_call(draw_image, repeat)
+    stages["resize"], _ = time_call(lambda: renderer.resize_image(image, RESIZE_SETTINGS), repeat)
+
+    output_path = os.path.join(output_dir, "output.jpg")
+    stages["save_jpeg"], _ = time_call(
+        lambda: renderer.save_image(image, output_path, SAVE_SETTINGS), repeat)
+    image = None
+
+    stages["export_total"], success = time_call(
+        lambda: renderer.export_file(path, output_path, spec, SAVE_SETTINGS), repeat)
+
+    result = {key: entry[key] for key in ("format", "mode", "megapixels", "width", "height")}
+    result.update({
+        "file": os.path.basename(path),
+        "file_size": os.path.getsize(path),
+        "success": bool(success),
+        "stages": stages,
+    })
+    return result
+
+
+def environment_info():
+    """运行环境信息"""
+    import PIL
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "pillow": PIL.__version__,
+        "qt": QT_VERSION_STR,
+        "pyqt": PYQT_VERSION_STR,
+    }
+
+
+def compare_results(old_report, new_report, threshold):
+    """
+    按 (文件, 阶段) 对比两次结果的中位数，打印变慢超过阈值的阶段
+
+    Returns:
+        int: 变慢的阶段数
+    """
+    old_results = {result["file"]: result for result in old_report.get("results", [])}
+    regressions = 0
+    if old_report.get("benchmark_version") != new_report.get("benchmark_version"):
+        # 不同版本的同名阶段测量内容可能不同
+        print(f"\n与 {old_report.get('timestamp', '?')} 的结果版本不同，无法对比")
+        return regressions
+    print(f"\n与 {old_report.get('timestamp', '?')} 的结果对比（中位数，阈值 {threshold:.0%}）:")
+    for result in new_report["results"]:
+        old = old_results.get(result["file"])
+        if not old:
+            continue
+        if old.get("file_size") != result["file_size"]:
+            print(f"  跳过 {result['file']}: 两次测试的语料文件不同")
+            continue
+        for stage, timing in result["stages"].items():
+            old_timing = old["stages"].get(stage)
+            if not old_timing or old_timing["median_ms"] <= 0:
+                continue
+            ratio = timing["median_ms"] / old_timing["median_ms"]
+            if ratio > 1 + threshold:
+                regressions += 1
+                print(f"  变慢 {result['file']:<20} {stage:<15} "
+                      f"{old_timing['median_ms']:>10.1f} -> {timing['median_ms']:>10.1f} ms ({ratio:.2f}x)")
+    if not regressions:
+        print("  没有变慢的阶段")
+    return regressions
+
+
+def print_table(results):
+    """打印各阶段中位数耗时"""
+    header = f"{'文件':<20}" + "".join(f"{stage:>17}" for stage in STAGES)
+    print("\n各阶段耗时中位数 (ms):")
+    print(header)
+    for result in results:
+        row = f"{result['file']:<20}"
+        for stage in STAGES:
+            row += f"{result['stages'][stage]['median_ms']:>17.1f}"
+        print(row)
+
+
+def build_parser():
+    """创建命令行参数解析器"""
+    parser = argparse.ArgumentParser(description="PhotoWatermark2 性能基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES_MP, choices=SIZES_MP,
+                        help="图片尺寸（百万像素）")
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=list(FORMATS),
+                        help="文件格式")
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES, help="颜色模式")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="每个阶段的执行次数（第一次按冷缓存单独记录）")
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "photowatermark2_bench_corpus"),
+                        help="语料目录（已存在的文件直接复用）")
+    parser.add_argument("--output", default="benchmark_results.json", help="结果JSON文件路径")
+    parser.add_argument("--compare", help="与之前的结果JSON文件对比")
+    parser.add_argument("--threshold", type=float, default=0.10, help="对比时判定为变慢的比例")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    ensure_gui_application()
+
+    entries = ensure_corpus(args.corpus, args.sizes, args.formats, args.modes)
+    spec = make_spec(make_logo(args.corpus))
+    renderer = WatermarkRenderer()
+
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for index, entry in enumerate(entries, 1):
+            print(f"[{index}/{len(entries)}] {os.path.basename(entry['path'])}")
+            results.append(benchmark_image(entry, spec, renderer, output_dir, max(1, args.repeat)))
+
+    report = {
+        "benchmark_version": BENCHMARK_VERSION,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment_info(),
+        "repeat": max(1, args.repeat),
+        "corpus": {"seed": CORPUS_SEED, "directory": os.path.abspath(args.corpus)},
+        "stages": STAGES,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print_table(results)
+    print(f"\n结果已保存到 {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old_report = json.load(f)
+        return 1 if compare_results(old_report, report, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+命令行批量处理模块
+使用已保存的水印模板处理整个目录，不创建任何窗口部件
+
+用法:
+    python run.py batch --template NAME --in DIR --out DIR [--jobs N]
+
+处理结束后在标准输出的最后一行打印JSON格式的汇总结果。
+退出码: 0 全部成功，1 部分图片失败，2 参数或模板错误。
+"""
+
+import os
+import sys
+import json
+import argparse
+
+from core.image_processor import ImageProcessor
+from core.watermark_renderer import WatermarkSpec, DEFAULT_REFERENCE_BOX
+from core.batch_exporter import BatchExporter
+from core.export_manifest import ExportManifest
+from ui.template_manager import TemplateManager, DEFAULT_TEMPLATES_FILE
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def _parse_size(value):
+    """解析 "宽x高" 格式的尺寸"""
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的尺寸: {value}，格式应为 宽x高")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"无效的尺寸: {value}")
+    return (width, height)
+
+
+def build_parser():
+    """创建命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog="run.py", description="PhotoWatermark2 命令行工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch = subparsers.add_parser("batch", help="使用水印模板批量处理目录中的图片")
+    batch.add_argument("--template", required=True, help="水印模板名称")
+    batch.add_argument("--in", dest="input_dir", required=True, help="输入目录（包含子目录）")
+    batch.add_argument("--out", dest="output_dir", required=True, help="输出目录，保持输入目录结构")
+    batch.add_argument("--jobs", type=int, default=None, help="工作进程数，默认使用全部CPU核心")
+    batch.add_argument("--templates-file", default=DEFAULT_TEMPLATES_FILE,
+                       help="模板文件路径（扩展名为 .db/.sqlite 时使用SQLite模板库）")
+    batch.add_argument("--format", choices=["keep", "jpeg", "png"], default="keep",
+                       help="输出格式，keep表示保持原格式")
+    batch.add_argument("--quality", type=int, default=95, help="JPEG质量 (1-100)")
+    batch.add_argument("--suffix", default="", help="输出文件名后缀")
+    batch.add_argument("--region-only", action="store_true",
+                       help="JPEG原图只重新编码水印区域，其余部分无损复制（需要 jpegtran）")
+    batch.add_argument("--force", action="store_true",
+                       help="忽略输出目录中的导出清单，重新导出全部图片")
+    batch.add_argument("--memory-report", action="store_true",
+                       help="在汇总结果中报告各阶段（解码、缩放、绘制、编码）的峰值内存")
+    batch.add_argument("--reference-box", type=_parse_size, default=DEFAULT_REFERENCE_BOX,
+                       help="模板坐标所基于的预览区域尺寸，格式为 宽x高")
+    return parser
+
+
+def collect_jobs(input_dir, output_dir, output_format="keep", suffix=""):
+    """
+    遍历输入目录，生成 (源图片路径, 输出路径) 列表
+
+    Returns:
+        list: 按路径排序的任务列表
+    """
+    extension = {"jpeg": ".jpg", "png": ".png"}.get(output_format)
+    output_real = os.path.normcase(os.path.realpath(output_dir))
+    jobs = []
+    for root, dirs, files in os.walk(input_dir):
+        # 输出目录位于输入目录中时不遍历，避免再次处理之前的输出
+        dirs[:] = sorted(d for d in dirs
+                         if os.path.normcase(os.path.realpath(os.path.join(root, d))) != output_real)
+        relative_dir = os.path.relpath(root, input_dir)
+        for file_name in sorted(files):
+            if not ImageProcessor.is_supported_format(file_name):
+                continue
+            name, ext = os.path.splitext(file_name)
+            output_name = f"{name}{suffix}{extension or ext}"
+            jobs.append((os.path.join(root, file_name),
+                         os.path.normpath(os.path.join(output_dir, relative_dir, output_name))))
+    return jobs
+
+
+def run_batch(args):
+    """
+    执行批量处理
+
+    Returns:
+        tuple: (退出码, 汇总结果字典)
+    """
+    template = TemplateManager(args.templates_file).load_template(args.template)
+    if template is None:
+        return EXIT_USAGE, {"error": f"模板不存在: {args.template}"}
+    if not os.path.isdir(args.input_dir):
+        return EXIT_USAGE, {"error": f"输入目录不存在: {args.input_dir}"}
+
+    input_dir = os.path.abspath(args.input_dir)
+    output_dir = os.path.abspath(args.output_dir)
+    jobs = collect_jobs(input_dir, output_dir, args.format, args.suffix)
+
+    # 避免覆盖原图
+    if any(os.path.normcase(src) == os.path.normcase(dst) for src, dst in jobs):
+        return EXIT_USAGE, {"error": "输出文件会覆盖原图，请指定其他输出目录或使用 --suffix"}
+
+    spec = WatermarkSpec.from_template(template, reference_box=args.reference_box)
+    # 保持原格式时不指定format，按每个输出文件的扩展名保存，JPEG输出同样使用 --quality
+    export_settings = {"quality": args.quality, "size_mode": 0}
+    if args.format != "keep":
+        export_settings["format"] = args.format
+    if args.region_only:
+        # 非JPEG图片按常规方式导出
+        export_settings["jpeg_region_only"] = True
+
+    for output_path in {os.path.dirname(dst) for _, dst in jobs}:
+        os.makedirs(output_path, exist_ok=True)
+
+    exporter = BatchExporter(args.jobs)
+
+    # 原图和设置都没有变化的图片直接跳过（--force 时全部重新导出，但仍然更新清单）
+    manifest = ExportManifest.load(output_dir)
+
+    failures = []
+    for result in exporter.export(jobs, spec, export_settings, args.memory_report, manifest,
+                                  args.force):
+        if not result["success"]:
+            failures.append({"image_path": result["image_path"], "error": result["error"]})
+            print(f"导出失败: {result['image_path']} ({result['error']})", file=sys.stderr)
+
+    summary = dict(exporter.summary or {})
+    summary.update({
+        "template": args.template,
+        "input": input_dir,
+        "output": output_dir,
+        "failures": failures
+    })
+    return (EXIT_FAILED if failures else EXIT_OK), summary
+
+
+def main(argv=None):
+    """命令行入口，返回退出码"""
+    args = build_parser().parse_args(argv)
+    if args.command == "batch":
+        exit_code, summary = run_batch(args)
+        print(json.dumps(summary, ensure_ascii=False))
+        return exit_code
+    return EXIT_USAGE
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量导出模块
+使用进程池并行渲染和保存带水印的图片，逐个返回结果
+"""
+
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from core.watermark_renderer import WatermarkRenderer, ensure_gui_application
+from core.stage_metrics import StageMemory, StageTimer, timings
+from core.export_manifest import input_fingerprint, settings_fingerprint
+
+# 每个工作进程同时排队的任务数，避免一次性提交全部任务占用大量内存
+_TASKS_PER_WORKER = 4
+
+# 增量导出时每完成这么多张图片保存一次清单，中途退出也能保留进度
+_MANIFEST_SAVE_INTERVAL = 1000
+
+# 工作进程内复用的渲染器
+_worker_renderer = None
+
+
+def _init_worker():
+    """工作进程初始化：创建无界面的Qt应用和渲染器"""
+    global _worker_renderer
+    ensure_gui_application()
+    _worker_renderer = WatermarkRenderer()
+
+
+def _export_one(image_path, output_path, spec, export_settings, measure_memory=False,
+                with_fingerprint=False):
+    """
+    导出单张图片（在工作进程中执行）
+
+    Returns:
+        dict: 单张图片的导出结果，包含各阶段耗时 timings；measure_memory为True时包含各阶段峰值内存 memory，
+            with_fingerprint为True时包含导出前计算的原图指纹 fingerprint
+    """
+    start = time.perf_counter()
+    renderer = _worker_renderer or WatermarkRenderer()
+    timer = StageTimer("export", image_path)
+    memory = StageMemory() if measure_memory else None
+    metrics = (timer, memory) if memory is not None else timer
+    fingerprint = None
+    try:
+        if with_fingerprint:
+            # 在渲染前计算，导出过程中原图被修改时下次会重新导出
+            fingerprint = input_fingerprint(image_path)
+        success = renderer.export_file(image_path, output_path, spec, export_settings, metrics)
+        error = None if success else "导出失败"
+    except Exception as e:
+        success = False
+        error = str(e)
+
+    result = {
+        "image_path": image_path,
+        "output_path": output_path,
+        "success": success,
+        "error": error,
+        "elapsed": time.perf_counter() - start,
+        "timings": timer.to_dict()
+    }
+    if memory is not None:
+        result["memory"] = memory.report()
+    if fingerprint is not None:
+        result["fingerprint"] = fingerprint
+    return result
+
+
+class BatchExporter:
+    """批量导出类"""
+
+    def __init__(self, workers=None):
+        """
+        Args:
+            workers: 工作进程数，None表示使用全部CPU核心，1表示在当前进程中串行执行
+        """
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.summary = None
+
+    def export(self, jobs, spec, export_settings=None, measure_memory=False, manifest=None,
+               force=False):
+        """
+        批量导出图片，按完成顺序逐个产出结果
+
+        Args:
+            jobs: (源图片路径, 输出路径) 列表
+            spec: WatermarkSpec 水印参数
+            export_settings: 导出设置字典
+            measure_memory: 是否统计各阶段峰值内存（汇总中为各阶段的最大值）
+            manifest: 可选的 ExportManifest，原图和设置都没有变化的图片直接跳过，
+                结束（或中途停止）时保存清单
+            force: 为True时不跳过任何图片，但仍把导出结果记录到清单中
+
+        Yields:
+            dict: 单张图片的导出结果（image_path, output_path, success, error, elapsed），
+                被跳过的图片 skipped 为True，最先产出
+        """
+        start = time.perf_counter()
+        jobs = list(jobs)
+        total = len(jobs)
+        skipped = []
+        settings_hash = None
+        if manifest is not None:
+            settings_hash = settings_fingerprint(spec, export_settings)
+            if not force:
+                jobs, skipped = manifest.partition(jobs, settings_hash)
+
+        workers = min(self.workers, len(jobs)) or 1
+        success_count = 0
+        peak_memory = {}
+        with_fingerprint = manifest is not None
+
+        for src, dst in skipped:
+            yield {"image_path": src, "output_path": dst, "success": True, "skipped": True,
+                   "error": None, "elapsed": 0.0}
+
+        if workers == 1:
+            if jobs:
+                # 在当前进程中串行导出，需要Qt应用（图形界面中已存在时不会重复创建）
+                ensure_gui_application()
+            results = (_export_one(src, dst, spec, export_settings, measure_memory, with_fingerprint)
+                       for src, dst in jobs)
+        else:
+            results = self._export_parallel(jobs, spec, export_settings, workers, measure_memory,
+                                            with_fingerprint)
+
+        try:
+            for index, result in enumerate(results, 1):
+                if result["success"]:
+                    success_count += 1
+                else:
+                    timings.count("export_failed")
+                if "timings" in result:
+                    # 工作进程中的耗时汇总到当前进程
+                    timings.record_dict(result["timings"])
+                for stage, values in result.get("memory", {}).items():
+                    merged = peak_memory.setdefault(stage, {"peak_mb": 0.0, "delta_mb": 0.0})
+                    merged["peak_mb"] = max(merged["peak_mb"], values["peak_mb"])
+                    merged["delta_mb"] = max(merged["delta_mb"], values["delta_mb"])
+
+                if manifest is not None:
+                    fingerprint = result.pop("fingerprint", None)
+                    if result["success"] and fingerprint:
+                        manifest.record(result["image_path"], result["output_path"], settings_hash,
+                                        fingerprint)
+                    else:
+                        manifest.discard(result["output_path"])
+                    if index % _MANIFEST_SAVE_INTERVAL == 0:
+                        manifest.save()
+                yield result
+        finally:
+            if manifest is not None:
+                manifest.save()
+
+        elapsed = time.perf_counter() - start
+        self.summary = {
+            "total": total,
+            "success": success_count,
+            "skipped": len(skipped),
+            "failed": len(jobs) - success_count,
+            "workers": workers,
+            "elapsed": round(elapsed, 3),
+            "images_per_second": round(len(jobs) / elapsed, 2) if elapsed > 0 else 0.0
+        }
+        if measure_memory:
+            # 每个工作进程单独统计，这里是单个进程内各阶段的最大峰值
+            self.summary["peak_memory_mb"] = peak_memory
+
+    def _export_parallel(self, jobs, spec, export_settings, workers, measure_memory=False,
+                         with_fingerprint=False):
+        """使用进程池导出，限制排队任务数量"""
+        # 使用spawn方式启动进程，避免复制GUI进程中的Qt状态
+        context = multiprocessing.get_context("spawn")
+        max_pending = workers * _TASKS_PER_WORKER
+        job_iter = iter(jobs)
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker) as pool:
+            pending = {}
+
+            def submit_next():
+                for src, dst in job_iter:
+                    future = pool.submit(_export_one, src, dst, spec, export_settings, measure_memory,
+                                         with_fingerprint)
+                    pending[future] = (src, dst)
+                    if len(pending) >= max_pending:
+                        return
+
+            submit_next()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    src, dst = pending.pop(future)
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        # 工作进程异常退出等情况
+                        yield {"image_path": src, "output_path": dst, "success": False,
+                               "error": str(e), "elapsed": 0.0}
+                submit_next()
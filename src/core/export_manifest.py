@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+导出清单模块
+在输出目录中记录每个输出文件对应的原图指纹和渲染设置指纹，
+再次导出同一批图片时跳过原图和设置都没有变化的文件
+"""
+
+import os
+import json
+import hashlib
+import dataclasses
+
+from core.file_utils import atomic_write_json
+
+# 清单文件名（位于输出目录中）
+MANIFEST_NAME = ".photowatermark_manifest.json"
+MANIFEST_VERSION = 1
+
+# 计算内容摘要时每次读取的字节数
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(file_path):
+    """计算文件内容的SHA-256摘要"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(DIGEST_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def input_fingerprint(file_path):
+    """
+    计算原图指纹（可在工作进程中调用）
+
+    Returns:
+        dict: {size, mtime_ns, digest}
+    """
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": file_digest(file_path)}
+
+
+def settings_fingerprint(spec, export_settings=None):
+    """
+    计算渲染设置指纹：水印参数、导出设置，以及图片水印文件的大小和修改时间
+
+    Returns:
+        str: 设置摘要
+    """
+    data = {
+        "spec": dataclasses.asdict(spec),
+        "export_settings": export_settings or {}
+    }
+    if spec.image_enabled and spec.image_path:
+        try:
+            stat = os.stat(spec.image_path)
+            data["watermark_image"] = [stat.st_size, stat.st_mtime_ns]
+        except OSError:
+            data["watermark_image"] = None
+    encoded = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ExportManifest:
+    """
+    输出目录的导出清单
+
+    以输出文件相对输出目录的路径为键，记录原图路径、原图指纹、设置指纹和输出文件大小。
+    判断是否需要重新导出时先比较原图的大小和修改时间，一致则直接跳过，不读取文件内容；
+    不一致时再比较内容摘要（例如只是被复制或touch过的文件）。
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = os.path.abspath(output_dir)
+        self.path = os.path.join(self.output_dir, MANIFEST_NAME)
+        self.entries = {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, output_dir):
+        """读取输出目录中的清单，不存在或无法解析时返回空清单"""
+        manifest = cls(output_dir)
+        try:
+            with open(manifest.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                manifest.entries = data.get("entries", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"读取导出清单失败: {e}")
+        return manifest
+
+    def _key(self, output_path):
+        return os.path.relpath(os.path.abspath(output_path), self.output_dir).replace(os.sep, "/")
+
+    def is_up_to_date(self, input_path, output_path, settings_hash):
+        """
+        输出文件是否已是最新（原图、设置都没有变化，且输出文件仍然存在）
+
+        Returns:
+            bool: True表示可以跳过
+        """
+        entry = self.entries.get(self._key(output_path))
+        if not entry or entry.get("settings") != settings_hash:
+            return False
+        if entry.get("input") != os.path.abspath(input_path):
+            return False
+
+        try:
+            if os.stat(output_path).st_size != entry.get("output_size"):
+                return False
+            stat = os.stat(input_path)
+        except OSError:
+            return False
+
+        if stat.st_size == entry.get("size") and stat.st_mtime_ns == entry.get("mtime_ns"):
+            return True
+        if stat.st_size != entry.get("size"):
+            return False
+
+        # 大小相同但修改时间不同，比较内容
+        try:
+            if file_digest(input_path) != entry.get("digest"):
+                return False
+        except OSError:
+            return False
+        entry["mtime_ns"] = stat.st_mtime_ns
+        self._dirty = True
+        return True
+
+    def partition(self, jobs, settings_hash):
+        """
+        将任务分为需要导出和可以跳过的两部分
+
+        Returns:
+            tuple: (需要导出的任务列表, 跳过的任务列表)
+        """
+        pending = []
+        skipped = []
+        for input_path, output_path in jobs:
+            if self.is_up_to_date(input_path, output_path, settings_hash):
+                skipped.append((input_path, output_path))
+            else:
+                pending.append((input_path, output_path))
+        return pending, skipped
+
+    def record(self, input_path, output_path, settings_hash, fingerprint):
+        """记录一次成功的导出"""
+        try:
+            output_size = os.stat(output_path).st_size
+        except OSError:
+            return
+        entry = {"input": os.path.abspath(input_path), "settings": settings_hash,
+                 "output_size": output_size}
+        entry.update(fingerprint)
+        self.entries[self._key(output_path)] = entry
+        self._dirty = True
+
+    def discard(self, output_path):
+        """移除输出文件的记录（导出失败时调用）"""
+        if self.entries.pop(self._key(output_path), None) is not None:
+            self._dirty = True
+
+    def save(self):
+        """原子地写回清单文件（没有变化时不写）"""
+        if not self._dirty:
+            return True
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            atomic_write_json(self.path, {"version": MANIFEST_VERSION, "entries": self.entries}, indent=None)
+            self._dirty = False
+            return True
+        except OSError as e:
+            print(f"保存导出清单失败: {e}")
+            return False
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+文件写入工具模块
+"""
+
+import os
+import json
+
+
+def atomic_write_json(file_path, data, indent=2):
+    """
+    原子地写入JSON文件：先写同目录下的临时文件并刷新到磁盘再替换，写入中途失败或断电不会损坏原文件
+
+    Args:
+        file_path: 目标文件路径
+        data: 要写入的数据
+        indent: 缩进，None表示写成紧凑的单行
+    """
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -6,10 +6,16 @@
 """
 
 import os
+import math
+import itertools
+import threading
+from collections import OrderedDict
 from PIL import Image, UnidentifiedImageError
 from PyQt6.QtGui import QPixmap, QImage
 from PyQt6.QtCore import Qt
 
+from core.stage_metrics import measure
+
 # 支持的图片格式
 SUPPORTED_FORMATS = {
     # 必需格式
@@ -22,10 +28,42 @@ SUPPORTED_FORMATS = {
     '.tif': 'TIFF'
 }
 
+# 图片信息缓存的最大条目数
+INFO_CACHE_SIZE = 100000
+
+# EXIF方向标签
+EXIF_ORIENTATION_TAG = 0x0112
+
+# 可以直接映射为QImage格式的PIL模式 {模式: (QImage格式, 每像素字节数)}
+PIL_QIMAGE_FORMATS = {
+    "L": (QImage.Format.Format_Grayscale8, 1),
+    "RGB": (QImage.Format.Format_RGB888, 3),
+    "RGBX": (QImage.Format.Format_RGBX8888, 4),
+    "RGBA": (QImage.Format.Format_RGBA8888, 4),
+}
+
+# 加载为可绘制QImage时每次复制的像素块大小（字节）
+COPY_BAND_BYTES = 4 * 1024 * 1024
+
+# 被QImage直接引用的像素缓冲区 {编号: 像素数据}
+_shared_buffers = {}
+_shared_buffers_lock = threading.Lock()
+_buffer_keys = itertools.count()
+
+
+def _release_shared_buffer(buffer_key):
+    """Qt释放最后一个引用缓冲区的QImage时回调"""
+    with _shared_buffers_lock:
+        _shared_buffers.pop(buffer_key, None)
+
 
 class ImageProcessor:
     """图片处理类"""
     
+    # 图片信息缓存 {文件路径: ((文件大小, 修改时间ns), 信息字典)}
+    _info_cache = OrderedDict()
+    _info_cache_lock = threading.Lock()
+    
     @staticmethod
     def is_supported_format(file_path):
         """
@@ -57,6 +95,143 @@ class ImageProcessor:
             print(f"加载图片失败: {e}")
             return None
     
+    @staticmethod
+    def load_qimage(file_path, metrics=None):
+        """
+        加载图片为可以直接绘制的QImage（用于导出）
+
+        PIL解码结果按行分块复制到Qt分配的像素内存中，复制完成后立即释放，
+        过程中最多同时存在两份整幅像素数据（PIL解码结果和QImage），
+        不再产生 tobytes 整图副本和绘制前的格式转换副本。
+        RGBA图片原地转换为预乘格式，其他模式按RGB处理（与 pil_to_qimage 一致）。
+
+        Args:
+            file_path: 图片文件路径
+            metrics: 可选的阶段记录器，记录 decode（解码）和 convert（转换复制）两个阶段
+
+        Returns:
+            QImage: RGBX8888或RGBA8888_Premultiplied格式的图片，加载失败时返回空QImage
+        """
+        try:
+            with measure(metrics, "decode"):
+                pil_image = ImageProcessor.load_image(file_path)
+                if pil_image is None:
+                    return QImage()
+                pil_image.load()
+        except Exception as e:
+            print(f"加载图片失败: {e}")
+            return QImage()
+
+        try:
+            with measure(metrics, "convert"):
+                return ImageProcessor._copy_to_qimage(pil_image)
+        except Exception as e:
+            print(f"加载图片失败: {e}")
+            return QImage()
+        finally:
+            pil_image.close()
+
+    @staticmethod
+    def _copy_to_qimage(pil_image):
+        """将已解码的PIL图片分块复制到新分配的QImage中"""
+        width, height = pil_image.size
+        has_alpha = pil_image.mode == "RGBA"
+        raw_mode = "RGBA" if has_alpha else "RGBX"
+        image = QImage(width, height,
+                       QImage.Format.Format_RGBA8888 if has_alpha else QImage.Format.Format_RGBX8888)
+        if image.isNull():
+            raise MemoryError(f"无法分配 {width}x{height} 的图片内存")
+
+        bytes_per_line = image.bytesPerLine()
+        bits = image.bits()
+        bits.setsize(image.sizeInBytes())
+        pixels = memoryview(bits)
+        band_rows = max(1, COPY_BAND_BYTES // bytes_per_line)
+        for top in range(0, height, band_rows):
+            band = pil_image.crop((0, top, width, min(height, top + band_rows)))
+            if band.mode not in ("RGB", "RGBA"):
+                band = band.convert("RGB")
+            data = band.tobytes("raw", raw_mode)
+            offset = top * bytes_per_line
+            pixels[offset:offset + len(data)] = data
+        pixels.release()
+
+        if has_alpha:
+            # 同样每像素4字节，原地转换
+            image.convertTo(QImage.Format.Format_RGBA8888_Premultiplied)
+        return image
+
+    @staticmethod
+    def load_image_for_size(file_path, max_width, max_height=None):
+        """
+        按目标尺寸加载图片（用于缩略图和预览）
+        
+        JPEG图片使用DCT缩放（draft模式）直接以1/2、1/4或1/8比例解码，
+        自动选择不小于目标尺寸的最小解码比例，跳过大部分解码计算和内存。
+        其他格式按原尺寸加载。
+        
+        Args:
+            file_path: 图片文件路径
+            max_width: 目标最大宽度
+            max_height: 目标最大高度，默认与宽度相同
+            
+        Returns:
+            PIL.Image: 加载的图片对象，尺寸不小于保持宽高比缩放到目标区域后的尺寸
+        """
+        image = ImageProcessor.load_image(file_path)
+        if image is None or image.format != 'JPEG':
+            return image
+        
+        if max_height is None:
+            max_height = max_width
+        
+        # 保持宽高比缩放到目标区域所需的尺寸
+        scale = min(max_width / image.width, max_height / image.height)
+        if scale < 1:
+            requested_size = (max(1, math.ceil(image.width * scale)),
+                              max(1, math.ceil(image.height * scale)))
+            try:
+                image.draft(image.mode, requested_size)
+            except Exception as e:
+                print(f"设置缩小解码失败: {e}")
+        
+        return image
+    
+    @staticmethod
+    def pil_to_qimage(pil_image):
+        """
+        将PIL图片转换为QImage
+        
+        L、RGB、RGBX、RGBA模式使用对应的原生QImage格式，QImage直接引用PIL导出的像素数据，
+        不再做格式转换和额外复制；其他模式先转换为RGB。
+        QImage可以在非GUI线程和无界面环境中使用。
+        
+        Args:
+            pil_image: PIL图片对象
+            
+        Returns:
+            QImage: 转换后的QImage对象
+        """
+        if pil_image is None:
+            return QImage()
+        
+        if pil_image.mode not in PIL_QIMAGE_FORMATS:
+            # 其他模式统一转换为RGB
+            pil_image = pil_image.convert("RGB")
+        
+        image_format, bytes_per_pixel = PIL_QIMAGE_FORMATS[pil_image.mode]
+        width, height = pil_image.size
+        
+        # Pillow内部按行分块存储，tobytes是导出连续像素数据的唯一一次复制
+        img_data = pil_image.tobytes("raw", pil_image.mode)
+        
+        # 缓冲区登记到共享表中，直到引用它的最后一个QImage（包括隐式共享的副本）被释放
+        buffer_key = next(_buffer_keys)
+        with _shared_buffers_lock:
+            _shared_buffers[buffer_key] = img_data
+        return QImage(img_data, width, height, width * bytes_per_pixel, image_format,
+                      _release_shared_buffer, buffer_key)
+    
     @staticmethod
     def pil_to_pixmap(pil_image):
         """
@@ -71,20 +246,48 @@ class ImageProcessor:
         if pil_image is None:
             return QPixmap()
             
-        # 使用更高效的方式转换PIL图片为QImage
-        if pil_image.mode == "RGBA":
-            # 直接转换RGBA图像
-            img_data = pil_image.tobytes("raw", "RGBA")
-            img = QImage(img_data, pil_image.size[0], pil_image.size[1], 
-                        pil_image.size[0] * 4, QImage.Format.Format_RGBA8888)
-        else:
-            # 其他模式统一转换为RGB
-            pil_image = pil_image.convert("RGB")
-            img_data = pil_image.tobytes("raw", "RGB")
-            img = QImage(img_data, pil_image.size[0], pil_image.size[1], 
-                        pil_image.size[0] * 3, QImage.Format.Format_RGB888)
+        return QPixmap.fromImage(ImageProcessor.pil_to_qimage(pil_image))
+    
+    @staticmethod
+    def qimage_to_pil(image):
+        """
+        将QImage（或QPixmap）转换为PIL图片，不经过PNG等中间编码
+        
+        RGBA8888、RGBX8888和Grayscale8格式直接共享QImage的像素内存，
+        其他格式先由Qt转换一次。返回的PIL图片持有QImage的引用，共享内存在其存活期间有效。
+        
+        Args:
+            image: QImage或QPixmap对象
             
-        return QPixmap.fromImage(img)
+        Returns:
+            PIL.Image: 转换后的PIL图片对象（RGBA、RGBX或L模式，只读）
+        """
+        if isinstance(image, QPixmap):
+            image = image.toImage()
+        if image.isNull():
+            return None
+        
+        image_format = image.format()
+        if image_format == QImage.Format.Format_Grayscale8:
+            mode = "L"
+        elif image_format == QImage.Format.Format_RGBA8888:
+            mode = "RGBA"
+        elif image_format == QImage.Format.Format_RGBX8888:
+            mode = "RGBX"
+        elif image.hasAlphaChannel():
+            image = image.convertToFormat(QImage.Format.Format_RGBA8888)
+            mode = "RGBA"
+        else:
+            image = image.convertToFormat(QImage.Format.Format_RGBX8888)
+            mode = "RGBX"
+        
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        pil_image = Image.frombuffer(mode, (image.width(), image.height()), bits,
+                                     "raw", mode, image.bytesPerLine(), 1)
+        # 保持QImage存活，避免共享的像素内存被释放
+        pil_image.qimage = image
+        return pil_image
     
     @staticmethod
     def create_thumbnail(pixmap, max_size=100):
@@ -92,11 +295,11 @@ class ImageProcessor:
         创建缩略图
         
         Args:
-            pixmap: 原始QPixmap对象
+            pixmap: 原始QPixmap或QImage对象（工作线程中使用QImage）
             max_size: 缩略图最大尺寸
             
         Returns:
-            QPixmap: 缩略图QPixmap对象
+            QPixmap或QImage: 与输入类型相同的缩略图
         """
         # 使用FastTransformation代替SmoothTransformation以提高性能
         # 对于缩略图，牺牲一点质量换取速度是值得的
@@ -109,6 +312,9 @@ class ImageProcessor:
         """
         获取图片信息
         
+        只读取文件头（尺寸、格式、模式、EXIF方向），不解码像素。
+        结果按 (路径, 文件大小, 修改时间) 缓存，文件未变化时不再打开文件。
+        
         Args:
             file_path: 图片文件路径
             
@@ -116,19 +322,66 @@ class ImageProcessor:
             dict: 包含图片信息的字典
         """
         try:
-            img = Image.open(file_path)
-            file_name = os.path.basename(file_path)
-            file_size = os.path.getsize(file_path) / 1024  # KB
-            
-            return {
-                "file_name": file_name,
-                "file_path": file_path,
-                "width": img.width,
-                "height": img.height,
-                "format": img.format,
-                "mode": img.mode,
-                "size_kb": round(file_size, 2)
-            }
+            stat = os.stat(file_path)
+        except OSError as e:
+            print(f"获取图片信息失败: {e}")
+            return None
+        
+        stat_key = (stat.st_size, stat.st_mtime_ns)
+        cache = ImageProcessor._info_cache
+        with ImageProcessor._info_cache_lock:
+            cached = cache.get(file_path)
+            if cached is not None and cached[0] == stat_key:
+                cache.move_to_end(file_path)
+                return dict(cached[1])
+        
+        try:
+            with Image.open(file_path) as img:
+                info = {
+                    "file_name": os.path.basename(file_path),
+                    "file_path": file_path,
+                    "width": img.width,
+                    "height": img.height,
+                    "format": img.format,
+                    "mode": img.mode,
+                    "orientation": ImageProcessor._read_orientation(img),
+                    "size_bytes": stat.st_size,
+                    "size_kb": round(stat.st_size / 1024, 2)
+                }
         except Exception as e:
             print(f"获取图片信息失败: {e}")
-            return None
\ No newline at end of file
+            return None
+        
+        with ImageProcessor._info_cache_lock:
+            cache[file_path] = (stat_key, info)
+            cache.move_to_end(file_path)
+            while len(cache) > INFO_CACHE_SIZE:
+                cache.popitem(last=False)
+        
+        return dict(info)
+    
+    @staticmethod
+    def clear_info_cache(file_paths=None):
+        """
+        清除图片信息缓存
+
+        Args:
+            file_paths: 要移除的图片路径列表，None表示清空全部
+        """
+        with ImageProcessor._info_cache_lock:
+            if file_paths is None:
+                ImageProcessor._info_cache.clear()
+                return
+            for file_path in file_paths:
+                ImageProcessor._info_cache.pop(file_path, None)
+    
+    @staticmethod
+    def _read_orientation(img):
+        """从文件头读取EXIF方向，没有时返回1"""
+        # PNG的EXIF可能位于图像数据之后，读取它需要解码整张图片
+        if img.format == 'PNG' and 'exif' not in img.info:
+            return 1
+        try:
+            return int(img.getexif().get(EXIF_ORIENTATION_TAG, 1) or 1)
+        except Exception:
+            return 1
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+JPEG局部重编码模块
+借助 jpegtran 的无损裁剪（-crop）和嵌入（-drop），只解码、重新编码与水印相交的MCU块，
+其余DCT系数原样复制，水印以外的区域与原图完全一致
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from functools import lru_cache
+
+from PIL import Image, JpegImagePlugin
+
+# 单次调用 jpegtran 的超时时间（秒）
+JPEGTRAN_TIMEOUT = 120
+
+
+class JpegRegionWriter:
+    """JPEG局部重编码类"""
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def find_jpegtran():
+        """
+        查找支持 -drop 的 jpegtran（libjpeg-turbo 2.1+ 或 IJG libjpeg 9+）
+
+        Returns:
+            str or None: jpegtran 路径，不可用时返回None
+        """
+        jpegtran = shutil.which("jpegtran")
+        if not jpegtran:
+            return None
+        try:
+            result = subprocess.run([jpegtran, "-help"], capture_output=True, text=True,
+                                    timeout=JPEGTRAN_TIMEOUT)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        usage = result.stdout + result.stderr
+        if "-drop" not in usage or "-crop" not in usage:
+            return None
+        return jpegtran
+
+    @staticmethod
+    def is_available():
+        """当前环境是否支持局部重编码"""
+        return JpegRegionWriter.find_jpegtran() is not None
+
+    @staticmethod
+    def read_layout(image_path):
+        """
+        只读取文件头，获取局部重编码需要的JPEG参数
+
+        Returns:
+            dict or None: {size, mode, imcu, qtables, subsampling}，不是可处理的JPEG时返回None
+        """
+        try:
+            with Image.open(image_path) as image:
+                if image.format != "JPEG" or image.mode not in ("RGB", "L"):
+                    return None
+                # iMCU尺寸 = 8 x 最大采样因子
+                max_h = max(component[1] for component in image.layer)
+                max_v = max(component[2] for component in image.layer)
+                subsampling = JpegImagePlugin.get_sampling(image) if image.mode == "RGB" else 0
+                if subsampling == -1:
+                    return None
+                return {
+                    "size": image.size,
+                    "mode": image.mode,
+                    "imcu": (8 * max_h, 8 * max_v),
+                    "qtables": image.quantization,
+                    "subsampling": subsampling
+                }
+        except Exception as e:
+            print(f"读取JPEG参数失败: {e}")
+            return None
+
+    @staticmethod
+    def align_region(x, y, width, height, imcu, image_size):
+        """
+        将区域向外扩展到iMCU边界（右侧和底部不超过图片边缘）
+
+        Returns:
+            tuple: (x, y, 宽, 高)
+        """
+        block_w, block_h = imcu
+        image_w, image_h = image_size
+        left = max(0, x) // block_w * block_w
+        top = max(0, y) // block_h * block_h
+        right = min(image_w, -(-(x + width) // block_w) * block_w)
+        bottom = min(image_h, -(-(y + height) // block_h) * block_h)
+        return left, top, right - left, bottom - top
+
+    @staticmethod
+    def merge_regions(regions):
+        """合并相互重叠的区域，返回互不重叠的区域列表"""
+        merged = []
+        for region in regions:
+            x, y, width, height = region
+            changed = True
+            while changed:
+                changed = False
+                for other in merged:
+                    ox, oy, ow, oh = other
+                    if x < ox + ow and ox < x + width and y < oy + oh and oy < y + height:
+                        merged.remove(other)
+                        right = max(x + width, ox + ow)
+                        bottom = max(y + height, oy + oh)
+                        x, y = min(x, ox), min(y, oy)
+                        width, height = right - x, bottom - y
+                        changed = True
+                        break
+            merged.append((x, y, width, height))
+        return merged
+
+    @staticmethod
+    def apply(image_path, output_path, regions, layout, paint_region):
+        """
+        逐个区域无损裁剪、绘制并嵌入，生成输出文件
+
+        Args:
+            image_path: 原图路径
+            output_path: 输出路径（可以与原图相同）
+            regions: 已对齐iMCU且互不重叠的区域列表 [(x, y, 宽, 高), ...]
+            layout: read_layout 返回的JPEG参数
+            paint_region: 绘制函数 (区域图片PIL.Image, 区域) -> 绘制后的PIL.Image
+        """
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        with tempfile.TemporaryDirectory() as work_dir:
+            current = image_path
+            for index, region in enumerate(regions):
+                patch = paint_region(JpegRegionWriter._extract_region(current, region, work_dir), region)
+                result = os.path.join(work_dir, f"pass{index}.jpg")
+                JpegRegionWriter._drop_region(current, result, patch, region, layout, work_dir)
+                current = result
+
+            # 先写入输出目录中的临时文件再替换，允许覆盖原图
+            fd, temp_output = tempfile.mkstemp(suffix=".jpg", dir=output_dir)
+            os.close(fd)
+            try:
+                shutil.copyfile(current, temp_output)
+                os.replace(temp_output, output_path)
+            finally:
+                if os.path.exists(temp_output):
+                    os.remove(temp_output)
+
+    @staticmethod
+    def _extract_region(image_path, region, work_dir):
+        """无损裁剪出区域并解码（只解码区域内的块）"""
+        x, y, width, height = region
+        crop_path = os.path.join(work_dir, "region.jpg")
+        JpegRegionWriter._run_jpegtran(["-copy", "none", "-crop", f"{width}x{height}+{x}+{y}",
+                                        "-outfile", crop_path, image_path])
+        with Image.open(crop_path) as crop:
+            crop.load()
+            return crop.copy()
+
+    @staticmethod
+    def _drop_region(image_path, output_path, patch, region, layout, work_dir):
+        """用原图的量化表和采样方式编码区域图片，再无损嵌入"""
+        x, y, _, _ = region
+        patch_path = os.path.join(work_dir, "patch.jpg")
+        save_options = {"qtables": layout["qtables"]}
+        if layout["mode"] == "RGB":
+            save_options["subsampling"] = layout["subsampling"]
+        patch.convert(layout["mode"]).save(patch_path, "JPEG", **save_options)
+        JpegRegionWriter._run_jpegtran(["-copy", "all", "-drop", f"+{x}+{y}", patch_path,
+                                        "-outfile", output_path, image_path])
+
+    @staticmethod
+    def _run_jpegtran(arguments):
+        jpegtran = JpegRegionWriter.find_jpegtran()
+        if jpegtran is None:
+            raise RuntimeError("没有可用的 jpegtran")
+        result = subprocess.run([jpegtran] + arguments, capture_output=True, text=True,
+                                timeout=JPEGTRAN_TIMEOUT)
+        if result.returncode != 0:
+            raise RuntimeError(f"jpegtran 执行失败: {result.stderr.strip()}")
@@ -0,0 +1,412 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+阶段统计模块
+按处理阶段（解码、颜色转换、缩放、绘制、编码等）记录耗时和峰值内存
+
+耗时: StageTimer 记录一次操作内各阶段的耗时，TimingRegistry 汇总为计数器和直方图，
+可显示在状态栏中；设置环境变量 PHOTOWATERMARK_TIMINGS 后每次操作写入一行JSON。
+
+内存: Linux下读取 /proc/self/status 中的 VmRSS 和 VmHWM，并在每个阶段开始前
+向 /proc/self/clear_refs 写入 "5" 重置峰值，因此每个阶段得到的是该阶段内的真实峰值。
+其他平台不支持时各项数值为None。
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from bisect import bisect_left
+from contextlib import nullcontext
+from datetime import datetime
+
+PROC_STATUS = "/proc/self/status"
+PROC_CLEAR_REFS = "/proc/self/clear_refs"
+
+# 设置后把每次操作的各阶段耗时以JSON行写入该文件，值为 "1" 或 "-" 时写入标准错误
+TIMINGS_ENV = "PHOTOWATERMARK_TIMINGS"
+
+# 耗时直方图各桶的上限（毫秒），超过最后一个上限的记录计入溢出桶
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+# 状态栏中显示的阶段名称
+STAGE_LABELS = {
+    "decode": "解码",
+    "convert": "颜色转换",
+    "scale": "缩放",
+    "draw_text": "文本",
+    "draw_image": "图片",
+    "resize": "调整尺寸",
+    "encode": "编码",
+    "region": "局部重编码",
+}
+
+
+def read_rss():
+    """
+    读取当前和峰值常驻内存
+
+    Returns:
+        tuple: (当前RSS, 峰值RSS)，单位字节，不支持时为 (None, None)
+    """
+    current = peak = None
+    try:
+        with open(PROC_STATUS, "r") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    current = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    peak = int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None, None
+    return current, peak
+
+
+def reset_peak_rss():
+    """
+    将峰值RSS重置为当前RSS（需要Linux 4.0+）
+
+    Returns:
+        bool: 是否重置成功
+    """
+    try:
+        with open(PROC_CLEAR_REFS, "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class StageMemory:
+    """
+    分阶段峰值内存记录器
+
+    用法:
+        memory = StageMemory()
+        with memory.stage("decode"):
+            ...
+        memory.report()  # {"decode": {"peak_mb": ..., "delta_mb": ...}, ...}
+
+    同名阶段多次执行时保留最大值。
+    """
+
+    def __init__(self):
+        self.stages = {}  # {阶段名: (峰值RSS, 相对阶段开始时的增量)}
+        self.resettable = None
+
+    def stage(self, name):
+        """返回记录指定阶段的上下文管理器"""
+        return _MemoryStage(self, name)
+
+    def record(self, name, peak, delta):
+        """记录一个阶段的峰值"""
+        if peak is None:
+            return
+        old_peak, old_delta = self.stages.get(name, (0, 0))
+        self.stages[name] = (max(old_peak, peak), max(old_delta, delta))
+
+    def report(self):
+        """
+        Returns:
+            dict: {阶段名: {"peak_mb": 阶段内峰值RSS, "delta_mb": 相对阶段开始时增加的内存}}
+        """
+        return {
+            name: {"peak_mb": round(peak / 1048576, 1), "delta_mb": round(delta / 1048576, 1)}
+            for name, (peak, delta) in self.stages.items()
+        }
+
+
+class _MemoryStage:
+    """单个阶段的上下文管理器"""
+
+    def __init__(self, memory, name):
+        self.memory = memory
+        self.name = name
+        self.start_rss = None
+
+    def __enter__(self):
+        resettable = reset_peak_rss()
+        if self.memory.resettable is None:
+            self.memory.resettable = resettable
+        self.start_rss, _ = read_rss()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _, peak = read_rss()
+        if peak is not None and self.start_rss is not None:
+            self.memory.record(self.name, peak, max(0, peak - self.start_rss))
+        return False
+
+
+class StageTimer:
+    """
+    一次操作（一次预览刷新或一次导出）内各阶段的耗时
+
+    用法:
+        timer = StageTimer("export", file_path)
+        with timer.stage("decode"):
+            ...
+        timings.record(timer)
+
+    同名阶段多次执行时耗时累加。
+    """
+
+    def __init__(self, operation, file_path=None):
+        self.operation = operation
+        self.file_path = file_path
+        self.stages = {}  # {阶段名: 毫秒}
+        self.start = time.perf_counter()
+        self.total_ms = None
+
+    def stage(self, name):
+        """返回记录指定阶段耗时的上下文管理器"""
+        return _TimerStage(self, name)
+
+    def add(self, name, elapsed_ms):
+        self.stages[name] = self.stages.get(name, 0.0) + elapsed_ms
+
+    def finish(self):
+        """结束计时，返回总耗时（毫秒）"""
+        if self.total_ms is None:
+            self.total_ms = (time.perf_counter() - self.start) * 1000
+        return self.total_ms
+
+    def to_dict(self):
+        return {
+            "op": self.operation,
+            "file": self.file_path,
+            "total_ms": round(self.finish(), 3),
+            "stages": {name: round(value, 3) for name, value in self.stages.items()},
+        }
+
+
+class _TimerStage:
+    """单个阶段的计时上下文管理器"""
+
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timer.add(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class Histogram:
+    """固定分桶的耗时直方图（毫秒）"""
+
+    def __init__(self, bounds=HISTOGRAM_BOUNDS_MS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        """估算百分位数（返回所在桶的上限，溢出桶返回最大值）"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= target:
+                return float(self.bounds[index]) if index < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max, 3),
+            "buckets": dict(zip([str(bound) for bound in self.bounds] + ["inf"], self.buckets)),
+        }
+
+
+class TimingRegistry:
+    """
+    进程内的耗时汇总（线程安全）
+
+    按 "操作.阶段" 保存直方图，另有命名计数器（如缓存命中、失败次数）。
+    设置了 PHOTOWATERMARK_TIMINGS 环境变量时，每条记录写入一行JSON，进程退出时再写入一行汇总。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.last = {}  # {操作: 最近一次记录的字典}
+        self._sink = None
+        self._sink_checked = False
+
+    def count(self, name, amount=1):
+        """计数器加一"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record(self, timer):
+        """记录一次操作的各阶段耗时"""
+        record = timer.to_dict()
+        self.record_dict(record)
+        return record
+
+    def record_dict(self, record):
+        """记录 StageTimer.to_dict() 格式的结果（例如来自工作进程）"""
+        operation = record["op"]
+        with self._lock:
+            self.counters[operation] = self.counters.get(operation, 0) + 1
+            self._histogram(f"{operation}.total").add(record["total_ms"])
+            for name, value in record["stages"].items():
+                self._histogram(f"{operation}.{name}").add(value)
+            self.last[operation] = record
+        self._write_line(record)
+
+    def _histogram(self, key):
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        return histogram
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: {"counters": {...}, "histograms": {"操作.阶段": {...}}}
+        """
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {key: histogram.to_dict() for key, histogram in self.histograms.items()},
+            }
+
+    def reset(self):
+        """清空所有统计"""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.last.clear()
+
+    def summary_text(self, operation, title=None):
+        """
+        最近一次操作的单行摘要，用于状态栏
+
+        Returns:
+            str: 例如 "预览 12.3ms（解码 8.1 · 文本 2.0）"，没有记录时返回空字符串
+        """
+        record = self.last.get(operation)
+        if not record:
+            return ""
+        parts = [f"{STAGE_LABELS.get(name, name)} {value:.1f}"
+                 for name, value in sorted(record["stages"].items(), key=lambda item: -item[1])
+                 if value >= 0.1]
+        detail = f"（{' · '.join(parts)}）" if parts else ""
+        return f"{title or operation} {record['total_ms']:.1f}ms{detail}"
+
+    def details_text(self):
+        """各阶段的统计表（次数、平均值、p50、p95、最大值），用于提示信息"""
+        snapshot = self.snapshot()
+        lines = [f"{'阶段':<24}{'次数':>6}{'平均':>9}{'p50':>8}{'p95':>8}{'最大':>9}"]
+        for key in sorted(snapshot["histograms"]):
+            values = snapshot["histograms"][key]
+            lines.append(f"{key:<24}{values['count']:>6}{values['mean_ms']:>9.1f}"
+                         f"{values['p50_ms']:>8.0f}{values['p95_ms']:>8.0f}{values['max_ms']:>9.1f}")
+        counters = [f"{name}={value}" for name, value in sorted(snapshot["counters"].items())]
+        if counters:
+            lines.append("计数: " + ", ".join(counters))
+        return "\n".join(lines)
+
+    def _write_line(self, record):
+        sink = self._get_sink()
+        if sink is None:
+            return
+        line = dict(record, time=datetime.now().isoformat(timespec="milliseconds"), pid=os.getpid())
+        try:
+            with self._lock:
+                sink.write(json.dumps(line, ensure_ascii=False) + "\n")
+                sink.flush()
+        except (OSError, ValueError) as e:
+            print(f"写入耗时记录失败: {e}")
+            self._sink = None
+
+    def _get_sink(self):
+        if self._sink_checked:
+            return self._sink
+        self._sink_checked = True
+        target = os.environ.get(TIMINGS_ENV)
+        if not target or target == "0":
+            return None
+        if target in ("1", "-"):
+            self._sink = sys.stderr
+        else:
+            try:
+                self._sink = open(target, "a", encoding="utf-8")
+            except OSError as e:
+                print(f"无法打开耗时记录文件 {target}: {e}")
+                return None
+        atexit.register(self._write_summary)
+        return self._sink
+
+    def _write_summary(self):
+        """进程退出时写入一行汇总"""
+        if self._sink is None:
+            return
+        try:
+            self._sink.write(json.dumps(dict(self.snapshot(), op="summary", pid=os.getpid()),
+                                        ensure_ascii=False) + "\n")
+            self._sink.flush()
+        except (OSError, ValueError):
+            pass
+
+
+# 全局耗时汇总
+timings = TimingRegistry()
+
+
+class _StageGroup:
+    """同时进入多个记录器的同名阶段"""
+
+    def __init__(self, contexts):
+        self.contexts = contexts
+
+    def __enter__(self):
+        for context in self.contexts:
+            context.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for context in reversed(self.contexts):
+            context.__exit__(exc_type, exc_value, traceback)
+        return False
+
+
+def measure(metrics, name):
+    """
+    返回记录阶段的上下文管理器
+
+    Args:
+        metrics: None、单个记录器（StageTimer / StageMemory），或记录器的元组
+        name: 阶段名称
+
+    metrics为None时返回空的上下文管理器，便于在热路径中按需统计。
+    """
+    if metrics is None:
+        return nullcontext()
+    if isinstance(metrics, tuple):
+        return _StageGroup([recorder.stage(name) for recorder in metrics if recorder is not None])
+    return metrics.stage(name)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+持久化缩略图缓存模块
+在用户缓存目录的SQLite数据库中保存每张图片的文件头信息和缩略图，
+以 (路径, 文件大小, 修改时间) 判断是否仍然有效；再次打开同一批图片时不需要读取文件头或解码原图。
+数据库总大小超过上限时按最近使用时间淘汰。
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import sqlite3
+import threading
+
+from core.image_processor import ImageProcessor
+
+# 缓存目录环境变量（设为空字符串时禁用持久化缓存）
+CACHE_DIR_ENV = "PHOTOWATERMARK_CACHE_DIR"
+DATABASE_NAME = "thumbnails.sqlite3"
+SCHEMA_VERSION = 1
+
+# 默认缓存上限（字节）
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# 超过上限时淘汰到上限的比例，避免每次写入都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+# 累积多少条写入后提交一次
+FLUSH_BATCH_SIZE = 256
+# 单条SQL中IN列表的最大参数个数（低于SQLite的默认上限）
+SQL_IN_CHUNK = 500
+# 一条记录占用的字节数
+ENTRY_BYTES_SQL = "COALESCE(LENGTH(thumb), 0) + COALESCE(LENGTH(info), 0)"
+
+
+def user_cache_dir():
+    """
+    获取本程序的用户缓存目录
+
+    Returns:
+        str or None: 缓存目录，通过环境变量禁用时返回None
+    """
+    override = os.environ.get(CACHE_DIR_ENV)
+    if override is not None:
+        return override or None
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+        return os.path.join(base, "PhotoWatermark2", "Cache")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Caches/PhotoWatermark2")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "photowatermark2")
+
+
+class ThumbnailStore:
+    """
+    持久化缩略图与图片信息缓存（SQLite，线程安全）
+
+    每张图片一行：文件大小和修改时间与记录一致时，信息和缩略图才有效；
+    图片被修改后，写入新信息或新缩略图时会同时清除旧的另一项。
+    写入和“最近使用时间”的更新先在内存中累积，批量提交。
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_path, max_bytes=DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._pending = []  # [(SQL, 参数), ...]
+        self._touched = {}  # {路径: 最近使用时间}
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self._connection.execute("DROP TABLE IF EXISTS entries")
+            self._connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "path TEXT PRIMARY KEY, file_size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "info TEXT, thumb_size INTEGER, thumb BLOB, last_used INTEGER NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._connection.commit()
+        # 数据总字节数只在打开时统计一次，之后随写入和淘汰增量更新
+        self._total_bytes = self._connection.execute(
+            f"SELECT COALESCE(SUM({ENTRY_BYTES_SQL}), 0) FROM entries"
+        ).fetchone()[0]
+
+    @classmethod
+    def shared(cls):
+        """
+        获取进程共享的默认缓存（位于用户缓存目录）
+
+        Returns:
+            ThumbnailStore or None: 缓存被禁用或无法打开时返回None
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cache_dir = user_cache_dir()
+                if cache_dir is None:
+                    cls._shared = False
+                else:
+                    try:
+                        cls._shared = cls(os.path.join(cache_dir, DATABASE_NAME))
+                        atexit.register(cls._shared.close)
+                    except (OSError, sqlite3.Error) as e:
+                        print(f"打开缩略图缓存失败: {e}")
+                        cls._shared = False
+            return cls._shared or None
+
+    @staticmethod
+    def _stamp(file_path, stat=None):
+        if stat is None:
+            stat = os.stat(file_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _lookup(self, column, file_path, stat=None):
+        """读取有效的一列数据，文件已变化或不存在记录时返回None"""
+        try:
+            file_size, mtime_ns = self._stamp(file_path, stat)
+        except OSError:
+            return None, None
+        with self._lock:
+            try:
+                row = self._connection.execute(
+                    f"SELECT {column}, thumb_size FROM entries WHERE path = ? AND file_size = ? AND mtime_ns = ?",
+                    (file_path, file_size, mtime_ns)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"读取缩略图缓存失败: {e}")
+                return None, None
+            if row is None or row[0] is None:
+                return None, None
+            self._touched[file_path] = int(time.time())
+        return row
+
+    def get_info(self, file_path, stat=None):
+        """
+        获取缓存的图片信息
+
+        Returns:
+            dict or None: 与 ImageProcessor.get_image_info 相同格式的信息
+        """
+        value, _ = self._lookup("info", file_path, stat)
+        if value is None:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+
+    def get_thumbnail(self, file_path, max_size, stat=None):
+        """
+        获取缓存的缩略图
+
+        Returns:
+            bytes or None: 编码后的缩略图
+        """
+        value, thumb_size = self._lookup("thumb", file_path, stat)
+        if value is None or thumb_size != max_size:
+            return None
+        return bytes(value)
+
+    def put_info(self, file_path, info, stat=None):
+        """记录图片信息（文件已变化时同时清除旧缩略图）"""
+        try:
+            file_size, mtime_ns = self._stamp(file_path, stat)
+        except OSError:
+            return
+        data = json.dumps(info, ensure_ascii=False)
+        self._queue(
+            "INSERT INTO entries (path, file_size, mtime_ns, info, last_used) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET info = excluded.info, "
+            "thumb = CASE WHEN file_size = excluded.file_size AND mtime_ns = excluded.mtime_ns "
+            "THEN thumb ELSE NULL END, "
+            "file_size = excluded.file_size, mtime_ns = excluded.mtime_ns, last_used = excluded.last_used",
+            (file_path, file_size, mtime_ns, data, int(time.time()))
+        )
+
+    def put_thumbnail(self, file_path, max_size, data, stat=None):
+        """记录缩略图（文件已变化时同时清除旧信息）"""
+        try:
+            file_size, mtime_ns = self._stamp(file_path, stat)
+        except OSError:
+            return
+        self._queue(
+            "INSERT INTO entries (path, file_size, mtime_ns, thumb_size, thumb, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET thumb = excluded.thumb, thumb_size = excluded.thumb_size, "
+            "info = CASE WHEN file_size = excluded.file_size AND mtime_ns = excluded.mtime_ns "
+            "THEN info ELSE NULL END, "
+            "file_size = excluded.file_size, mtime_ns = excluded.mtime_ns, last_used = excluded.last_used",
+            (file_path, file_size, mtime_ns, max_size, sqlite3.Binary(data), int(time.time()))
+        )
+
+    def image_info(self, file_path):
+        """
+        获取图片信息：优先使用缓存，未命中时读取文件头并写入缓存
+
+        Returns:
+            dict or None: 图片信息，无法读取时返回None
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return ImageProcessor.get_image_info(file_path)
+        info = self.get_info(file_path, stat)
+        if info is not None and info.get("file_path") == file_path:
+            return info
+        info = ImageProcessor.get_image_info(file_path)
+        if info:
+            self.put_info(file_path, info, stat)
+        return info
+
+    def _queue(self, sql, params):
+        with self._lock:
+            self._pending.append((sql, params))
+            should_flush = len(self._pending) >= FLUSH_BATCH_SIZE
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """提交累积的写入，并在超过上限时淘汰最久未使用的记录"""
+        with self._lock:
+            if not self._pending and not self._touched:
+                return
+            pending, self._pending = self._pending, []
+            touched, self._touched = self._touched, {}
+            # 写入的第一个参数都是路径，只统计这些记录写入前后的大小变化
+            paths = list({params[0] for _, params in pending})
+            try:
+                with self._connection:
+                    old_bytes = self._bytes_of(paths)
+                    # 相同语句合并为一次 executemany
+                    batches = {}
+                    for sql, params in pending:
+                        batches.setdefault(sql, []).append(params)
+                    for sql, rows in batches.items():
+                        self._connection.executemany(sql, rows)
+                    self._connection.executemany(
+                        "UPDATE entries SET last_used = ? WHERE path = ?",
+                        [(last_used, path) for path, last_used in touched.items()]
+                    )
+                    delta = self._bytes_of(paths) - old_bytes
+                self._total_bytes += delta
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+            except sqlite3.Error as e:
+                print(f"写入缩略图缓存失败: {e}")
+
+    def _bytes_of(self, paths):
+        """指定记录的数据字节数之和（调用方持有锁）"""
+        total = 0
+        for start in range(0, len(paths), SQL_IN_CHUNK):
+            chunk = paths[start:start + SQL_IN_CHUNK]
+            total += self._connection.execute(
+                f"SELECT COALESCE(SUM({ENTRY_BYTES_SQL}), 0) FROM entries "
+                f"WHERE path IN ({', '.join('?' * len(chunk))})",
+                chunk
+            ).fetchone()[0]
+        return total
+
+    def _evict(self):
+        """按最近使用时间淘汰到上限的 EVICT_TARGET_RATIO（调用方持有锁）"""
+        total = self._total_bytes
+        target = int(self.max_bytes * EVICT_TARGET_RATIO)
+        victims = []
+        rows = self._connection.execute(f"SELECT path, {ENTRY_BYTES_SQL} FROM entries ORDER BY last_used")
+        for path, size in rows:
+            if total <= target:
+                break
+            victims.append((path,))
+            total -= size
+        with self._connection:
+            self._connection.executemany("DELETE FROM entries WHERE path = ?", victims)
+        self._total_bytes = total
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._pending = []
+            self._touched = {}
+            with self._connection:
+                self._connection.execute("DELETE FROM entries")
+            self._total_bytes = 0
+
+    def close(self):
+        """提交剩余写入并关闭数据库"""
+        self.flush()
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,786 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+水印渲染核心模块
+根据不可变的水印参数在图片上绘制水印，不依赖主窗口，可在无界面环境下运行
+"""
+
+import os
+import math
+import shutil
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from PyQt6.QtCore import Qt, QRect
+from PyQt6.QtGui import (
+    QImage, QPixmap, QPainter, QFont, QFontMetricsF, QColor, QPen, QPainterPath,
+    QTransform, QGuiApplication
+)
+
+from core.image_processor import ImageProcessor
+from core.jpeg_region import JpegRegionWriter
+from core.stage_metrics import measure
+
+# 默认窗口大小下预览区域可用于显示图片的尺寸 (宽, 高)。
+# 没有预览图可作基准时（命令行、基准测试、尚未显示预览），水印坐标以图片缩放到该区域内的尺寸为基准
+DEFAULT_REFERENCE_BOX = (738, 402)
+
+
+@dataclass(frozen=True)
+class WatermarkSpec:
+    """
+    水印参数（不可变）
+
+    所有位置和尺寸都以 reference_size 描述的画布为基准（通常是预览图尺寸），
+    渲染到其他尺寸的画布时按比例缩放；reference_size 为 None 时，若设置了 reference_box，
+    则以目标画布按比例缩放到该区域内的尺寸为基准（与预览区域的缩放方式相同），
+    否则按画布像素直接绘制。
+    """
+    # 文本水印
+    text: str = ""
+    font_family: str = "Arial"
+    font_size: int = 24
+    font_bold: bool = False
+    font_italic: bool = False
+    text_color: Tuple[int, int, int, int] = (0, 0, 0, 255)
+    text_opacity: int = 80  # 0-100
+    text_position: Tuple[int, int] = (50, 50)  # 文本基线起点
+    rotation: int = 0
+    shadow: bool = False
+    stroke: bool = False
+    stroke_color: Tuple[int, int, int, int] = (255, 255, 255, 255)
+
+    # 图片水印
+    image_enabled: bool = False
+    image_path: str = ""
+    image_width: int = 100
+    image_height: int = 100
+    image_opacity: int = 80  # 0-100
+    proportional_scale: bool = False
+    image_position: Optional[Tuple[int, int]] = None  # None 表示默认右上角
+
+    # 坐标基准画布尺寸 (宽, 高)
+    reference_size: Optional[Tuple[int, int]] = None
+    # 坐标基准预览区域尺寸 (最大宽度, 最大高度)，仅在 reference_size 为空时使用
+    reference_box: Optional[Tuple[int, int]] = None
+
+    @classmethod
+    def from_template(cls, template, reference_size=None, reference_box=None):
+        """
+        根据水印模板数据（watermark_templates.json 中的一项）生成水印参数
+
+        Args:
+            template: 模板数据字典
+            reference_size: 水印坐标基准画布尺寸
+            reference_box: 水印坐标基准预览区域尺寸
+
+        Returns:
+            WatermarkSpec: 水印参数
+        """
+        def to_rgba(value, default):
+            color = QColor(value) if value else QColor()
+            if not color.isValid():
+                return default
+            return (color.red(), color.green(), color.blue(), color.alpha())
+
+        def to_point(value, default):
+            # 旧模板中可能保存的是 "bottom_right" 等字符串，此时使用默认位置
+            if isinstance(value, (list, tuple)) and len(value) == 2:
+                return (int(value[0]), int(value[1]))
+            return default
+
+        return cls(
+            text=template.get('watermark_text', "") or "",
+            font_family=template.get('font_family', cls.font_family),
+            font_size=int(template.get('font_size', cls.font_size)) or cls.font_size,
+            font_bold=bool(template.get('font_bold', False)),
+            font_italic=bool(template.get('font_italic', False)),
+            text_color=to_rgba(template.get('font_color'), cls.text_color),
+            text_opacity=int(template.get('watermark_opacity', cls.text_opacity)),
+            text_position=to_point(template.get('watermark_position'), cls.text_position),
+            rotation=int(template.get('watermark_rotation', 0)),
+            shadow=bool(template.get('font_shadow', False)),
+            stroke=bool(template.get('font_stroke', False)),
+            stroke_color=to_rgba(template.get('stroke_color'), cls.stroke_color),
+            image_enabled=bool(template.get('enable_image_watermark', False)),
+            image_path=template.get('image_watermark_path') or template.get('image_path') or "",
+            image_width=int(template.get('image_width', cls.image_width)),
+            image_height=int(template.get('image_height', cls.image_height)),
+            image_opacity=int(template.get('image_opacity', cls.image_opacity)),
+            proportional_scale=bool(template.get('proportional_scale', False)),
+            image_position=to_point(template.get('image_watermark_position'), None),
+            reference_size=reference_size,
+            reference_box=reference_box
+        )
+
+    def scale_for(self, width, height):
+        """
+        计算从基准画布到目标画布的缩放比例
+
+        Returns:
+            tuple: (scale_x, scale_y)
+        """
+        reference_size = self.reference_size
+        if not reference_size and self.reference_box:
+            reference_size = self.fit_size(width, height, *self.reference_box)
+        if not reference_size or reference_size[0] <= 0 or reference_size[1] <= 0:
+            return 1.0, 1.0
+        return width / reference_size[0], height / reference_size[1]
+
+    @staticmethod
+    def fit_size(width, height, max_width, max_height):
+        """按比例缩放到指定区域内的尺寸（与 Qt KeepAspectRatio 的取整方式一致）"""
+        if width <= 0 or height <= 0:
+            return (0, 0)
+        scaled_width = max_height * width // height
+        if scaled_width <= max_width:
+            return (scaled_width, max_height)
+        return (max_width, max_width * height // width)
+
+    def create_font(self, scale=1.0):
+        """按缩放比例创建文本字体"""
+        font = QFont(self.font_family)
+        font.setPointSize(max(1, int(self.font_size * scale)))
+        font.setBold(self.font_bold)
+        font.setItalic(self.font_italic)
+        return font
+
+
+# 无界面环境下自动创建的Qt应用实例，保持引用避免被回收
+_gui_app = None
+
+
+def ensure_gui_application():
+    """
+    确保存在Qt应用实例
+
+    字体渲染需要 QGuiApplication；在没有窗口的环境（命令行、子进程）中
+    自动以 offscreen 平台创建一个。
+    """
+    global _gui_app
+    app = QGuiApplication.instance()
+    if app is None:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        _gui_app = app = QGuiApplication(["PhotoWatermark2"])
+    return app
+
+
+class ImageAssetCache:
+    """
+    图片水印素材缓存（LRU）
+
+    原图按 (路径, 修改时间) 只解码一次，缩放结果按 (路径, 修改时间, 目标尺寸, 是否等比, 是否草稿) 只缩放一次。
+    """
+
+    def __init__(self, max_decoded=4, max_scaled=32):
+        self.max_decoded = max_decoded
+        self.max_scaled = max_scaled
+        self._decoded = OrderedDict()  # {(路径, 修改时间): QImage}
+        self._scaled = OrderedDict()   # {(路径, 修改时间, 宽, 高, 是否等比, 是否草稿): QImage}
+        self._lock = threading.Lock()
+
+    def get_scaled(self, spec, scale_x=1.0, scale_y=1.0, draft=False):
+        """
+        获取缩放到绘制尺寸的水印图片
+
+        Args:
+            draft: 草稿模式使用快速（最近邻）缩放，用于交互过程中的预览
+
+        Returns:
+            QImage or None: 预乘格式的水印图片，文件不存在或无法加载时返回None
+        """
+        try:
+            mtime = os.stat(spec.image_path).st_mtime_ns
+        except OSError:
+            return None
+
+        source = self._get_decoded(spec.image_path, mtime)
+        if source is None:
+            return None
+
+        width, height = WatermarkRenderer.image_layer_size(spec, source.width(), source.height(),
+                                                           scale_x, scale_y)
+        key = (spec.image_path, mtime, width, height, spec.proportional_scale, draft)
+        with self._lock:
+            scaled = self._scaled.get(key)
+            if scaled is not None:
+                self._scaled.move_to_end(key)
+                return scaled
+
+        scaled = source.scaled(
+            width, height,
+            Qt.AspectRatioMode.IgnoreAspectRatio,
+            Qt.TransformationMode.FastTransformation if draft else Qt.TransformationMode.SmoothTransformation
+        )
+        with self._lock:
+            self._put(self._scaled, key, scaled, self.max_scaled)
+        return scaled
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._decoded.clear()
+            self._scaled.clear()
+
+    def _get_decoded(self, path, mtime):
+        """获取解码后的水印原图"""
+        key = (path, mtime)
+        with self._lock:
+            image = self._decoded.get(key)
+            if image is not None:
+                self._decoded.move_to_end(key)
+                return image
+
+        image = QImage(path)
+        if image.isNull():
+            return None
+        # 与QPixmap一致使用预乘格式，缩放和混合结果相同
+        image = image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+
+        with self._lock:
+            self._put(self._decoded, key, image, self.max_decoded)
+        return image
+
+    @staticmethod
+    def _put(cache, key, value, max_entries):
+        """写入缓存并淘汰最久未使用的条目"""
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > max_entries:
+            cache.popitem(last=False)
+
+
+class TextSpriteCache:
+    """
+    文本水印精灵缓存（LRU）
+
+    将带阴影、描边、旋转和透明度的文本预先绘制到透明的预乘ARGB图片中，
+    按样式和缩放比例缓存；拖拽预览和批量导出时只需贴图。
+    草稿精灵（交互过程中使用）不抗锯齿、不使用描边路径，与正式精灵分开缓存。
+    各层按原透明度依次合成到精灵中，由于"源覆盖"合成满足结合律，贴图结果与直接绘制一致。
+    """
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._sprites = OrderedDict()  # {样式键: (QImage, 原点x偏移, 原点y偏移)}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def sprite_key(spec, scale, draft=False):
+        """生成缓存键：与文本位置无关的全部样式参数"""
+        return (spec.text, spec.font_family, spec.font_size, spec.font_bold, spec.font_italic,
+                spec.text_color, spec.text_opacity, spec.rotation, spec.shadow, spec.stroke,
+                spec.stroke_color, scale, draft)
+
+    def get_sprite(self, spec, scale=1.0, draft=False):
+        """
+        获取文本水印精灵
+
+        Args:
+            draft: 是否使用草稿精灵（绘制更快，质量较低）
+
+        Returns:
+            tuple: (QImage精灵, x偏移, y偏移)，偏移为精灵左上角相对文本基线起点的位置
+        """
+        key = self.sprite_key(spec, scale, draft)
+        with self._lock:
+            sprite = self._sprites.get(key)
+            if sprite is not None:
+                self._sprites.move_to_end(key)
+                return sprite
+
+        sprite = self._render_sprite(spec, scale, draft)
+        with self._lock:
+            self._sprites[key] = sprite
+            self._sprites.move_to_end(key)
+            while len(self._sprites) > self.max_entries:
+                self._sprites.popitem(last=False)
+        return sprite
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._sprites.clear()
+
+    @staticmethod
+    def text_bounds(spec, font, scale=1.0):
+        """
+        计算文本水印相对基线起点的绘制范围（已包含阴影、描边和旋转）
+
+        Returns:
+            QRectF: 绘制范围
+        """
+        path = QPainterPath()
+        path.addText(0, 0, font, spec.text)
+        rect = path.boundingRect().united(QFontMetricsF(font).boundingRect(spec.text))
+
+        if spec.shadow:
+            shadow_offset = int(2 * scale)
+            rect = rect.united(rect.translated(shadow_offset, shadow_offset))
+
+        # 描边和抗锯齿会超出字形轮廓
+        margin = 2 + (int(3 * scale) if spec.stroke else 0)
+        rect = rect.adjusted(-margin, -margin, margin, margin)
+
+        if spec.rotation != 0:
+            rect = QTransform().rotate(spec.rotation).mapRect(rect)
+        return rect
+
+    def _render_sprite(self, spec, scale, draft=False):
+        """绘制文本水印精灵"""
+        font = spec.create_font(scale)
+        bounds = self.text_bounds(spec, font, scale)
+
+        # 精灵原点对齐到整数像素，贴图时字形与直接绘制落在相同的像素网格上
+        left = math.floor(bounds.left())
+        top = math.floor(bounds.top())
+        width = max(1, math.ceil(bounds.right()) - left)
+        height = max(1, math.ceil(bounds.bottom()) - top)
+
+        sprite = QImage(width, height, QImage.Format.Format_ARGB32_Premultiplied)
+        sprite.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(sprite)
+        painter.translate(-left, -top)
+        if spec.rotation != 0:
+            painter.rotate(spec.rotation)
+        painter.setOpacity(spec.text_opacity / 100.0)
+        WatermarkRenderer.draw_text_layers(painter, spec, font, scale, draft)
+        painter.end()
+
+        return sprite, left, top
+
+
+class WatermarkRenderer:
+    """水印渲染类"""
+
+    def __init__(self):
+        # 图片水印素材缓存
+        self.image_assets = ImageAssetCache()
+        # 文本水印精灵缓存
+        self.text_sprites = TextSpriteCache()
+
+    def paint(self, painter, spec, canvas_width, canvas_height, metrics=None, draft=False):
+        """
+        在画布上绘制全部水印
+
+        Args:
+            painter: 已在目标画布上激活的QPainter
+            spec: WatermarkSpec 水印参数
+            canvas_width: 画布宽度
+            canvas_height: 画布高度
+            metrics: 可选的阶段记录器，记录 draw_text 和 draw_image 阶段
+            draft: 草稿模式（交互预览用）：不抗锯齿、不使用描边路径、快速缩放图片水印
+        """
+        scale_x, scale_y = spec.scale_for(canvas_width, canvas_height)
+
+        if spec.text:
+            with measure(metrics, "draw_text"):
+                self.paint_text(painter, spec, scale_x, scale_y, draft)
+
+        if spec.image_enabled and spec.image_path:
+            with measure(metrics, "draw_image"):
+                self.paint_image(painter, spec, canvas_width, scale_x, scale_y, draft)
+
+    def paint_text(self, painter, spec, scale_x=1.0, scale_y=1.0, draft=False):
+        """绘制文本水印，支持字体、颜色、阴影、描边和旋转"""
+        x = int(spec.text_position[0] * scale_x)
+        y = int(spec.text_position[1] * scale_y)
+
+        # 贴上缓存的文本精灵（精灵中已包含透明度）
+        sprite, offset_x, offset_y = self.text_sprites.get_sprite(spec, max(scale_x, scale_y), draft)
+        painter.drawImage(x + offset_x, y + offset_y, sprite)
+
+    @staticmethod
+    def draw_text_layers(painter, spec, font, scale=1.0, draft=False):
+        """
+        以基线起点(0, 0)为原点依次绘制阴影、描边和文本
+
+        Args:
+            painter: 已设置好坐标变换和透明度的QPainter
+            spec: WatermarkSpec 水印参数
+            font: 已按缩放比例创建的字体
+            scale: 缩放比例（阴影偏移和描边宽度随缩放）
+            draft: 草稿模式（见 _draw_text_layers_draft）
+        """
+        painter.save()
+        painter.setFont(font)
+
+        if draft:
+            WatermarkRenderer._draw_text_layers_draft(painter, spec, font, scale)
+            painter.restore()
+            return
+
+        # 先绘制阴影效果
+        if spec.shadow:
+            shadow_offset = int(2 * scale)
+            painter.setPen(QColor(128, 128, 128, 180))  # 半透明灰色阴影
+            painter.drawText(shadow_offset, shadow_offset, spec.text)
+
+        text_color = QColor(*spec.text_color)
+        if spec.stroke:
+            # 描边效果使用QPainterPath绘制
+            path = QPainterPath()
+            path.addText(0, 0, font, spec.text)
+
+            # 绘制描边（轮廓）
+            stroke_pen = QPen(QColor(*spec.stroke_color), int(3 * scale))
+            stroke_pen.setJoinStyle(Qt.PenJoinStyle.RoundJoin)
+            painter.setPen(stroke_pen)
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.drawPath(path)
+
+            # 绘制文本填充
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(text_color)
+            painter.drawPath(path)
+        else:
+            painter.setPen(text_color)
+            painter.drawText(0, 0, spec.text)
+
+        painter.restore()
+
+    @staticmethod
+    def _draw_text_layers_draft(painter, spec, font, scale=1.0):
+        """
+        草稿质量的文本绘制：字形轮廓只生成一次，阴影、描边和文本都直接填充/描绘该轮廓，
+        描边不抗锯齿、不使用圆角连接，速度约为完整质量的两到三倍
+        """
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+        path = QPainterPath()
+        path.addText(0, 0, font, spec.text)
+
+        if spec.shadow:
+            shadow_offset = int(2 * scale)
+            painter.fillPath(path.translated(shadow_offset, shadow_offset), QColor(128, 128, 128, 180))
+        if spec.stroke:
+            painter.strokePath(path, QPen(QColor(*spec.stroke_color), int(3 * scale)))
+        painter.fillPath(path, QColor(*spec.text_color))
+
+    def paint_image(self, painter, spec, canvas_width, scale_x=1.0, scale_y=1.0, draft=False):
+        """绘制图片水印"""
+        if not spec.image_path:
+            return
+
+        watermark_image = self.image_assets.get_scaled(spec, scale_x, scale_y, draft)
+        if watermark_image is None:
+            return
+
+        x, y = self.image_layer_position(spec, canvas_width, watermark_image.width(), scale_x, scale_y)
+
+        painter.save()
+        painter.setOpacity(spec.image_opacity / 100.0)
+        painter.drawImage(x, y, watermark_image)
+        painter.restore()
+
+    @staticmethod
+    def image_layer_position(spec, canvas_width, layer_width, scale_x=1.0, scale_y=1.0):
+        """
+        计算图片水印左上角位置（默认右上角）
+
+        Returns:
+            tuple: (x, y)
+        """
+        if spec.image_position is not None:
+            return int(spec.image_position[0] * scale_x), int(spec.image_position[1] * scale_y)
+        return canvas_width - layer_width - 10, int(10 * scale_y)
+
+    def watermark_regions(self, spec, canvas_width, canvas_height, draft=False):
+        """
+        计算每个水印图层在画布上覆盖的区域
+
+        Args:
+            draft: 是否按草稿模式计算（使用草稿精灵，避免为此绘制正式精灵）
+
+        Returns:
+            list: 与画布求交后的非空QRect列表（文本、图片各一个）
+        """
+        scale_x, scale_y = spec.scale_for(canvas_width, canvas_height)
+        regions = []
+
+        if spec.text:
+            sprite, offset_x, offset_y = self.text_sprites.get_sprite(spec, max(scale_x, scale_y), draft)
+            x = int(spec.text_position[0] * scale_x) + offset_x
+            y = int(spec.text_position[1] * scale_y) + offset_y
+            regions.append(QRect(x, y, sprite.width(), sprite.height()))
+
+        if spec.image_enabled and spec.image_path:
+            watermark_image = self.image_assets.get_scaled(spec, scale_x, scale_y, draft)
+            if watermark_image is not None:
+                x, y = self.image_layer_position(spec, canvas_width, watermark_image.width(),
+                                                 scale_x, scale_y)
+                regions.append(QRect(x, y, watermark_image.width(), watermark_image.height()))
+
+        canvas = QRect(0, 0, canvas_width, canvas_height)
+        return [region.intersected(canvas) for region in regions if region.intersects(canvas)]
+
+    @staticmethod
+    def image_layer_size(spec, source_width, source_height, scale_x=1.0, scale_y=1.0):
+        """
+        计算图片水印的绘制尺寸
+
+        Returns:
+            tuple: (宽, 高)
+        """
+        target_width = int(spec.image_width * scale_x)
+        target_height = int(spec.image_height * scale_y)
+
+        # 如果启用了比例缩放，保持宽高比
+        if spec.proportional_scale and source_width > 0 and source_height > 0:
+            scale = min(target_width / source_width, target_height / source_height)
+            return int(source_width * scale), int(source_height * scale)
+
+        return target_width, target_height
+
+    def render_file(self, image_path, spec, export_settings=None, metrics=None):
+        """
+        加载图片文件，按导出设置调整尺寸并绘制水印
+
+        解码结果直接作为绘制目标，缩放时旧图在新图生成后立即释放，
+        整个过程最多同时存在两份整幅像素数据。
+
+        Args:
+            metrics: 可选的阶段记录器（StageTimer、StageMemory或它们的元组），
+                记录 decode、convert、resize、draw_text、draw_image 阶段
+
+        Returns:
+            QImage or None: 合成后的图片，加载失败时返回None
+        """
+        image = ImageProcessor.load_qimage(image_path, metrics)
+        if image.isNull():
+            return None
+
+        # 根据导出设置调整图片尺寸
+        if export_settings and export_settings.get('size_mode', 0) != 0:
+            with measure(metrics, "resize"):
+                image = self.resize_image(image, export_settings)
+
+        # 图片只有这一个引用，QPainter直接在原像素上绘制，不会复制
+        painter = QPainter(image)
+        self.paint(painter, spec, image.width(), image.height(), metrics)
+        painter.end()
+        return image
+
+    def export_file(self, image_path, output_path, spec, export_settings=None, metrics=None):
+        """
+        将水印应用到图片文件并保存
+
+        Args:
+            metrics: 可选的阶段记录器，除 render_file 的阶段外还记录 encode（编码写入）
+                和 region（JPEG局部重编码）
+
+        Returns:
+            bool: 是否成功
+        """
+        # JPEG局部重编码模式，不满足条件时按常规方式导出
+        if export_settings and export_settings.get('jpeg_region_only'):
+            with measure(metrics, "region"):
+                if self.export_jpeg_region(image_path, output_path, spec, export_settings):
+                    return True
+
+        image = self.render_file(image_path, spec, export_settings, metrics)
+        if image is None:
+            return False
+
+        with measure(metrics, "encode"):
+            if self.is_jpeg_output(export_settings, output_path):
+                # 原地合成白色背景，保存时直接共享像素内存交给PIL
+                self.flatten_alpha_in_place(image)
+            return self.save_image(image, output_path, export_settings)
+
+    def export_jpeg_region(self, image_path, output_path, spec, export_settings=None):
+        """
+        JPEG到JPEG导出时只重新编码水印覆盖的MCU块，其余DCT系数无损复制
+
+        需要支持 -drop 的 jpegtran，且不缩放尺寸；JPEG质量设置不起作用，
+        水印区域沿用原图的量化表和采样方式，与周围画质一致。
+
+        Returns:
+            bool: 是否已按局部重编码方式导出，False表示需要常规导出
+        """
+        if export_settings and export_settings.get('size_mode', 0) != 0:
+            return False
+        if export_settings and export_settings.get('format', 'jpeg').upper() not in ('JPEG', 'JPG'):
+            return False
+        if not JpegRegionWriter.is_available():
+            return False
+
+        layout = JpegRegionWriter.read_layout(image_path)
+        if layout is None:
+            return False
+
+        width, height = layout["size"]
+        regions = JpegRegionWriter.merge_regions([
+            JpegRegionWriter.align_region(rect.x(), rect.y(), rect.width(), rect.height(),
+                                          layout["imcu"], layout["size"])
+            for rect in self.watermark_regions(spec, width, height)
+        ])
+
+        def paint_region(patch, region):
+            # 以区域左上角为原点，按整幅画布的尺寸绘制水印
+            canvas = ImageProcessor.pil_to_qimage(patch).convertToFormat(QImage.Format.Format_RGB32)
+            painter = QPainter(canvas)
+            painter.translate(-region[0], -region[1])
+            self.paint(painter, spec, width, height)
+            painter.end()
+            return ImageProcessor.qimage_to_pil(canvas)
+
+        try:
+            if not regions:
+                # 没有可见水印，原样复制
+                if os.path.abspath(image_path) != os.path.abspath(output_path):
+                    shutil.copyfile(image_path, output_path)
+                return True
+
+            JpegRegionWriter.apply(image_path, output_path, regions, layout, paint_region)
+            return True
+        except Exception as e:
+            print(f"JPEG局部重编码失败，改为完整导出: {e}")
+            return False
+
+    @staticmethod
+    def export_size(width, height, export_settings):
+        """
+        根据导出设置计算输出尺寸
+
+        Returns:
+            tuple: (宽, 高)
+        """
+        size_mode = export_settings.get('size_mode', 0) if export_settings else 0
+
+        if size_mode == 1:  # 按百分比缩放
+            percent = export_settings.get('percent_scale', 100)
+            return int(width * percent / 100), int(height * percent / 100)
+
+        if size_mode == 2:  # 自定义尺寸
+            new_width = export_settings.get('custom_width', width)
+            new_height = export_settings.get('custom_height', height)
+
+            # 如果保持宽高比，重新计算尺寸
+            if export_settings.get('keep_aspect_ratio', True):
+                original_ratio = width / height
+                target_ratio = new_width / new_height
+
+                if target_ratio > original_ratio:
+                    # 以高度为准
+                    new_width = int(new_height * original_ratio)
+                else:
+                    # 以宽度为准
+                    new_height = int(new_width / original_ratio)
+            return new_width, new_height
+
+        # 保持原始尺寸
+        return width, height
+
+    @classmethod
+    def resize_image(cls, image, export_settings):
+        """根据导出设置调整图片（QImage或QPixmap）尺寸"""
+        new_width, new_height = cls.export_size(image.width(), image.height(), export_settings)
+        if (new_width, new_height) == (image.width(), image.height()):
+            return image
+
+        return image.scaled(
+            new_width, new_height,
+            Qt.AspectRatioMode.IgnoreAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        )
+
+    @staticmethod
+    def output_format(export_settings, output_path=None):
+        """
+        获取输出格式：导出设置指定的格式，未指定时按输出文件扩展名判断
+
+        Returns:
+            str or None: 大写的格式名称（JPG统一为JPEG），无法判断时返回None
+        """
+        format_name = export_settings.get('format') if export_settings else None
+        if not format_name and output_path:
+            format_name = os.path.splitext(output_path)[1].lstrip('.')
+        if not format_name:
+            return None
+        format_name = format_name.upper()
+        return 'JPEG' if format_name in ('JPG', 'JPEG') else format_name
+
+    @classmethod
+    def is_jpeg_output(cls, export_settings, output_path=None):
+        """是否保存为JPEG（导出设置指定，或未指定格式时输出文件扩展名为JPEG）"""
+        return cls.output_format(export_settings, output_path) == 'JPEG'
+
+    @staticmethod
+    def save_image(image, output_path, export_settings=None):
+        """
+        根据导出设置保存图片（QImage或QPixmap）
+
+        未指定格式时按扩展名保存；输出为JPEG时都使用导出设置中的质量（默认95）
+        """
+        export_settings = export_settings or {}
+        format_name = WatermarkRenderer.output_format(export_settings, output_path)
+
+        # 其他格式直接保存（未指定格式时由Qt按扩展名判断）
+        if format_name != 'JPEG':
+            if 'format' not in export_settings:
+                return image.save(output_path)
+            return image.save(output_path, format_name)
+
+        # JPEG格式需要通过PIL处理质量设置
+        try:
+            # JPEG不支持透明度，先合成到白色背景上，再直接共享像素内存交给PIL编码
+            pil_image = ImageProcessor.qimage_to_pil(WatermarkRenderer.flatten_alpha(image))
+            if pil_image.mode not in ('RGB', 'RGBX'):
+                pil_image = pil_image.convert('RGB')
+
+            # 保存为JPEG，应用质量设置
+            quality = int(export_settings.get('quality', 95))  # 确保质量是整数
+            quality = max(1, min(100, quality))  # 限制范围在1-100之间
+
+            pil_image.save(output_path, 'JPEG', quality=quality, optimize=True)
+            return True
+
+        except Exception as e:
+            print(f"JPEG保存失败: {e}")
+            # 如果PIL保存失败，回退到Qt保存
+            return image.save(output_path, 'JPEG')
+
+    @staticmethod
+    def flatten_alpha(image, background=QColor(255, 255, 255)):
+        """
+        将带透明通道的图片合成到纯色背景上
+
+        Args:
+            image: QImage或QPixmap对象
+            background: 背景颜色，默认白色
+
+        Returns:
+            QImage: 不带透明通道的图片（原图没有透明通道时直接返回）
+        """
+        if isinstance(image, QPixmap):
+            image = image.toImage()
+        if not image.hasAlphaChannel():
+            return image
+
+        flattened = QImage(image.size(), QImage.Format.Format_RGBX8888)
+        flattened.fill(background)
+        painter = QPainter(flattened)
+        painter.drawImage(0, 0, image)
+        painter.end()
+        return flattened
+
+    @staticmethod
+    def flatten_alpha_in_place(image, background=QColor(255, 255, 255)):
+        """
+        在图片自身的像素内存上合成纯色背景，并原地转换为RGBX8888（不分配新的整幅图片）
+
+        Args:
+            image: 只被调用方引用的QImage（被共享时绘制会先复制）
+            background: 背景颜色，默认白色
+        """
+        if not image.hasAlphaChannel():
+            return
+        painter = QPainter(image)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_DestinationOver)
+        painter.fillRect(image.rect(), background)
+        painter.end()
+        image.convertTo(QImage.Format.Format_RGBX8888)
@@ -6,18 +6,34 @@ PhotoWatermark2 - 一个简单易用的图片水印工具
 """
 
 import sys
+import argparse
+import multiprocessing
 from PyQt6.QtWidgets import QApplication
 from ui.main_window import MainWindow
 
 
 def main():
     """主程序入口函数"""
-    app = QApplication(sys.argv)
+    # 打包后的程序需要支持批量导出的子进程
+    multiprocessing.freeze_support()
+    
+    # 命令行模式（如 batch 子命令）不创建窗口
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        from cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+    
+    # 图形界面的参数，其余参数交给Qt处理
+    parser = argparse.ArgumentParser(prog="run.py", description="PhotoWatermark2 图片水印工具")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="批量导出的工作进程数，默认使用全部CPU核心，1表示串行导出")
+    args, qt_args = parser.parse_known_args(sys.argv[1:])
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setApplicationName("PhotoWatermark2")
     app.setApplicationVersion("1.0.0")
     
     # 创建并显示主窗口
-    window = MainWindow()
+    window = MainWindow(export_workers=args.jobs)
     window.show()
     
     # 进入应用程序主循环
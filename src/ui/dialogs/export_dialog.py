@@ -115,6 +115,11 @@ class ExportDialog(QDialog):
         quality_info.setStyleSheet("color: #666; font-size: 11px;")
         layout.addWidget(quality_info)
         
+        # 只重新编码水印区域（仅原图为JPEG且不缩放时生效）
+        self.region_only_check = QCheckBox("仅重新编码水印区域（JPEG原图，画质无损）")
+        self.region_only_check.setToolTip("需要系统安装支持 -drop 的 jpegtran；不满足条件时自动按常规方式导出")
+        layout.addWidget(self.region_only_check)
+        
         return group
 
     def _create_size_group(self):
@@ -324,6 +329,7 @@ class ExportDialog(QDialog):
         self.quality_label.setEnabled(is_jpeg)
         self.quality_slider.setEnabled(is_jpeg)
         self.quality_value_label.setEnabled(is_jpeg)
+        self.region_only_check.setEnabled(is_jpeg)
 
     def _on_quality_changed(self, value):
         """质量滑块变化事件处理"""
@@ -389,6 +395,7 @@ class ExportDialog(QDialog):
             'percent_scale': self.percent_spin.value(),
             'custom_width': self.width_spin.value(),
             'custom_height': self.height_spin.value(),
-            'keep_aspect_ratio': self.keep_aspect_ratio.isChecked()
+            'keep_aspect_ratio': self.keep_aspect_ratio.isChecked(),
+            'jpeg_region_only': self.region_only_check.isEnabled() and self.region_only_check.isChecked()
         }
         return settings
\ No newline at end of file
@@ -2,8 +2,6 @@
 水印模板管理对话框
 """
 
-import json
-import os
 from datetime import datetime
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
@@ -13,6 +11,8 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QFont
 
+from ui.template_manager import TemplateManager
+
 
 class TemplateDialog(QDialog):
     """模板管理对话框"""
@@ -22,7 +22,7 @@ class TemplateDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent_window = parent
-        self.templates_file = "watermark_templates.json"
+        self.template_manager = TemplateManager()
         self.init_ui()
         self.load_templates()
     
@@ -245,12 +245,8 @@ class TemplateDialog(QDialog):
         """加载模板列表"""
         self.template_list.clear()
         
-        if not os.path.exists(self.templates_file):
-            return
-        
         try:
-            with open(self.templates_file, 'r', encoding='utf-8') as f:
-                templates = json.load(f)
+            templates = self.template_manager.load_all_templates()
             
             for template_name, template_data in templates.items():
                 item = QListWidgetItem(template_name)
@@ -435,25 +431,8 @@ class TemplateDialog(QDialog):
     
     def _save_template(self, name, template_data):
         """保存模板到文件"""
-        templates = {}
-        
-        # 加载现有模板
-        if os.path.exists(self.templates_file):
-            try:
-                with open(self.templates_file, 'r', encoding='utf-8') as f:
-                    templates = json.load(f)
-            except:
-                pass
-        
-        # 添加新模板
-        templates[name] = template_data
-        
-        # 保存到文件
-        try:
-            with open(self.templates_file, 'w', encoding='utf-8') as f:
-                json.dump(templates, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            QMessageBox.warning(self, "错误", f"保存模板失败：{str(e)}")
+        if not self.template_manager.put_template(name, template_data):
+            QMessageBox.warning(self, "错误", "保存模板失败")
     
     def load_selected_template(self):
         """加载选中的模板"""
@@ -486,23 +465,13 @@ class TemplateDialog(QDialog):
             return
         
         # 从文件中删除
-        if os.path.exists(self.templates_file):
-            try:
-                with open(self.templates_file, 'r', encoding='utf-8') as f:
-                    templates = json.load(f)
-                
-                if template_name in templates:
-                    del templates[template_name]
-                    
-                    with open(self.templates_file, 'w', encoding='utf-8') as f:
-                        json.dump(templates, f, ensure_ascii=False, indent=2)
-                    
-                    # 刷新列表
-                    self.load_templates()
-                    QMessageBox.information(self, "成功", f"模板 '{template_name}' 删除成功！")
-                    
-            except Exception as e:
-                QMessageBox.warning(self, "错误", f"删除模板失败：{str(e)}")
+        if self.template_manager.template_exists(template_name):
+            if self.template_manager.delete_template(template_name):
+                # 刷新列表
+                self.load_templates()
+                QMessageBox.information(self, "成功", f"模板 '{template_name}' 删除成功！")
+            else:
+                QMessageBox.warning(self, "错误", "删除模板失败")
     
     def rename_template(self):
         """重命名选中的模板"""
@@ -520,26 +489,13 @@ class TemplateDialog(QDialog):
         new_name = new_name.strip()
         
         # 更新文件
-        if os.path.exists(self.templates_file):
-            try:
-                with open(self.templates_file, 'r', encoding='utf-8') as f:
-                    templates = json.load(f)
-                
-                if old_name in templates:
-                    template_data = templates[old_name]
-                    template_data['name'] = new_name
-                    templates[new_name] = template_data
-                    del templates[old_name]
-                    
-                    with open(self.templates_file, 'w', encoding='utf-8') as f:
-                        json.dump(templates, f, ensure_ascii=False, indent=2)
-                    
-                    # 刷新列表
-                    self.load_templates()
-                    QMessageBox.information(self, "成功", f"模板重命名成功！")
-                    
-            except Exception as e:
-                QMessageBox.warning(self, "错误", f"重命名模板失败：{str(e)}")
+        if self.template_manager.template_exists(old_name):
+            if self.template_manager.rename_template(old_name, new_name):
+                # 刷新列表
+                self.load_templates()
+                QMessageBox.information(self, "成功", f"模板重命名成功！")
+            else:
+                QMessageBox.warning(self, "错误", "重命名模板失败")
 
 
 class SaveTemplateDialog(QDialog):
@@ -548,7 +504,7 @@ class SaveTemplateDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent_window = parent
-        self.templates_file = "watermark_templates.json"
+        self.template_manager = TemplateManager()
         self.init_ui()
     
     def init_ui(self):
@@ -757,25 +713,8 @@ class SaveTemplateDialog(QDialog):
     
     def _save_template(self, name, template_data):
         """保存模板到文件"""
-        templates = {}
-        
-        # 加载现有模板
-        if os.path.exists(self.templates_file):
-            try:
-                with open(self.templates_file, 'r', encoding='utf-8') as f:
-                    templates = json.load(f)
-            except:
-                pass
-        
-        # 添加新模板
-        templates[name] = template_data
-        
-        # 保存到文件
-        try:
-            with open(self.templates_file, 'w', encoding='utf-8') as f:
-                json.dump(templates, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            QMessageBox.warning(self, "错误", f"保存模板失败：{str(e)}")
+        if not self.template_manager.put_template(name, template_data):
+            QMessageBox.warning(self, "错误", "保存模板失败")
 
 
 class LoadTemplateDialog(QDialog):
@@ -785,7 +724,7 @@ class LoadTemplateDialog(QDialog):
     
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.templates_file = "watermark_templates.json"
+        self.template_manager = TemplateManager()
         self.init_ui()
         self.load_templates()
     
@@ -890,15 +829,8 @@ class LoadTemplateDialog(QDialog):
         """加载模板列表"""
         self.template_list.clear()
         
-        if not os.path.exists(self.templates_file):
-            item = QListWidgetItem("暂无保存的模板")
-            item.setFlags(Qt.ItemFlag.NoItemFlags)
-            self.template_list.addItem(item)
-            return
-        
         try:
-            with open(self.templates_file, 'r', encoding='utf-8') as f:
-                templates = json.load(f)
+            templates = self.template_manager.load_all_templates()
             
             if not templates:
                 item = QListWidgetItem("暂无保存的模板")
@@ -7,8 +7,8 @@
 """
 
 import os
-from PyQt6.QtWidgets import QListWidget, QMessageBox, QWidget, QPushButton, QFileDialog, QColorDialog
-from PyQt6.QtCore import Qt, QPoint, QRect, QTimer
+from PyQt6.QtWidgets import QTableView, QMessageBox, QWidget, QPushButton, QFileDialog, QColorDialog
+from PyQt6.QtCore import Qt, QPoint, QRect
 from PyQt6.QtGui import QDragEnterEvent, QDropEvent, QFont, QFontMetrics, QPixmap, QColor
 
 from core.image_processor import ImageProcessor
@@ -21,23 +21,18 @@ class EventHandlers:
     
     def __init__(self, main_window):
         self.main_window = main_window
-        
-        # 节流机制相关变量
-        self._update_timer = QTimer()
-        self._update_timer.setSingleShot(True)
-        self._update_timer.timeout.connect(self._delayed_update_preview)
-        self._pending_update = False
-        
+    
     def setup_event_connections(self):
         """设置所有事件连接"""
         # 图片列表事件
-        self.main_window.image_list.itemClicked.connect(self._on_image_selected)
+        self.main_window.image_list.clicked.connect(self._on_image_selected)
         self.main_window.image_list.keyPressEvent = self._list_key_press_event
         
         # 预览区域鼠标事件
         self.main_window.preview_area.mousePressEvent = self._preview_mouse_press
         self.main_window.preview_area.mouseMoveEvent = self._preview_mouse_move
         self.main_window.preview_area.mouseReleaseEvent = self._preview_mouse_release
+        self.main_window.preview_area.preview_timed.connect(self._on_preview_timed)
         
         # 水印设置事件
         self.main_window.text_input.textChanged.connect(self._update_watermark_text)
@@ -75,7 +70,7 @@ class EventHandlers:
         if hasattr(self.main_window, 'rotation_value'):
             self.main_window.rotation_value.setText(f"{value}°")
         # 更新预览
-        self.main_window.watermark_handler.update_preview()
+        self.main_window.watermark_handler.schedule_preview(interactive=True)
     
     def _show_about_dialog(self):
         """显示关于对话框"""
@@ -117,16 +112,22 @@ class EventHandlers:
                     row, col = position
                     btn.clicked.connect(lambda checked, r=row, c=col: self._set_preset_position(r, c))
     
+    def _on_preview_timed(self, operation):
+        """预览刷新（含水印绘制）完成后在状态栏显示耗时"""
+        self.main_window.watermark_handler.show_timings(operation, "预览")
+    
     def _on_image_selected(self, item):
-        """图片选择事件处理"""
+        """图片选择事件处理（item 为图片列表中的模型索引）"""
         file_path = item.data(Qt.ItemDataRole.UserRole)
-        self.main_window.current_image = file_path
         
-        # 清除缓存，确保新图片正确加载
-        self.main_window.watermark_handler.clear_cache()
+        # 在后台解码新图片，解码完成前显示缩略图占位
+        self.main_window.watermark_handler.select_image(file_path)
         
-        # 更新预览，强制重新计算尺寸
-        self.main_window.watermark_handler.update_preview(force_resize=True)
+        # 在后台预解码上一张和下一张图片
+        model = self.main_window.image_list_model
+        row = item.row()
+        self.main_window.watermark_handler.prefetch_previews(
+            [model.path_at(r) for r in (row + 1, row - 1) if 0 <= r < model.rowCount()])
         
         # 更新状态栏
         image_info = ImageProcessor.get_image_info(file_path)
@@ -143,18 +144,25 @@ class EventHandlers:
             self.main_window.file_manager.remove_selected_images()
         else:
             # 调用原始的keyPressEvent方法处理其他键盘事件
-            QListWidget.keyPressEvent(self.main_window.image_list, event)
+            image_list = self.main_window.image_list
+            previous_index = image_list.currentIndex()
+            QTableView.keyPressEvent(image_list, event)
+            
+            # 方向键等切换了当前图片时同步更新预览
+            current_index = image_list.currentIndex()
+            if current_index.isValid() and current_index != previous_index:
+                self._on_image_selected(current_index)
     
     def _update_watermark_text(self, text):
         """更新水印文本"""
         self.main_window.watermark_text = text
-        self.main_window.watermark_handler.update_preview()
+        self.main_window.watermark_handler.schedule_preview(interactive=True)
         
     def _update_watermark_opacity(self, value):
         """更新水印透明度"""
         self.main_window.watermark_opacity = value
         self.main_window.opacity_value.setText(f"{value}%")
-        self.main_window.watermark_handler.update_preview()
+        self.main_window.watermark_handler.schedule_preview(interactive=True)
     
     def _setup_text_watermark_events(self):
         """设置文本水印相关事件"""
@@ -193,14 +201,14 @@ class EventHandlers:
         if not hasattr(self.main_window, 'text_font'):
             self.main_window.text_font = QFont()
         self.main_window.text_font.setFamily(font.family())
-        self.main_window.watermark_handler.update_preview()
+        self.main_window.watermark_handler.schedule_preview()
     
     def _update_font_size(self, size):
         """更新字号"""
         if not hasattr(self.main_window, 'text_font'):
             self.main_window.text_font = QFont()
         self.main_window.text_font.setPointSize(size)
-        self.main_window.watermark_handler.update_preview()
+        self.main_window.watermark_handler.schedule_preview(interactive=True)
     
     def _update_font_style(self):
         """更新字体样式（粗体、斜体）"""
@@ -212,7 +220,7 @@ class EventHandlers:
         
         self.main_window.text_font.setBold(bold)
         self.main_window.text_font.setItalic(italic)
-        self.main_window.watermark_handler.update_preview()
+        self.main_window.watermark_handler.schedule_preview()
     
     def _select_text_color(self):
         """选择文本颜色"""
@@ -232,7 +240,7 @@ class EventHandlers:
                     border: 2px solid #666;
                 }}
             """)
-            self.main_window.watermark_handler.update_preview()
+            self.main_window.watermark_handler.schedule_preview()
     
     def _select_stroke_color(self):
         """选择描边颜色"""
@@ -252,17 +260,17 @@ class EventHandlers:
                     border: 2px solid #666;
                 }}
             """)
-            self.main_window.watermark_handler.update_preview()
+            self.main_window.watermark_handler.schedule_preview()
     
     def _update_text_shadow(self, checked):
         """更新文本阴影效果"""
         self.main_window.text_shadow = checked
-        self.main_window.watermark_handler.update_preview()
+        self.main_window.watermark_handler.schedule_preview()
     
     def _update_text_stroke(self, enabled):
         """更新文本描边效果"""
         self.main_window.text_stroke = enabled
-        self.main_window.watermark_handler.update_preview()
+        self.main_window.watermark_handler.schedule_preview()
     
     def _setup_image_watermark_events(self):
         """设置图片水印相关事件"""
@@ -295,7 +303,7 @@ class EventHandlers:
         # 设置相关控件的启用状态
         self.main_window.ui_components.set_image_watermark_controls_enabled(enabled)
         
-        self.main_window.watermark_handler.update_preview()
+        self.main_window.watermark_handler.schedule_preview()
     
     def _select_watermark_image(self):
         """选择水印图片"""
@@ -327,7 +335,7 @@ class EventHandlers:
                 self.main_window.image_height_spin.setValue(min(100, pixmap.height()))
                 
                 # 更新预览
-                self.main_window.watermark_handler.update_preview()
+                self.main_window.watermark_handler.schedule_preview()
             else:
                 QMessageBox.warning(self.main_window, "错误", "无法加载选择的图片文件")
     
@@ -350,7 +358,7 @@ class EventHandlers:
         """更新图片水印透明度"""
         self.main_window.image_watermark_opacity = value
         self.main_window.image_opacity_value.setText(f"{value}%")
-        self.main_window.watermark_handler.update_preview()
+        self.main_window.watermark_handler.schedule_preview(interactive=True)
     
     def _toggle_proportional_scale(self, enabled):
         """切换比例缩放模式"""
@@ -380,7 +388,7 @@ class EventHandlers:
                 self.main_window.image_height_spin.blockSignals(False)
                 self.main_window.image_watermark_height = new_height
         
-        self.main_window.watermark_handler.update_preview()
+        self.main_window.watermark_handler.schedule_preview(interactive=True)
     
     def _update_image_height(self, height):
         """更新图片水印高度"""
@@ -402,7 +410,7 @@ class EventHandlers:
                 self.main_window.image_width_spin.blockSignals(False)
                 self.main_window.image_watermark_width = new_width
         
-        self.main_window.watermark_handler.update_preview()
+        self.main_window.watermark_handler.schedule_preview(interactive=True)
         
     def _set_preset_position(self, row, col):
         """设置预设位置"""
@@ -445,7 +453,7 @@ class EventHandlers:
             y_pos = pixmap_height * (1 - padding_ratio)
 
         self.main_window.watermark_position = QPoint(int(x_pos), int(y_pos))
-        self.main_window.watermark_handler.update_preview()
+        self.main_window.watermark_handler.schedule_preview()
     
     def _preview_mouse_press(self, event):
         """处理预览区域的鼠标按下事件"""
@@ -488,29 +496,14 @@ class EventHandlers:
         # 更新水印位置（在pixmap坐标系中）
         self.main_window.watermark_position = self.main_window.original_watermark_pos + delta_in_pixmap
         
-        # 使用节流机制更新预览
-        self._throttled_update_preview()
+        # 按帧合并更新预览，拖拽过程中使用草稿质量
+        self.main_window.watermark_handler.schedule_preview(interactive=True)
         
     def _preview_mouse_release(self, event):
         """处理预览区域的鼠标释放事件"""
         self.main_window.is_dragging = False
         # 拖拽结束时立即更新一次，确保最终位置正确
-        if self._pending_update:
-            self._update_timer.stop()
-            self._delayed_update_preview()
-    
-    def _throttled_update_preview(self):
-        """节流更新预览，避免频繁更新"""
-        self._pending_update = True
-        if not self._update_timer.isActive():
-            # 设置16ms延迟，约60FPS的更新频率
-            self._update_timer.start(16)
-    
-    def _delayed_update_preview(self):
-        """延迟更新预览"""
-        if self._pending_update:
-            self._pending_update = False
-            self.main_window.watermark_handler.update_preview()
+        self.main_window.watermark_handler.render_scheduler.flush()
         
     def _get_watermark_rect(self):
         """获取水印文本的矩形区域"""
@@ -852,4 +845,4 @@ class EventHandlers:
         
         # 更新预览
         if hasattr(self.main_window, 'watermark_handler'):
-            self.main_window.watermark_handler.update_preview()
\ No newline at end of file
+            self.main_window.watermark_handler.schedule_preview()
\ No newline at end of file
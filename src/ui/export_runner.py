@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+后台批量导出模块
+在线程池中驱动 BatchExporter，进度和结果通过信号回到GUI线程，不阻塞事件循环
+"""
+
+import os
+import time
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from core.batch_exporter import BatchExporter
+
+# 两次进度通知之间的最短间隔（秒），避免大批量导出时频繁刷新界面
+PROGRESS_INTERVAL = 0.05
+
+
+class _ExportSignals(QObject):
+    """导出任务信号"""
+    # 进度 (已完成数, 总数)
+    progress = pyqtSignal(int, int)
+    # 导出结束 {success, failed_files, skipped, cancelled, summary}
+    finished = pyqtSignal(dict)
+
+
+class _ExportTask(QRunnable):
+    """批量导出任务，逐个接收 BatchExporter 的结果并汇总"""
+
+    def __init__(self, exporter, jobs, spec, export_settings, manifest, cancel_event, signals):
+        super().__init__()
+        self.exporter = exporter
+        self.jobs = jobs
+        self.spec = spec
+        self.export_settings = export_settings
+        self.manifest = manifest
+        self.cancel_event = cancel_event
+        self.signals = signals
+
+    def run(self):
+        total = len(self.jobs)
+        success_count = 0
+        skipped_count = 0
+        failed_files = []
+        done = 0
+        last_emit = 0.0
+        results = self.exporter.export(self.jobs, self.spec, self.export_settings, manifest=self.manifest)
+        try:
+            for result in results:
+                done += 1
+                if result.get('skipped'):
+                    skipped_count += 1
+                elif result['success']:
+                    success_count += 1
+                else:
+                    failed_files.append(os.path.basename(result['image_path']))
+
+                now = time.perf_counter()
+                if now - last_emit >= PROGRESS_INTERVAL:
+                    self.signals.progress.emit(done, total)
+                    last_emit = now
+                if self.cancel_event.is_set():
+                    break
+        except Exception as e:
+            print(f"批量导出失败: {e}")
+        finally:
+            # 中途停止时关闭生成器：等待已提交的任务结束并保存清单
+            results.close()
+
+        self.signals.progress.emit(done, total)
+        self.signals.finished.emit({
+            "success": success_count,
+            "failed_files": failed_files,
+            "skipped": skipped_count,
+            "cancelled": self.cancel_event.is_set(),
+            # 取消时 BatchExporter 没有生成汇总
+            "summary": self.exporter.summary or {"total": total, "skipped": skipped_count,
+                                                 "images_per_second": 0.0,
+                                                 "workers": self.exporter.workers}
+        })
+
+
+class ExportRunner(QObject):
+    """
+    后台批量导出器
+
+    导出循环在线程池中执行（多进程导出时只负责分发和收集结果），可随时取消。
+    """
+
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(dict)
+
+    def __init__(self, workers=None, parent=None):
+        """
+        Args:
+            workers: 工作进程数，None表示使用全部CPU核心，1表示在后台线程中串行导出
+        """
+        super().__init__(parent)
+        self.workers = workers
+        self._cancel_event = threading.Event()
+        self._running = False
+        self._signals = _ExportSignals()
+        self._signals.progress.connect(self.progress)
+        self._signals.finished.connect(self._on_finished)
+
+    def start(self, jobs, spec, export_settings=None, manifest=None):
+        """
+        开始导出
+
+        Args:
+            jobs: (源图片路径, 输出路径) 列表
+            spec: WatermarkSpec 水印参数（在GUI线程中生成）
+            export_settings: 导出设置
+            manifest: 可选的 ExportManifest，原图和设置都没有变化的图片直接跳过
+        """
+        self._cancel_event = threading.Event()
+        self._running = True
+        QThreadPool.globalInstance().start(
+            _ExportTask(BatchExporter(self.workers), list(jobs), spec, export_settings, manifest,
+                        self._cancel_event, self._signals))
+
+    def cancel(self):
+        """取消导出，已导出的图片保留"""
+        self._cancel_event.set()
+
+    def is_running(self):
+        """是否正在导出"""
+        return self._running
+
+    def _on_finished(self, summary):
+        self._running = False
+        self.finished.emit(summary)
@@ -7,19 +7,38 @@
 """
 
 import os
-from PyQt6.QtWidgets import QFileDialog, QListWidgetItem, QMessageBox, QDialog
+from PyQt6.QtWidgets import QFileDialog, QMessageBox, QDialog, QProgressDialog
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QIcon
 
 from core.image_processor import ImageProcessor
+from core.export_manifest import ExportManifest
 from .dialogs import ExportDialog
+from .thumbnail_loader import ThumbnailLoader
+from .folder_importer import FolderImporter
+from .export_runner import ExportRunner
+
+# 导入失败汇总中最多列出的文件数
+MAX_LISTED_FAILURES = 10
 
 
 class FileManager:
     """文件管理类"""
     
-    def __init__(self, main_window):
+    def __init__(self, main_window, export_workers=None):
+        """
+        Args:
+            export_workers: 批量导出的工作进程数，None表示使用全部CPU核心，1表示串行导出
+        """
         self.main_window = main_window
+        self.export_workers = export_workers
+        # 正在进行的批量导出
+        self._export_runner = None
+        
+        # 后台缩略图加载（由图片列表模型按需请求，可见项优先）
+        self.thumbnail_loader = ThumbnailLoader(self._visible_image_paths)
+        
+        # 正在进行的文件夹导入 {导入器: 进度对话框}
+        self._folder_imports = {}
         
     def open_image_dialog(self):
         """打开图片对话框"""
@@ -39,85 +58,154 @@ class FileManager:
             self.process_folder(folder_path)
     
     def load_images(self, file_paths):
-        """加载图片文件"""
+        """加载图片文件，列表项立即插入，缩略图在后台生成"""
+        entries = []
+        failed = []
+        seen = set()
+        store = self.thumbnail_loader.store
         for file_path in file_paths:
             # 检查文件是否已经在列表中
-            if file_path in self.main_window.image_files:
+            if file_path in self.main_window.image_files or file_path in seen:
                 continue
+            seen.add(file_path)
                 
-            # 获取图片信息
-            image_info = ImageProcessor.get_image_info(file_path)
+            # 获取图片信息（优先使用持久化缓存）
+            if store is not None:
+                image_info = store.image_info(file_path)
+            else:
+                image_info = ImageProcessor.get_image_info(file_path)
             if not image_info:
-                QMessageBox.warning(self.main_window, "警告", f"无法加载图片: {file_path}")
-                continue
-                
-            # 添加到图片文件列表
-            self.main_window.image_files.append(file_path)
-            
-            # 创建缩略图
-            image = ImageProcessor.load_image(file_path)
-            if not image:
+                failed.append((file_path, "无法读取图片信息"))
                 continue
-                
-            pixmap = ImageProcessor.pil_to_pixmap(image)
-            thumbnail = ImageProcessor.create_thumbnail(pixmap)
-            
-            # 创建列表项
-            item = QListWidgetItem(os.path.basename(file_path))
-            item.setData(Qt.ItemDataRole.UserRole, file_path)  # 存储文件路径
-            item.setIcon(QIcon(thumbnail))
-            item.setToolTip(f"{image_info['width']}x{image_info['height']} - {image_info['size_kb']}KB")
+            entries.append((file_path, image_info))
+        
+        if store is not None:
+            store.flush()
+        
+        self.add_image_entries(entries)
+        
+        if failed:
+            self._show_failure_summary(failed)
+    
+    def add_image_entries(self, entries):
+        """
+        批量添加图片到列表，缩略图在显示时按需生成
+        
+        Args:
+            entries: [(文件路径, 图片信息), ...]
             
-            # 添加到列表
-            self.main_window.image_list.addItem(item)
+        Returns:
+            int: 实际添加的图片数
+        """
+        model = self.main_window.image_list_model
+        added = model.add_images(entries)
         
         # 如果有图片，选择第一个
-        if self.main_window.image_list.count() > 0 and not self.main_window.current_image:
-            self.main_window.image_list.setCurrentRow(0)
-            first_item = self.main_window.image_list.item(0)
-            if first_item:
-                self.main_window.event_handlers._on_image_selected(first_item)
+        if model.rowCount() > 0 and not self.main_window.current_image:
+            first_index = model.index(0, 0)
+            self.main_window.image_list.setCurrentIndex(first_index)
+            self.main_window.event_handlers._on_image_selected(first_index)
+        
+        return len(added)
+    
+    def _show_failure_summary(self, failed):
+        """汇总显示无法加载的图片"""
+        listed = "\n".join(f"{path} ({error})" for path, error in failed[:MAX_LISTED_FAILURES])
+        if len(failed) > MAX_LISTED_FAILURES:
+            listed += f"\n... 以及其他 {len(failed) - MAX_LISTED_FAILURES} 个文件"
+        QMessageBox.warning(self.main_window, "警告", f"{len(failed)} 个文件无法加载:\n\n{listed}")
+    
+    def _visible_image_paths(self):
+        """获取列表中当前可见的图片路径"""
+        image_list = self.main_window.image_list
+        model = self.main_window.image_list_model
+        viewport_rect = image_list.viewport().rect()
+        first_row = image_list.indexAt(viewport_rect.topLeft()).row()
+        if first_row < 0:
+            return []
+        last_row = image_list.indexAt(viewport_rect.bottomLeft()).row()
+        if last_row < 0:
+            last_row = model.rowCount() - 1
+        return [model.path_at(row) for row in range(first_row, last_row + 1)]
     
     def process_folder(self, folder_path):
-        """处理文件夹中的图片"""
-        image_count = 0
-        for root, _, files in os.walk(folder_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                if ImageProcessor.is_supported_format(file_path):
-                    self.load_images([file_path])
-                    image_count += 1
-        
-        self.main_window.status_label.setText(f"从文件夹导入了 {image_count} 个图片文件")
+        """在后台导入文件夹中的图片，分批插入列表，可取消"""
+        importer = FolderImporter()
+        
+        # 导入耗时较长时才显示进度对话框
+        progress_dialog = QProgressDialog("正在扫描文件夹...", "取消", 0, 0, self.main_window)
+        progress_dialog.setWindowTitle("导入图片")
+        progress_dialog.setMinimumDuration(500)
+        progress_dialog.setAutoClose(False)
+        progress_dialog.setAutoReset(False)
+        progress_dialog.canceled.connect(importer.cancel)
+        
+        added = 0
+        
+        def on_chunk_ready(entries):
+            nonlocal added
+            added += self.add_image_entries(entries)
+        
+        def on_progress(scanned, found):
+            text = f"正在导入: 已扫描 {scanned} 个文件，已添加 {added} 张图片"
+            progress_dialog.setLabelText(text)
+            self.main_window.status_label.setText(text)
+        
+        def on_finished(summary):
+            self._folder_imports.pop(importer, None)
+            progress_dialog.close()
+            progress_dialog.deleteLater()
+            
+            state = "已取消导入" if summary["cancelled"] else "导入完成"
+            self.main_window.status_label.setText(
+                f"{state}: 从文件夹导入了 {added} 个图片文件"
+                + (f"，{len(summary['failed'])} 个失败" if summary["failed"] else ""))
+            if summary["failed"]:
+                self._show_failure_summary(summary["failed"])
+        
+        importer.chunk_ready.connect(on_chunk_ready)
+        importer.progress.connect(on_progress)
+        importer.finished.connect(on_finished)
+        self._folder_imports[importer] = progress_dialog
+        importer.start(folder_path, self.main_window.image_files)
+    
+    def cancel_folder_imports(self):
+        """取消所有正在进行的文件夹导入"""
+        for importer in list(self._folder_imports):
+            importer.cancel()
     
     def remove_selected_images(self):
         """删除选中的图片"""
-        selected_items = self.main_window.image_list.selectedItems()
-        if not selected_items:
+        image_list = self.main_window.image_list
+        selected_paths = [index.data(Qt.ItemDataRole.UserRole)
+                          for index in image_list.selectionModel().selectedIndexes()]
+        if not selected_paths:
             return
-            
-        for item in selected_items:
-            row = self.main_window.image_list.row(item)
-            file_path = item.data(Qt.ItemDataRole.UserRole)
-            
-            # 从列表中移除
-            self.main_window.image_list.takeItem(row)
-            
-            # 从文件列表中移除
-            if file_path in self.main_window.image_files:
-                self.main_window.image_files.remove(file_path)
+        
+        # 先清除选择，避免选择模型在每段删除后逐一调整大量选择区间
+        image_list.selectionModel().clearSelection()
+        
+        # 从列表中移除（连续的行一次删除）
+        self.main_window.image_list_model.remove_paths(selected_paths)
+        self.main_window.watermark_handler.preview_cache.discard(selected_paths)
+        ImageProcessor.clear_info_cache(selected_paths)
                 
         # 更新状态栏
-        self.main_window.status_label.setText(f"已删除 {len(selected_items)} 个图片")
+        self.main_window.status_label.setText(f"已删除 {len(selected_paths)} 个图片")
         
         # 如果当前没有选中的图片，清空预览区域
-        if self.main_window.image_list.count() == 0:
+        if self.main_window.image_list_model.rowCount() == 0:
             self.main_window.preview_area.clear()
             self.main_window.current_image = None
-        elif self.main_window.image_list.currentItem():
-            current_item = self.main_window.image_list.currentItem()
-            if current_item:
-                self.main_window.event_handlers._on_image_selected(current_item)
+        else:
+            # 模型整体重置后没有当前项，优先保留原来的当前图片
+            current_index = image_list.currentIndex()
+            if not current_index.isValid():
+                current_index = self.main_window.image_list_model.index_of(self.main_window.current_image)
+                if not current_index.isValid():
+                    current_index = self.main_window.image_list_model.index(0, 0)
+                image_list.setCurrentIndex(current_index)
+            self.main_window.event_handlers._on_image_selected(current_index)
     
     def save_current_image(self, output_path=None):
         """保存当前图片（带水印）"""
@@ -162,20 +250,21 @@ class FileManager:
             )
             
         if output_folder:
-            success_count = 0
+            jobs = []
             for image_path in self.main_window.image_files:
                 # 生成输出文件名
                 base_name = os.path.splitext(os.path.basename(image_path))[0]
-                output_path = os.path.join(output_folder, f"{base_name}_watermarked.jpg")
-                
-                # 应用水印并保存
-                if self.main_window.watermark_handler.apply_watermark_to_image(image_path, output_path):
-                    success_count += 1
+                jobs.append((image_path, os.path.join(output_folder, f"{base_name}_watermarked.jpg")))
             
-            self.main_window.status_label.setText(
-                f"批量保存完成: {success_count}/{len(self.main_window.image_files)} 张图片"
-            )
-            return success_count > 0
+            def on_finished(result):
+                state = "批量保存已取消" if result['cancelled'] else "批量保存完成"
+                self.main_window.status_label.setText(
+                    f"{state}: {result['success']}/{len(jobs)} 张图片 "
+                    f"({result['summary']['images_per_second']} 张/秒)"
+                )
+            
+            # 在后台应用水印并保存
+            return self._start_batch_export(jobs, on_finished)
         
         return False
     
@@ -193,8 +282,10 @@ class FileManager:
     
     def clear_all_images(self):
         """清空所有图片"""
-        self.main_window.image_list.clear()
-        self.main_window.image_files.clear()
+        self.cancel_folder_imports()
+        self.main_window.watermark_handler.preview_cache.clear()
+        ImageProcessor.clear_info_cache()
+        self.main_window.image_list_model.clear()
         self.main_window.current_image = None
         self.main_window.preview_area.clear()
         self.main_window.status_label.setText("已清空所有图片")
@@ -308,9 +399,7 @@ class FileManager:
             if reply == QMessageBox.StandardButton.No:
                 return False
         
-        success_count = 0
-        failed_files = []
-        
+        jobs = []
         for image_path in self.main_window.image_files:
             # 获取原图片信息
             original_name = os.path.basename(image_path)
@@ -327,33 +416,92 @@ class FileManager:
             else:
                 output_name = f"{name_without_ext}_watermarked{original_ext}"
                 
-            output_path = os.path.join(output_folder, output_name)
+            jobs.append((image_path, os.path.join(output_folder, output_name)))
+        
+        def on_finished(result):
+            success_count = result['success']
+            failed_files = result['failed_files']
+            skipped_count = result['skipped']
+            summary = result['summary']
+            skipped_text = f"\n跳过未变化的图片: {skipped_count} 张" if skipped_count else ""
             
-            # 应用水印并保存
-            if self.main_window.watermark_handler.apply_watermark_to_image(image_path, output_path):
-                success_count += 1
+            # 显示结果
+            if result['cancelled']:
+                QMessageBox.information(
+                    self.main_window,
+                    "导出已取消",
+                    f"已导出 {success_count} 张图片到:\n{output_folder}{skipped_text}"
+                )
+            elif failed_files:
+                failed_list = "\n".join(failed_files[:5])  # 最多显示5个失败文件
+                if len(failed_files) > 5:
+                    failed_list += f"\n... 还有 {len(failed_files) - 5} 个文件"
+                QMessageBox.warning(
+                    self.main_window,
+                    "导出完成（部分失败）",
+                    f"成功导出: {success_count}/{len(jobs)} 张图片{skipped_text}\n\n失败的文件:\n{failed_list}"
+                )
             else:
-                failed_files.append(original_name)
-        
-        # 显示结果
-        if failed_files:
-            failed_list = "\n".join(failed_files[:5])  # 最多显示5个失败文件
-            if len(failed_files) > 5:
-                failed_list += f"\n... 还有 {len(failed_files) - 5} 个文件"
-            QMessageBox.warning(
-                self.main_window,
-                "导出完成（部分失败）",
-                f"成功导出: {success_count}/{len(self.main_window.image_files)} 张图片\n\n失败的文件:\n{failed_list}"
-            )
-        else:
-            QMessageBox.information(
-                self.main_window,
-                "导出完成",
-                f"成功导出 {success_count} 张图片到:\n{output_folder}"
+                QMessageBox.information(
+                    self.main_window,
+                    "导出完成",
+                    f"成功导出 {success_count} 张图片到:\n{output_folder}{skipped_text}"
+                )
+            
+            state = "批量导出已取消" if result['cancelled'] else "批量导出完成"
+            self.main_window.status_label.setText(
+                f"{state}: {success_count}/{len(jobs)} 张图片，跳过 {skipped_count} 张 "
+                f"({summary['images_per_second']} 张/秒, {summary['workers']} 个进程)"
             )
         
-        self.main_window.status_label.setText(
-            f"批量导出完成: {success_count}/{len(self.main_window.image_files)} 张图片"
-        )
+        # 在后台应用水印并保存，原图和水印设置都没有变化的图片直接跳过
+        manifest = ExportManifest.load(output_folder)
+        return self._start_batch_export(jobs, on_finished, manifest=manifest)
+    
+    def _start_batch_export(self, jobs, on_finished, export_settings=None, manifest=None):
+        """
+        在后台批量导出，进度显示在可取消的进度对话框和状态栏中
+        
+        Args:
+            jobs: (源图片路径, 输出路径) 列表
+            on_finished: 导出结束后在GUI线程中调用，参数为
+                {success（不含跳过的图片）, failed_files, skipped, cancelled, summary}
+            export_settings: 导出设置
+            manifest: 可选的 ExportManifest，用于跳过没有变化的图片
+            
+        Returns:
+            bool: 是否已开始导出（已有导出正在进行时返回False）
+        """
+        if self._export_runner is not None:
+            QMessageBox.warning(self.main_window, "警告", "已有批量导出正在进行")
+            return False
+        
+        # 水印参数在开始时确定，导出过程中修改设置不影响本次导出
+        spec = self.main_window.watermark_handler.build_export_spec()
+        runner = ExportRunner(self.export_workers)
+        self._export_runner = runner
+        
+        progress_dialog = QProgressDialog("正在导出...", "取消", 0, len(jobs), self.main_window)
+        progress_dialog.setWindowTitle("批量导出")
+        progress_dialog.setMinimumDuration(500)
+        progress_dialog.setAutoClose(False)
+        progress_dialog.setAutoReset(False)
+        progress_dialog.canceled.connect(runner.cancel)
+        
+        def on_progress(done, total):
+            progress_dialog.setValue(done)
+            text = f"正在导出: {done}/{total}"
+            progress_dialog.setLabelText(text)
+            self.main_window.status_label.setText(text)
+        
+        def on_runner_finished(result):
+            self._export_runner = None
+            progress_dialog.close()
+            progress_dialog.deleteLater()
+            runner.deleteLater()
+            on_finished(result)
         
-        return success_count > 0
\ No newline at end of file
+        runner.progress.connect(on_progress)
+        runner.finished.connect(on_runner_finished)
+        runner.start(jobs, spec, export_settings, manifest)
+        return True
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+文件夹导入模块
+在后台线程中流式扫描目录树，分批返回可加载的图片
+"""
+
+import os
+import time
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from core.image_processor import ImageProcessor
+from core.thumbnail_store import ThumbnailStore
+
+# 每批返回的图片数量
+IMPORT_CHUNK_SIZE = 256
+# 两批之间的最长间隔（秒），保证少量图片也能及时显示
+IMPORT_CHUNK_INTERVAL = 0.1
+
+
+def iter_image_files(folder_path, cancel_event=None, onerror=None):
+    """
+    使用 os.scandir 流式遍历目录树，逐个产出支持格式的图片路径
+
+    Args:
+        folder_path: 根目录
+        cancel_event: 取消标志（threading.Event），置位后停止遍历
+        onerror: 目录无法读取时的回调，参数为 (路径, 异常)
+
+    Yields:
+        str: 图片文件路径（同一目录内按名称排序，先文件后子目录）
+    """
+    stack = [folder_path]
+    while stack:
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        directory = stack.pop()
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        # 不跟随目录符号链接，避免循环
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file() and ImageProcessor.is_supported_format(entry.name):
+                            files.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError as e:
+            if onerror is not None:
+                onerror(directory, e)
+            continue
+
+        files.sort()
+        yield from files
+        stack.extend(sorted(subdirs, reverse=True))
+
+
+class _ImportSignals(QObject):
+    """导入任务信号"""
+    # 一批可加载的图片 [(文件路径, 图片信息), ...]
+    chunk_ready = pyqtSignal(list)
+    # 进度 (已扫描图片数, 可加载图片数)
+    progress = pyqtSignal(int, int)
+    # 导入结束 {found, failed, cancelled}
+    finished = pyqtSignal(dict)
+
+
+class _ImportTask(QRunnable):
+    """目录扫描任务，读取每张图片的文件头信息"""
+
+    def __init__(self, folder_path, known_paths, cancel_event, signals):
+        super().__init__()
+        self.folder_path = folder_path
+        self.known_paths = known_paths
+        self.cancel_event = cancel_event
+        self.signals = signals
+
+    def run(self):
+        failed = []
+        chunk = []
+        scanned = 0
+        found = 0
+        seen = set()
+        last_emit = time.perf_counter()
+        # 再次导入同一批图片时从持久化缓存读取文件头信息
+        store = ThumbnailStore.shared()
+
+        def on_dir_error(path, error):
+            failed.append((path, str(error)))
+
+        try:
+            for file_path in iter_image_files(self.folder_path, self.cancel_event, on_dir_error):
+                scanned += 1
+                if file_path in seen or file_path in self.known_paths:
+                    continue
+                seen.add(file_path)
+
+                if store is not None:
+                    image_info = store.image_info(file_path)
+                else:
+                    image_info = ImageProcessor.get_image_info(file_path)
+                if image_info:
+                    chunk.append((file_path, image_info))
+                    found += 1
+                else:
+                    failed.append((file_path, "无法读取图片信息"))
+
+                now = time.perf_counter()
+                if len(chunk) >= IMPORT_CHUNK_SIZE or (chunk and now - last_emit >= IMPORT_CHUNK_INTERVAL):
+                    self.signals.chunk_ready.emit(chunk)
+                    self.signals.progress.emit(scanned, found)
+                    chunk = []
+                    last_emit = now
+        except Exception as e:
+            failed.append((self.folder_path, str(e)))
+
+        if store is not None:
+            store.flush()
+        if chunk:
+            self.signals.chunk_ready.emit(chunk)
+        self.signals.progress.emit(scanned, found)
+        self.signals.finished.emit({
+            "found": found,
+            "failed": failed,
+            "cancelled": self.cancel_event.is_set()
+        })
+
+
+class FolderImporter(QObject):
+    """
+    后台文件夹导入器
+
+    在线程池中扫描目录，结果通过信号分批回到GUI线程，可随时取消。
+    """
+
+    chunk_ready = pyqtSignal(list)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(dict)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cancel_event = threading.Event()
+        self._running = False
+        self._signals = _ImportSignals()
+        self._signals.chunk_ready.connect(self._on_chunk_ready)
+        self._signals.progress.connect(self.progress)
+        self._signals.finished.connect(self._on_finished)
+
+    def start(self, folder_path, known_paths=()):
+        """
+        开始导入
+
+        Args:
+            folder_path: 要导入的文件夹
+            known_paths: 已加载的图片路径，扫描时直接跳过
+        """
+        self._cancel_event = threading.Event()
+        self._running = True
+        QThreadPool.globalInstance().start(
+            _ImportTask(folder_path, frozenset(known_paths), self._cancel_event, self._signals))
+
+    def cancel(self):
+        """取消导入，已返回的图片保留"""
+        self._cancel_event.set()
+
+    def is_running(self):
+        """是否正在导入"""
+        return self._running
+
+    def _on_chunk_ready(self, chunk):
+        # 取消后丢弃尚未处理的批次
+        if not self._cancel_event.is_set():
+            self.chunk_ready.emit(chunk)
+
+    def _on_finished(self, summary):
+        self._running = False
+        self.finished.emit(summary)
@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+图片列表模型模块
+以紧凑的索引存储保存图片路径，通过 QAbstractListModel 提供给列表视图，
+图标只在可见行需要时才生成
+"""
+
+import os
+import sys
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QTimer
+from PyQt6.QtGui import QIcon
+
+from .thumbnail_loader import create_placeholder_icon
+
+# 最多缓存的缩略图图标数量（远大于一屏可见行数）
+ICON_CACHE_SIZE = 1000
+# 删除的行超过这么多个不连续区间时整体重置模型，比逐段通知视图更快
+MAX_REMOVE_RANGES = 64
+
+
+class ImageStore:
+    """
+    图片路径存储
+
+    按导入顺序保存路径，并维护 路径 -> 行号 的索引，成员判断和定位都是O(1)。
+    支持 list 的常用只读操作（遍历、len、in、下标），可以直接作为 main_window.image_files 使用；
+    修改应通过 ImageListModel 进行，以便通知视图。
+    """
+
+    def __init__(self):
+        self._paths = []
+        self._index = {}  # {路径: 行号}
+        self._info = {}   # {路径: (宽, 高, KB)}
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __contains__(self, file_path):
+        return file_path in self._index
+
+    def __getitem__(self, row):
+        return self._paths[row]
+
+    def index(self, file_path):
+        """获取路径所在行号，不存在时抛出ValueError（与list.index一致）"""
+        try:
+            return self._index[file_path]
+        except KeyError:
+            raise ValueError(f"{file_path} 不在列表中")
+
+    def info(self, file_path):
+        """获取图片尺寸信息 (宽, 高, KB)，未知时返回None"""
+        return self._info.get(file_path)
+
+    def append(self, file_path, image_info=None):
+        """追加一张图片（路径驻留以减少重复字符串）"""
+        file_path = sys.intern(file_path)
+        self._index[file_path] = len(self._paths)
+        self._paths.append(file_path)
+        if image_info:
+            self._info[file_path] = (image_info['width'], image_info['height'], image_info['size_kb'])
+
+    def remove(self, file_path):
+        """删除一张图片（与list.remove一致）"""
+        row = self.index(file_path)
+        self.remove_rows(row, row)
+        self.reindex(row)
+
+    def remove_rows(self, first, last):
+        """删除 [first, last] 行，之后需要调用 reindex 更新索引"""
+        for file_path in self._paths[first:last + 1]:
+            self._index.pop(file_path, None)
+            self._info.pop(file_path, None)
+        del self._paths[first:last + 1]
+
+    def remove_many(self, file_paths):
+        """一次删除多张图片，只遍历一遍列表"""
+        file_paths = set(file_paths)
+        first = min((self._index[path] for path in file_paths if path in self._index), default=None)
+        if first is None:
+            return
+        for file_path in file_paths:
+            self._index.pop(file_path, None)
+            self._info.pop(file_path, None)
+        self._paths[first:] = [path for path in self._paths[first:] if path not in file_paths]
+        self.reindex(first)
+
+    def reindex(self, start=0):
+        """重建从 start 行开始的索引"""
+        paths = self._paths
+        index = self._index
+        for row in range(start, len(paths)):
+            index[paths[row]] = row
+
+    def clear(self):
+        """清空"""
+        self._paths.clear()
+        self._index.clear()
+        self._info.clear()
+
+
+class ImageListModel(QAbstractListModel):
+    """
+    图片列表模型
+
+    显示文本、提示和图标都在 data() 中按需生成；缩略图只为视图实际请求的行加载，
+    并保存在有限大小的LRU中，图片数量很大时内存占用保持不变。
+    """
+
+    def __init__(self, store, thumbnail_loader=None, parent=None, max_icons=ICON_CACHE_SIZE):
+        """
+        Args:
+            store: ImageStore 图片路径存储
+            thumbnail_loader: ThumbnailLoader 后台缩略图加载器
+            max_icons: 最多缓存的图标数量
+        """
+        super().__init__(parent)
+        self.store = store
+        self.thumbnail_loader = thumbnail_loader
+        self.max_icons = max_icons
+        self._icons = OrderedDict()  # {路径: QIcon}
+        self._placeholder_icon = None
+        self._thumbnail_requests = {}  # 待提交的缩略图请求（有序集合）
+
+        # 合并同一轮绘制中的缩略图请求
+        self._request_timer = QTimer(self)
+        self._request_timer.setSingleShot(True)
+        self._request_timer.timeout.connect(self._flush_thumbnail_requests)
+
+        if thumbnail_loader is not None:
+            thumbnail_loader.thumbnail_ready.connect(self._on_thumbnail_ready)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.store)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.store):
+            return None
+        file_path = self.store[index.row()]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return os.path.basename(file_path)
+        if role == Qt.ItemDataRole.UserRole:
+            return file_path
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self._icon_for(file_path)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            info = self.store.info(file_path)
+            if info:
+                return f"{info[0]}x{info[1]} - {info[2]}KB"
+        return None
+
+    def path_at(self, row):
+        """获取指定行的图片路径"""
+        return self.store[row]
+
+    def cached_thumbnail(self, file_path):
+        """
+        获取已生成的缩略图（不会触发加载）
+
+        Returns:
+            QPixmap or None: 缩略图，尚未生成或生成失败时返回None
+        """
+        icon = self._icons.get(file_path)
+        if icon is None or icon is self._placeholder_icon:
+            return None
+        sizes = icon.availableSizes()
+        return icon.pixmap(sizes[0]) if sizes else None
+
+    def index_of(self, file_path):
+        """获取图片路径对应的模型索引，不存在时返回无效索引"""
+        if file_path not in self.store:
+            return QModelIndex()
+        return self.index(self.store.index(file_path), 0)
+
+    def add_images(self, entries):
+        """
+        在末尾批量添加图片
+
+        Args:
+            entries: [(文件路径, 图片信息), ...]
+
+        Returns:
+            list: 实际添加的路径（已存在的图片被跳过）
+        """
+        new_entries = []
+        seen = set()
+        for file_path, image_info in entries:
+            if file_path in self.store or file_path in seen:
+                continue
+            seen.add(file_path)
+            new_entries.append((file_path, image_info))
+        if not new_entries:
+            return []
+
+        first = len(self.store)
+        self.beginInsertRows(QModelIndex(), first, first + len(new_entries) - 1)
+        for file_path, image_info in new_entries:
+            self.store.append(file_path, image_info)
+        self.endInsertRows()
+        return [file_path for file_path, _ in new_entries]
+
+    def remove_paths(self, file_paths):
+        """
+        删除图片，连续的行一次删除，最后统一更新索引；区间很多时整体重置（当前项和选择会被清除）
+
+        Returns:
+            int: 删除的图片数
+        """
+        rows = sorted({self.store.index(path) for path in file_paths if path in self.store})
+        if not rows:
+            return 0
+
+        removed_paths = [self.store[row] for row in rows]
+
+        # 从后向前按连续区间删除，前面的行号保持不变
+        ranges = []
+        start = end = rows[0]
+        for row in rows[1:]:
+            if row == end + 1:
+                end = row
+            else:
+                ranges.append((start, end))
+                start = end = row
+        ranges.append((start, end))
+
+        if len(ranges) > MAX_REMOVE_RANGES:
+            self.beginResetModel()
+            self.store.remove_many(removed_paths)
+            self.endResetModel()
+        else:
+            for first, last in reversed(ranges):
+                self.beginRemoveRows(QModelIndex(), first, last)
+                self.store.remove_rows(first, last)
+                self.endRemoveRows()
+            self.store.reindex(rows[0])
+
+        for file_path in removed_paths:
+            self._icons.pop(file_path, None)
+            self._thumbnail_requests.pop(file_path, None)
+        if self.thumbnail_loader is not None:
+            self.thumbnail_loader.cancel(removed_paths)
+        return len(removed_paths)
+
+    def clear(self):
+        """清空所有图片"""
+        self.beginResetModel()
+        self.store.clear()
+        self._icons.clear()
+        self._thumbnail_requests.clear()
+        if self.thumbnail_loader is not None:
+            self.thumbnail_loader.cancel_all()
+        self.endResetModel()
+
+    def _icon_for(self, file_path):
+        """获取图标，尚未生成时返回占位图标并请求后台生成"""
+        icon = self._icons.get(file_path)
+        if icon is not None:
+            self._icons.move_to_end(file_path)
+            return icon
+
+        if self._placeholder_icon is None:
+            self._placeholder_icon = create_placeholder_icon()
+        loader = self.thumbnail_loader
+        if loader is not None and not loader.is_pending(file_path):
+            self._thumbnail_requests[file_path] = None
+            if not self._request_timer.isActive():
+                self._request_timer.start(0)
+        return self._placeholder_icon
+
+    def _flush_thumbnail_requests(self):
+        requests = list(self._thumbnail_requests)
+        self._thumbnail_requests.clear()
+        self.thumbnail_loader.request(requests)
+
+    def _on_thumbnail_ready(self, file_path, thumbnail):
+        """缩略图生成完成，缓存图标并刷新对应行"""
+        if file_path not in self.store:
+            return
+        # 生成失败时缓存占位图标，避免反复请求
+        self._icons[file_path] = QIcon(thumbnail) if not thumbnail.isNull() else self._placeholder_icon
+        self._icons.move_to_end(file_path)
+        while len(self._icons) > self.max_icons:
+            self._icons.popitem(last=False)
+
+        index = self.index(self.store.index(file_path), 0)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
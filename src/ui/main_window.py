@@ -16,12 +16,17 @@ from ui.event_handlers import EventHandlers
 from ui.watermark_handler import WatermarkHandler
 from ui.file_manager import FileManager
 from ui.template_manager import TemplateManager
+from ui.image_list_model import ImageStore
 
 
 class MainWindow(QMainWindow):
     """主窗口类"""
     
-    def __init__(self):
+    def __init__(self, export_workers=None):
+        """
+        Args:
+            export_workers: 批量导出的工作进程数，None表示使用全部CPU核心
+        """
         super().__init__()
         
         # 设置窗口基本属性
@@ -29,7 +34,7 @@ class MainWindow(QMainWindow):
         self.resize(1000, 900)
         
         # 图片数据
-        self.image_files = []  # 存储图片文件路径
+        self.image_files = ImageStore()  # 存储图片文件路径（带索引，通过 image_list_model 修改）
         self.current_image = None  # 当前选中的图片
         
         # 水印数据
@@ -57,10 +62,13 @@ class MainWindow(QMainWindow):
         self.proportional_scale_enabled = False  # 是否启用比例缩放，默认关闭
         self.image_watermark_position = QPoint(10, 10)  # 图片水印位置
         
+        # 模板管理器（模板解析结果在进程内缓存）
+        self.template_manager = TemplateManager()
+        
         # 初始化组件管理器
         self.ui_components = UIComponents(self)
         self.watermark_handler = WatermarkHandler(self)
-        self.file_manager = FileManager(self)
+        self.file_manager = FileManager(self, export_workers)
         self.event_handlers = EventHandlers(self)
         
         # 初始化UI
@@ -105,8 +113,8 @@ class MainWindow(QMainWindow):
         return self.watermark_handler.get_watermark_rect()
     
     def update_preview(self):
-        """更新预览"""
-        self.watermark_handler.update_preview()
+        """请求更新预览（在下一帧渲染）"""
+        self.watermark_handler.schedule_preview()
     
     # 为了保持向后兼容性，保留一些原有的方法名
     def _open_image(self):
@@ -132,8 +140,7 @@ class MainWindow(QMainWindow):
     def _load_last_settings(self):
         """加载上次的设置"""
         try:
-            template_manager = TemplateManager()
-            last_settings = template_manager.load_last_settings()
+            last_settings = self.template_manager.load_last_settings()
             
             if last_settings:
                 # 应用设置到界面
@@ -226,8 +233,7 @@ class MainWindow(QMainWindow):
             current_settings = self._get_current_settings()
             
             # 保存为上次设置
-            template_manager = TemplateManager()
-            template_manager.save_last_settings(current_settings)
+            self.template_manager.save_last_settings(current_settings)
         except Exception as e:
             print(f"保存设置失败: {e}")
         
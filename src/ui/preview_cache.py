@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预览图缓存模块
+每张图片只从磁盘解码一次，生成多级分辨率的预览金字塔（逐级缩小一半），
+任意预览尺寸都从不小于它的最近一级缩放得到，调整窗口大小时不会重新读取原图；
+选中图片和相邻图片都在后台解码，快速切换图片时过期的请求在解码前丢弃
+"""
+
+import os
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QSize, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap, QGuiApplication
+
+from core.image_processor import ImageProcessor
+from core.stage_metrics import measure, timings
+
+# 最多缓存的预览图数量（每个预览尺寸一张）
+PREVIEW_CACHE_SIZE = 8
+# 最多缓存的预览金字塔数量
+PYRAMID_CACHE_SIZE = 4
+# 金字塔最小一级的最长边（像素）
+PYRAMID_MIN_SIDE = 256
+# 无法获取屏幕尺寸时金字塔顶层的最大尺寸
+DEFAULT_PYRAMID_TOP_SIZE = (2560, 1600)
+
+
+def pyramid_top_size():
+    """金字塔顶层的最大尺寸：能覆盖任意屏幕上的预览区域（需在GUI线程中调用）"""
+    screens = QGuiApplication.screens()
+    if not screens:
+        return DEFAULT_PYRAMID_TOP_SIZE
+    width = max(screen.availableGeometry().width() for screen in screens)
+    height = max(screen.availableGeometry().height() for screen in screens)
+    return (width, height)
+
+
+class PreviewPyramid:
+    """单张图片的多级预览图（QImage，可在工作线程中创建）"""
+
+    def __init__(self, levels, source_size):
+        """
+        Args:
+            levels: 从大到小排列的QImage列表
+            source_size: 原图尺寸 (宽, 高)
+        """
+        self.levels = levels
+        self.source_size = source_size
+
+    @classmethod
+    def build(cls, file_path, max_width, max_height, metrics=None):
+        """
+        解码图片并生成金字塔（可在工作线程中调用）
+
+        Args:
+            max_width: 顶层最大宽度（不会放大原图）
+            max_height: 顶层最大高度
+            metrics: 可选的阶段记录器，记录 decode、convert、scale 阶段
+
+        Returns:
+            PreviewPyramid or None: 解码失败时返回None
+        """
+        # JPEG直接缩小解码
+        with measure(metrics, "decode"):
+            image = ImageProcessor.load_image_for_size(file_path, max_width, max_height)
+            if not image:
+                return None
+            # 缩小解码后 image.size 已是缩小后的尺寸，原图尺寸从文件头读取
+            info = ImageProcessor.get_image_info(file_path)
+            source_size = (info["width"], info["height"]) if info else image.size
+            image.load()
+        with measure(metrics, "convert"):
+            top = ImageProcessor.pil_to_qimage(image)
+        if top.isNull():
+            return None
+
+        with measure(metrics, "scale"):
+            if top.width() > max_width or top.height() > max_height:
+                top = top.scaled(max_width, max_height, Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+            levels = [top]
+            while max(levels[-1].width(), levels[-1].height()) // 2 >= PYRAMID_MIN_SIDE:
+                previous = levels[-1]
+                levels.append(previous.scaled(max(1, previous.width() // 2), max(1, previous.height() // 2),
+                                              Qt.AspectRatioMode.IgnoreAspectRatio,
+                                              Qt.TransformationMode.SmoothTransformation))
+        return cls(levels, source_size)
+
+    def covers(self, max_width, max_height):
+        """顶层是否足以生成指定尺寸的预览（原图本身更小时也算覆盖）"""
+        top = self.levels[0]
+        target = top.size().scaled(max_width, max_height, Qt.AspectRatioMode.KeepAspectRatio)
+        if target.width() <= top.width() and target.height() <= top.height():
+            return True
+        return top.width() >= self.source_size[0] or top.height() >= self.source_size[1]
+
+    def scaled(self, max_width, max_height, metrics=None):
+        """
+        从不小于目标尺寸的最近一级缩放出预览图
+
+        Returns:
+            QImage: 保持宽高比缩放到 (max_width, max_height) 内的图片
+        """
+        target = self.levels[0].size().scaled(max_width, max_height, Qt.AspectRatioMode.KeepAspectRatio)
+        target = QSize(max(1, target.width()), max(1, target.height()))
+        source = self.levels[0]
+        for level in self.levels[1:]:
+            if level.width() < target.width() or level.height() < target.height():
+                break
+            source = level
+        if source.size() == target:
+            return source
+        with measure(metrics, "scale"):
+            return source.scaled(target, Qt.AspectRatioMode.IgnoreAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+
+
+def decode_preview(file_path, max_width, max_height, metrics=None):
+    """
+    按预览尺寸解码图片（可在工作线程中调用）
+
+    Args:
+        metrics: 可选的阶段记录器，记录 decode、convert、scale 阶段
+
+    Returns:
+        QImage: 缩放到预览尺寸的图片，失败时为空QImage
+    """
+    pyramid = PreviewPyramid.build(file_path, max_width, max_height, metrics)
+    if pyramid is None:
+        return QImage()
+    return pyramid.scaled(max_width, max_height, metrics)
+
+
+class _PreviewSignals(QObject):
+    """预解码任务信号 (键, 代数, 金字塔, 是否因过期而丢弃)"""
+    finished = pyqtSignal(object, int, object, bool)
+
+
+class _PreviewTask(QRunnable):
+    """单个解码任务，在工作线程中只使用QImage"""
+
+    def __init__(self, key, generation, top_size, is_wanted, signals):
+        """
+        Args:
+            key: (文件路径, 修改时间)
+            generation: 提交任务时的选择代数
+            top_size: 金字塔顶层最大尺寸
+            is_wanted: 判断任务是否仍然需要的函数 (文件路径, 代数) -> bool
+        """
+        super().__init__()
+        self.key = key
+        self.generation = generation
+        self.top_size = top_size
+        self.is_wanted = is_wanted
+        self.signals = signals
+
+    def run(self):
+        # 排队期间用户已切换到其他图片：不再解码
+        if not self.is_wanted(self.key[0], self.generation):
+            self.signals.finished.emit(self.key, self.generation, None, True)
+            return
+        try:
+            pyramid = PreviewPyramid.build(self.key[0], *self.top_size)
+        except Exception as e:
+            print(f"预解码图片失败: {e}")
+            pyramid = None
+        self.signals.finished.emit(self.key, self.generation, pyramid, False)
+
+
+class PreviewCache(QObject):
+    """
+    预览图缓存
+
+    每张图片以 (文件路径, 修改时间) 为键缓存一个预览金字塔，文件被覆盖后自动失效；
+    另以 (文件路径, 修改时间, 预览尺寸) 为键缓存最近使用的预览QPixmap。
+
+    每次选择图片时选择代数加一。后台任务在开始解码前检查自己是否已过期
+    （代数落后且图片不是当前选中的图片），过期则直接丢弃；过期任务的解码结果同样丢弃。
+    """
+
+    # 预解码任务比缩略图任务优先执行，选中图片的解码任务最优先
+    PREFETCH_PRIORITY = 1
+    SELECTION_PRIORITY = 2
+
+    # 当前选中图片的金字塔已就绪 (文件路径)
+    preview_ready = pyqtSignal(str)
+
+    def __init__(self, max_entries=PREVIEW_CACHE_SIZE, max_pyramids=PYRAMID_CACHE_SIZE, parent=None):
+        super().__init__(parent)
+        self.max_entries = max_entries
+        self.max_pyramids = max_pyramids
+        self._cache = OrderedDict()
+        self._pyramids = OrderedDict()
+        self._running = set()
+        self._failed = set()
+        self._generation = 0
+        self._selected_path = None
+        self._thread_pool = QThreadPool.globalInstance()
+        self._signals = _PreviewSignals()
+        self._signals.finished.connect(self._on_task_finished)
+
+    @staticmethod
+    def _make_key(file_path):
+        try:
+            mtime = os.stat(file_path).st_mtime_ns
+        except OSError:
+            return None
+        return (file_path, mtime)
+
+    def get(self, file_path, size, metrics=None, decode=True):
+        """
+        获取预览图
+
+        Args:
+            file_path: 图片路径
+            size: 预览区域尺寸 (最大宽度, 最大高度)
+            metrics: 可选的阶段记录器，记录解码和缩放各阶段
+            decode: 金字塔未缓存时是否同步解码；为False时直接返回None（配合 request 异步解码）
+
+        Returns:
+            QPixmap: 预览图，失败时返回None
+        """
+        key = self._make_key(file_path)
+        if key is None:
+            return None
+        size = tuple(size)
+
+        pixmap = self._cache.get(key + (size,))
+        if pixmap is not None:
+            self._cache.move_to_end(key + (size,))
+            timings.count("preview_cache_hit")
+            return pixmap
+
+        pyramid = self._pyramids.get(key)
+        if pyramid is not None and pyramid.covers(*size):
+            self._pyramids.move_to_end(key)
+            timings.count("preview_pyramid_hit")
+        else:
+            if not decode:
+                return None
+            # 只有首次显示（或预览区域超过所有屏幕）时才读取原图
+            timings.count("preview_cache_miss")
+            pyramid = PreviewPyramid.build(file_path, *self._top_size(pyramid, size), metrics)
+            if pyramid is None:
+                return None
+            self._put_pyramid(key, pyramid)
+
+        image = pyramid.scaled(*size, metrics)
+        with measure(metrics, "convert"):
+            return self._put(key + (size,), image)
+
+    def begin_selection(self, file_path):
+        """
+        开始一次新的图片选择：选择代数加一，之前提交的预解码和选择任务都变为过期
+
+        Returns:
+            int: 新的选择代数
+        """
+        self._generation += 1
+        self._selected_path = file_path
+        return self._generation
+
+    @staticmethod
+    def _top_size(pyramid, size):
+        """
+        新金字塔的顶层尺寸：默认为最大屏幕尺寸，且不小于预览区域
+
+        现有金字塔不足以覆盖预览区域时，预留两倍余量，避免继续放大窗口时反复解码
+        """
+        top_width, top_height = pyramid_top_size()
+        if pyramid is not None:
+            top_width, top_height = max(top_width, size[0] * 2), max(top_height, size[1] * 2)
+        return max(top_width, size[0]), max(top_height, size[1])
+
+    def request(self, file_path, size):
+        """
+        在后台解码选中的图片，完成后发出 preview_ready 信号
+
+        Args:
+            size: 预览区域尺寸 (最大宽度, 最大高度)，缓存的金字塔不足以覆盖时重新解码
+
+        Returns:
+            bool: 是否有可用的或正在解码的金字塔（解码失败过的图片返回False）
+        """
+        key = self._make_key(file_path)
+        if key is None or key in self._failed:
+            return False
+        if key in self._running:
+            # 正在解码的金字塔不够大时，完成后 get() 仍然未命中，会再次请求
+            return True
+        pyramid = self._pyramids.get(key)
+        if pyramid is not None and pyramid.covers(*size):
+            return True
+        self._start_task(key, self.SELECTION_PRIORITY, self._top_size(pyramid, size))
+        return True
+
+    def prefetch(self, file_paths):
+        """在后台为图片生成预览金字塔（已缓存或正在解码的图片会被跳过）"""
+        for file_path in file_paths:
+            key = self._make_key(file_path)
+            if key is None or key in self._pyramids or key in self._running or key in self._failed:
+                continue
+            self._start_task(key, self.PREFETCH_PRIORITY, pyramid_top_size())
+
+    def _start_task(self, key, priority, top_size):
+        self._running.add(key)
+        task = _PreviewTask(key, self._generation, top_size, self._is_wanted, self._signals)
+        self._thread_pool.start(task, priority)
+
+    def _is_wanted(self, file_path, generation):
+        """任务是否仍然需要（可在工作线程中调用）"""
+        return generation == self._generation or file_path == self._selected_path
+
+    def discard(self, file_paths):
+        """移除指定图片的缓存"""
+        file_paths = set(file_paths)
+        for cache in (self._cache, self._pyramids):
+            for key in [key for key in cache if key[0] in file_paths]:
+                del cache[key]
+        self._failed = {key for key in self._failed if key[0] not in file_paths}
+
+    def clear(self):
+        """清空缓存"""
+        self._cache.clear()
+        self._pyramids.clear()
+        self._failed.clear()
+
+    def _put(self, key, image):
+        pixmap = QPixmap.fromImage(image)
+        self._cache[key] = pixmap
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return pixmap
+
+    def _put_pyramid(self, key, pyramid):
+        self._pyramids[key] = pyramid
+        self._pyramids.move_to_end(key)
+        while len(self._pyramids) > self.max_pyramids:
+            self._pyramids.popitem(last=False)
+
+    def _on_task_finished(self, key, generation, pyramid, dropped):
+        """解码任务完成（在GUI线程中执行）"""
+        self._running.discard(key)
+        if dropped:
+            timings.count("preview_request_dropped")
+            return
+        if pyramid is None:
+            self._failed.add(key)
+        elif not self._is_wanted(key[0], generation):
+            # 解码期间已切换到其他图片
+            timings.count("preview_result_discarded")
+            return
+        else:
+            # 新金字塔至少和缓存中的一样大（不足以覆盖预览区域时才会重新解码）
+            self._put_pyramid(key, pyramid)
+        if key[0] == self._selected_path:
+            self.preview_ready.emit(key[0])
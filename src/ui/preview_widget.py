@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预览控件模块
+预览分为静态的底图层和水印覆盖层：底图只在切换图片或预览尺寸变化时更新，
+水印参数变化时只重绘水印新旧位置所在的区域，拖拽水印的开销与预览尺寸无关
+"""
+
+from PyQt6.QtCore import QRect, pyqtSignal
+from PyQt6.QtGui import QPainter
+from PyQt6.QtWidgets import QLabel, QStyle
+
+from core.stage_metrics import StageTimer, timings
+
+
+class PreviewWidget(QLabel):
+    """带水印覆盖层的预览控件（pixmap() 返回不含水印的底图）"""
+
+    # 一次预览刷新（含覆盖层绘制）的耗时已记录，参数为操作名
+    preview_timed = pyqtSignal(str)
+
+    def __init__(self, text="", parent=None):
+        super().__init__(text, parent)
+        self._renderer = None
+        self._spec = None
+        self._draft = False
+        self._file_path = None
+        # 当前水印覆盖的区域（底图坐标）
+        self._overlay_regions = []
+        # 等待覆盖层绘制完成后记录的预览计时
+        self._pending_timer = None
+
+    def set_base(self, pixmap, file_path=None):
+        """设置底图（会重绘整个控件，之后需要重新调用 set_overlay）"""
+        self._file_path = file_path
+        # 底图尺寸可能变化，水印区域需要按新底图重新计算
+        self._spec = None
+        self._overlay_regions = []
+        self.setPixmap(pixmap)
+
+    def set_overlay(self, renderer, spec, draft=False, timer=None):
+        """
+        设置水印覆盖层，只重绘水印旧区域和新区域
+
+        Args:
+            renderer: WatermarkRenderer 水印渲染器
+            spec: WatermarkSpec 水印参数
+            draft: 是否以草稿质量绘制（交互过程中使用）
+            timer: 可选的预览计时（StageTimer），覆盖层绘制的各阶段计入其中，
+                绘制完成后记录并发出 preview_timed 信号
+        """
+        if timer is not None:
+            # 上一次刷新还没有绘制就被取代时直接记录
+            self._finish_timer()
+            self._pending_timer = timer
+        base = self.pixmap()
+        if base is None or base.isNull():
+            self._finish_timer()
+            return
+        if spec == self._spec and draft == self._draft and renderer is self._renderer:
+            # 水印没有变化，不需要绘制
+            self._finish_timer()
+            return
+
+        regions = renderer.watermark_regions(spec, base.width(), base.height(), draft)
+        dirty = self._overlay_regions + regions
+        self._renderer = renderer
+        self._spec = spec
+        self._draft = draft
+        self._overlay_regions = regions
+
+        if not dirty:
+            self._finish_timer()
+            return
+        origin = self.base_rect().topLeft()
+        for region in dirty:
+            self.update(region.translated(origin))
+
+    def _finish_timer(self):
+        """记录等待中的预览计时"""
+        timer, self._pending_timer = self._pending_timer, None
+        if timer is not None:
+            timings.record(timer)
+            self.preview_timed.emit(timer.operation)
+
+    def clear(self):
+        """清除底图和水印"""
+        self._spec = None
+        self._file_path = None
+        self._overlay_regions = []
+        super().clear()
+
+    def base_rect(self):
+        """底图在控件中的显示区域"""
+        base = self.pixmap()
+        if base is None or base.isNull():
+            return QRect()
+        size = base.deviceIndependentSize().toSize()
+        return QStyle.alignedRect(self.layoutDirection(), self.alignment(), size, self.contentsRect())
+
+    def paintEvent(self, event):
+        # 底图由QLabel绘制（只绘制需要更新的区域）
+        super().paintEvent(event)
+        if self._spec is None or self._renderer is None:
+            return
+        base_rect = self.base_rect()
+        if base_rect.isEmpty() or not event.region().intersects(base_rect):
+            return
+
+        # 预览刷新后的首次绘制计入该次预览，其余重绘（窗口遮挡等）单独记录
+        pending = self._pending_timer is not None
+        timer = self._pending_timer or StageTimer("overlay_draft" if self._draft else "overlay",
+                                                  self._file_path)
+        painter = QPainter(self)
+        painter.setClipRegion(event.region().intersected(base_rect))
+        painter.translate(base_rect.topLeft())
+        self._renderer.paint(painter, self._spec, base_rect.width(), base_rect.height(), timer, self._draft)
+        painter.end()
+        if pending:
+            self._finish_timer()
+        else:
+            timings.record(timer)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预览渲染调度模块
+合并同一帧内的所有预览更新请求，每个显示帧最多渲染一次，渲染时使用最新的水印设置
+"""
+
+import time
+
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtGui import QGuiApplication
+
+# 无法获取屏幕刷新率时使用的帧间隔（毫秒）
+DEFAULT_FRAME_INTERVAL_MS = 16
+
+
+def frame_interval_ms():
+    """主屏幕一帧的时长（毫秒）"""
+    screen = QGuiApplication.primaryScreen()
+    refresh_rate = screen.refreshRate() if screen else 0
+    if refresh_rate <= 0:
+        return DEFAULT_FRAME_INTERVAL_MS
+    return max(1, int(1000 / refresh_rate))
+
+
+class RenderScheduler(QObject):
+    """
+    按帧合并的渲染调度器
+
+    request() 只记录“需要渲染”，在距离上一次渲染满一帧后由事件循环统一执行一次；
+    渲染比一帧更慢时，下一次渲染在处理完积压的输入事件后立即进行，
+    因此拖动滑块时不会为每个 valueChanged 排队一次完整的合成。
+    """
+
+    def __init__(self, render, parent=None):
+        """
+        Args:
+            render: 渲染函数，接受关键字参数 force_resize
+        """
+        super().__init__(parent)
+        self._render = render
+        self._pending = False
+        self._force_resize = False
+        self._last_render = 0.0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._run)
+
+    def request(self, force_resize=False):
+        """请求在下一帧渲染（同一帧内的多次请求只渲染一次）"""
+        self._pending = True
+        self._force_resize = self._force_resize or force_resize
+        if self._timer.isActive():
+            return
+        elapsed_ms = (time.monotonic() - self._last_render) * 1000
+        self._timer.start(max(0, int(frame_interval_ms() - elapsed_ms)))
+
+    def flush(self):
+        """如果有等待中的请求，立即渲染"""
+        if self._pending:
+            self._timer.stop()
+            self._run()
+
+    def cancel(self):
+        """丢弃等待中的请求"""
+        self._timer.stop()
+        self._pending = False
+        self._force_resize = False
+
+    def _run(self):
+        if not self._pending:
+            return
+        force_resize = self._force_resize
+        self._pending = False
+        self._force_resize = False
+        self._last_render = time.monotonic()
+        self._render(force_resize=force_resize)
@@ -2,18 +2,154 @@
 水印模板管理器
 """
 
+import copy
 import json
 import os
+import sqlite3
+import threading
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Iterable
+
+from core.file_utils import atomic_write_json
+
+# 默认模板文件，可通过环境变量指定（扩展名为 .db/.sqlite/.sqlite3 时使用SQLite存储）
+DEFAULT_TEMPLATES_FILE = os.environ.get("PHOTOWATERMARK_TEMPLATES", "watermark_templates.json")
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+
+def _file_stamp(file_path: str):
+    """文件的修改时间、大小和inode，文件不存在时返回None"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class _JsonTemplateStore:
+    """JSON文件存储：整个模板库保存在一个JSON文件中"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def read_all(self) -> Dict[str, Dict[str, Any]]:
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def write(self, templates: Dict[str, Dict[str, Any]], changed: Dict[str, Dict[str, Any]],
+              removed: Iterable[str]):
+        atomic_write_json(self.file_path, templates)
+
+
+class _SqliteTemplateStore:
+    """SQLite存储：每个模板一行，修改时只写入变化的行，适合包含大量模板的共享模板库"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def _connect(self):
+        connection = sqlite3.connect(self.file_path, timeout=10)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS templates (name TEXT PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        return connection
+
+    def read_all(self) -> Dict[str, Dict[str, Any]]:
+        connection = self._connect()
+        try:
+            rows = connection.execute("SELECT name, data FROM templates ORDER BY rowid").fetchall()
+        finally:
+            connection.close()
+        return {name: json.loads(data) for name, data in rows}
+
+    def write(self, templates: Dict[str, Dict[str, Any]], changed: Dict[str, Dict[str, Any]],
+              removed: Iterable[str]):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany("DELETE FROM templates WHERE name = ?",
+                                       [(name,) for name in removed])
+                connection.executemany(
+                    "INSERT INTO templates (name, data) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET data = excluded.data",
+                    [(name, json.dumps(data, ensure_ascii=False)) for name, data in changed.items()]
+                )
+        finally:
+            connection.close()
 
 
 class TemplateManager:
-    """水印模板管理器"""
+    """
+    水印模板管理器
+
+    解析后的模板保存在进程内缓存中（按文件路径共享，多个实例不会重复解析），
+    以文件的修改时间、大小和inode判断是否需要重新读取；所有写入都是原子的。
+    """
+
+    # 文件绝对路径 -> (文件标记, 模板字典)
+    _cache = {}
+    _cache_lock = threading.Lock()
     
-    def __init__(self, templates_file: str = "watermark_templates.json"):
-        self.templates_file = templates_file
+    def __init__(self, templates_file: Optional[str] = None):
+        self.templates_file = templates_file or DEFAULT_TEMPLATES_FILE
         self.last_settings_file = "last_watermark_settings.json"
+        if self.templates_file.lower().endswith(SQLITE_SUFFIXES):
+            self._store = _SqliteTemplateStore(self.templates_file)
+        else:
+            self._store = _JsonTemplateStore(self.templates_file)
+    
+    def _cached_templates(self) -> Dict[str, Dict[str, Any]]:
+        """返回缓存的模板字典（调用方不能修改），文件变化时重新读取"""
+        key = os.path.abspath(self.templates_file)
+        stamp = _file_stamp(self.templates_file)
+        if stamp is None:
+            return {}
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] == stamp:
+                return cached[1]
+        templates = self._store.read_all()
+        if not isinstance(templates, dict):
+            raise ValueError("模板文件格式错误")
+        with self._cache_lock:
+            self._cache[key] = (stamp, templates)
+        return templates
+    
+    def _commit(self, templates: Dict[str, Dict[str, Any]], changed: Dict[str, Dict[str, Any]],
+                removed: Iterable[str] = ()):
+        """写入修改后的模板并更新缓存"""
+        self._store.write(templates, changed, list(removed))
+        # 缓存自己的深拷贝，避免调用方之后修改模板数据（包括颜色、位置等嵌套列表）影响缓存
+        templates = copy.deepcopy(templates)
+        with self._cache_lock:
+            self._cache[os.path.abspath(self.templates_file)] = (_file_stamp(self.templates_file), templates)
+    
+    @classmethod
+    def clear_cache(cls):
+        """清空进程内的模板缓存"""
+        with cls._cache_lock:
+            cls._cache.clear()
+    
+    def put_template(self, name: str, template_data: Dict[str, Any]) -> bool:
+        """
+        按原样保存模板数据（不添加元数据），同名模板会被覆盖
+        
+        Args:
+            name: 模板名称
+            template_data: 模板数据
+            
+        Returns:
+            bool: 保存是否成功
+        """
+        try:
+            templates = self.load_all_templates()
+            templates[name] = template_data
+            self._commit(templates, {name: template_data})
+            return True
+            
+        except Exception as e:
+            print(f"保存模板失败: {e}")
+            return False
     
     def save_template(self, name: str, template_data: Dict[str, Any]) -> bool:
         """
@@ -35,9 +171,7 @@ class TemplateManager:
             template_data['updated_time'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
             templates[name] = template_data
-            
-            with open(self.templates_file, 'w', encoding='utf-8') as f:
-                json.dump(templates, f, ensure_ascii=False, indent=2)
+            self._commit(templates, {name: template_data})
             
             return True
             
@@ -56,8 +190,8 @@ class TemplateManager:
             Dict[str, Any] or None: 模板数据
         """
         try:
-            templates = self.load_all_templates()
-            return templates.get(name)
+            template = self._cached_templates().get(name)
+            return copy.deepcopy(template) if template is not None else None
             
         except Exception as e:
             print(f"加载模板失败: {e}")
@@ -70,12 +204,9 @@ class TemplateManager:
         Returns:
             Dict[str, Dict[str, Any]]: 所有模板数据
         """
-        if not os.path.exists(self.templates_file):
-            return {}
-        
         try:
-            with open(self.templates_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            # 返回深拷贝，调用方可以自由修改（包括嵌套的列表）
+            return copy.deepcopy(self._cached_templates())
                 
         except Exception as e:
             print(f"加载模板列表失败: {e}")
@@ -96,9 +227,7 @@ class TemplateManager:
             
             if name in templates:
                 del templates[name]
-                
-                with open(self.templates_file, 'w', encoding='utf-8') as f:
-                    json.dump(templates, f, ensure_ascii=False, indent=2)
+                self._commit(templates, {}, [name])
                 
                 return True
             
@@ -127,11 +256,9 @@ class TemplateManager:
                 template_data['name'] = new_name
                 template_data['updated_time'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 
-                templates[new_name] = template_data
                 del templates[old_name]
-                
-                with open(self.templates_file, 'w', encoding='utf-8') as f:
-                    json.dump(templates, f, ensure_ascii=False, indent=2)
+                templates[new_name] = template_data
+                self._commit(templates, {new_name: template_data}, [old_name])
                 
                 return True
             
@@ -151,8 +278,11 @@ class TemplateManager:
         Returns:
             bool: 模板是否存在
         """
-        templates = self.load_all_templates()
-        return name in templates
+        try:
+            return name in self._cached_templates()
+        except Exception as e:
+            print(f"加载模板列表失败: {e}")
+            return False
     
     def get_template_count(self) -> int:
         """
@@ -161,8 +291,11 @@ class TemplateManager:
         Returns:
             int: 模板数量
         """
-        templates = self.load_all_templates()
-        return len(templates)
+        try:
+            return len(self._cached_templates())
+        except Exception as e:
+            print(f"加载模板列表失败: {e}")
+            return 0
     
     def save_last_settings(self, settings: Dict[str, Any]) -> bool:
         """
@@ -177,8 +310,7 @@ class TemplateManager:
         try:
             settings['saved_time'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
-            with open(self.last_settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, ensure_ascii=False, indent=2)
+            atomic_write_json(self.last_settings_file, settings)
             
             return True
             
@@ -215,7 +347,7 @@ class TemplateManager:
             bool: 导出是否成功
         """
         try:
-            templates = self.load_all_templates()
+            templates = self._cached_templates()
             
             export_data = {
                 'export_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -223,8 +355,7 @@ class TemplateManager:
                 'templates': templates
             }
             
-            with open(export_file, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, ensure_ascii=False, indent=2)
+            atomic_write_json(export_file, export_data)
             
             return True
             
@@ -258,14 +389,16 @@ class TemplateManager:
             imported_templates = import_data['templates']
             
             # 合并模板
+            changed = {}
             for name, template_data in imported_templates.items():
                 if name not in current_templates or overwrite:
                     template_data['imported_time'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                     current_templates[name] = template_data
+                    changed[name] = template_data
             
             # 保存合并后的模板
-            with open(self.templates_file, 'w', encoding='utf-8') as f:
-                json.dump(current_templates, f, ensure_ascii=False, indent=2)
+            if changed:
+                self._commit(current_templates, changed)
             
             return True
             
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+缩略图加载模块
+在后台线程池中生成缩略图，优先处理列表中可见的图片；
+生成前先查询持久化缩略图缓存，命中时不解码原图
+"""
+
+import os
+from collections import OrderedDict
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QBuffer, QByteArray, QIODevice, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap, QPainter, QColor, QIcon
+
+from core.image_processor import ImageProcessor
+from core.thumbnail_store import ThumbnailStore
+
+# 缩略图最大尺寸
+THUMBNAIL_SIZE = 100
+# 最多排队等待的缩略图请求数，超出时丢弃最早的请求（通常已滚出可见区域）
+MAX_PENDING_THUMBNAILS = 512
+
+
+def create_placeholder_icon(size=THUMBNAIL_SIZE):
+    """创建缩略图生成前显示的占位图标"""
+    pixmap = QPixmap(size, size)
+    pixmap.fill(QColor(230, 230, 230))
+    painter = QPainter(pixmap)
+    painter.setPen(QColor(190, 190, 190))
+    painter.drawRect(0, 0, size - 1, size - 1)
+    painter.end()
+    return QIcon(pixmap)
+
+
+def encode_thumbnail(thumbnail):
+    """将缩略图编码为字节（有透明通道时用PNG，否则用JPEG）"""
+    buffer = QBuffer()
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    if thumbnail.hasAlphaChannel():
+        thumbnail.save(buffer, "PNG")
+    else:
+        thumbnail.save(buffer, "JPEG", 90)
+    return bytes(buffer.data())
+
+
+class _ThumbnailSignals(QObject):
+    """缩略图任务信号（QRunnable不能直接发射信号）"""
+    finished = pyqtSignal(str, QImage)
+
+
+class _ThumbnailTask(QRunnable):
+    """单个缩略图生成任务，在工作线程中只使用QImage"""
+
+    def __init__(self, file_path, max_size, signals, store=None):
+        super().__init__()
+        self.file_path = file_path
+        self.max_size = max_size
+        self.signals = signals
+        self.store = store
+
+    def run(self):
+        thumbnail = QImage()
+        try:
+            stat = os.stat(self.file_path)
+            # 先查询持久化缓存
+            if self.store is not None:
+                data = self.store.get_thumbnail(self.file_path, self.max_size, stat)
+                if data is not None:
+                    thumbnail = QImage.fromData(QByteArray(data))
+            if thumbnail.isNull():
+                # JPEG直接按缩略图尺寸缩小解码
+                image = ImageProcessor.load_image_for_size(self.file_path, self.max_size)
+                if image:
+                    thumbnail = ImageProcessor.create_thumbnail(
+                        ImageProcessor.pil_to_qimage(image), self.max_size)
+                    if self.store is not None and not thumbnail.isNull():
+                        self.store.put_thumbnail(self.file_path, self.max_size,
+                                                 encode_thumbnail(thumbnail), stat)
+        except Exception as e:
+            print(f"生成缩略图失败: {e}")
+        self.signals.finished.emit(self.file_path, thumbnail)
+
+
+class ThumbnailLoader(QObject):
+    """
+    后台缩略图加载器
+
+    同时运行的任务数不超过线程池的线程数，每次有空闲线程时
+    优先从当前可见的图片中挑选下一个任务。
+    """
+
+    # 缩略图生成完成 (文件路径, 缩略图)，失败时缩略图为空
+    thumbnail_ready = pyqtSignal(str, QPixmap)
+
+    def __init__(self, visible_paths_callback=None, max_size=THUMBNAIL_SIZE, parent=None,
+                 max_pending=MAX_PENDING_THUMBNAILS, store=None):
+        """
+        Args:
+            visible_paths_callback: 返回当前可见图片路径列表的函数
+            max_size: 缩略图最大尺寸
+            max_pending: 最多排队的请求数，None表示不限制
+            store: ThumbnailStore 持久化缓存，默认使用用户缓存目录中的共享缓存
+        """
+        super().__init__(parent)
+        self.visible_paths_callback = visible_paths_callback
+        self.max_size = max_size
+        self.max_pending = max_pending
+        self.store = store if store is not None else ThumbnailStore.shared()
+        self._thread_pool = QThreadPool.globalInstance()
+        self._pending = OrderedDict()  # 等待生成的路径（有序集合）
+        self._running = set()
+        self._signals = _ThumbnailSignals()
+        self._signals.finished.connect(self._on_task_finished)
+
+    def request(self, file_paths):
+        """请求生成缩略图"""
+        for file_path in file_paths:
+            if file_path not in self._running:
+                self._pending[file_path] = None
+                self._pending.move_to_end(file_path)
+        if self.max_pending is not None:
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+        self._schedule()
+
+    def cancel(self, file_paths):
+        """取消尚未开始的缩略图任务"""
+        for file_path in file_paths:
+            self._pending.pop(file_path, None)
+
+    def cancel_all(self):
+        """取消所有尚未开始的任务"""
+        self._pending.clear()
+
+    def is_pending(self, file_path):
+        """缩略图是否正在排队或生成"""
+        return file_path in self._pending or file_path in self._running
+
+    def pending_count(self):
+        """获取尚未完成的任务数"""
+        return len(self._pending) + len(self._running)
+
+    def _schedule(self):
+        """在有空闲线程时启动新任务，可见图片优先"""
+        max_running = max(1, self._thread_pool.maxThreadCount())
+        if not self._pending or len(self._running) >= max_running:
+            return
+
+        candidates = []
+        if self.visible_paths_callback:
+            candidates = [path for path in self.visible_paths_callback() if path in self._pending]
+
+        while self._pending and len(self._running) < max_running:
+            if candidates:
+                file_path = candidates.pop(0)
+                del self._pending[file_path]
+            else:
+                file_path, _ = self._pending.popitem(last=False)
+            self._running.add(file_path)
+            self._thread_pool.start(_ThumbnailTask(file_path, self.max_size, self._signals, self.store))
+
+    def _on_task_finished(self, file_path, thumbnail):
+        """任务完成（在GUI线程中执行）"""
+        self._running.discard(file_path)
+        pixmap = QPixmap.fromImage(thumbnail) if not thumbnail.isNull() else QPixmap()
+        self.thumbnail_ready.emit(file_path, pixmap)
+        self._schedule()
+        # 一批缩略图全部完成后提交缓存写入
+        if self.store is not None and not self._pending and not self._running:
+            self.store.flush()
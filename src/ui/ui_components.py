@@ -9,7 +9,7 @@ UI组件创建模块
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, 
     QLabel, QStatusBar, QMenuBar, QToolBar, 
-    QListWidget, QSplitter, QLineEdit, QSlider, 
+    QTableView, QHeaderView, QAbstractItemView, QStyle, QSplitter, QLineEdit, QSlider, 
     QPushButton, QGridLayout, QGroupBox, QFileDialog,
     QCheckBox, QSpinBox, QFrame, QComboBox, QColorDialog,
     QFontComboBox, QButtonGroup
@@ -17,6 +17,9 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QSize
 from PyQt6.QtGui import QAction, QFont, QColor, QFontDatabase
 
+from .image_list_model import ImageListModel
+from .preview_widget import PreviewWidget
+
 
 class UIComponents:
     """UI组件创建和管理类"""
@@ -53,9 +56,26 @@ class UIComponents:
     
     def _create_image_list(self):
         """创建图片列表组件"""
-        image_list = QListWidget()
+        # 使用单列表格视图显示列表：行高固定，插入和刷新行时不需要对全部行重新布局，
+        # 只为可见行读取模型数据，图片数量很大时滚动和导入保持流畅
+        image_list = QTableView()
         image_list.setMinimumWidth(200)
-        image_list.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
+        image_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        image_list.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        image_list.setShowGrid(False)
+        image_list.setWordWrap(False)
+        image_list.horizontalHeader().hide()
+        image_list.horizontalHeader().setStretchLastSection(True)
+        image_list.verticalHeader().hide()
+        image_list.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        icon_size = image_list.style().pixelMetric(QStyle.PixelMetric.PM_SmallIconSize)
+        image_list.verticalHeader().setDefaultSectionSize(
+            max(icon_size, image_list.fontMetrics().height()) + 6)
+        
+        # 图片列表模型，缩略图由文件管理器的加载器按需生成
+        self.main_window.image_list_model = ImageListModel(
+            self.main_window.image_files, self.main_window.file_manager.thumbnail_loader, image_list)
+        image_list.setModel(self.main_window.image_list_model)
         return image_list
     
     def _create_right_widget(self):
@@ -77,7 +97,7 @@ class UIComponents:
         """创建预览区域"""
         from PyQt6.QtWidgets import QSizePolicy
         
-        preview_area = QLabel("图片预览区域")
+        preview_area = PreviewWidget("图片预览区域")
         preview_area.setAlignment(Qt.AlignmentFlag.AlignCenter)
         preview_area.setStyleSheet("background-color: #f0f0f0; border: 1px solid #ddd;")
         
@@ -951,6 +971,11 @@ class UIComponents:
         self.main_window.status_label = QLabel("就绪")
         status_bar.addWidget(self.main_window.status_label)
         
+        # 最近一次预览/导出的各阶段耗时（悬停显示全部统计）
+        self.main_window.timing_label = QLabel("")
+        self.main_window.timing_label.setStyleSheet("color: #666;")
+        status_bar.addPermanentWidget(self.main_window.timing_label)
+        
         return status_bar
     
     def set_image_watermark_controls_enabled(self, enabled):
@@ -6,11 +6,17 @@
 负责水印的渲染和相关逻辑
 """
 
-from PyQt6.QtCore import Qt, QPoint
-from PyQt6.QtGui import QPixmap, QFont, QColor, QPainter, QPen, QPainterPath
-import os
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QPixmap, QColor
 
 from core.image_processor import ImageProcessor
+from core.watermark_renderer import WatermarkSpec, WatermarkRenderer, DEFAULT_REFERENCE_BOX
+from core.stage_metrics import StageTimer, timings
+from .preview_cache import PreviewCache
+from .render_scheduler import RenderScheduler
+
+# 停止交互多久后以完整质量重绘预览（毫秒）
+REFINE_DELAY_MS = 150
 
 
 class WatermarkHandler:
@@ -22,19 +28,132 @@ class WatermarkHandler:
         self._cached_image_path = None
         self._cached_base_pixmap = None
         self._cached_preview_size = None
-        
+        # 多张图片的预览图缓存
+        self.preview_cache = PreviewCache()
+        self.preview_cache.preview_ready.connect(self._on_preview_ready)
+        # 原图解码完成前显示的占位图 (路径, 预览尺寸)
+        self._placeholder_key = None
+        # 水印渲染器（与界面无关）
+        self.renderer = WatermarkRenderer()
+        # 按帧合并所有设置变化引起的预览更新
+        self.render_scheduler = RenderScheduler(self.update_preview)
+        # 交互（拖拽、拖动滑块等）过程中以草稿质量预览，停止交互后再以完整质量重绘
+        self._interacting = False
+        self._refine_timer = QTimer()
+        self._refine_timer.setSingleShot(True)
+        self._refine_timer.timeout.connect(self._refine_preview)
+        
+    def build_watermark_spec(self, reference_size=None, reference_box=None):
+        """
+        根据主窗口当前设置生成不可变的水印参数
+        
+        Args:
+            reference_size: 水印坐标所基于的画布尺寸 (宽, 高)，None表示按目标画布像素绘制
+            reference_box: reference_size 为None时使用的基准预览区域尺寸
+            
+        Returns:
+            WatermarkSpec: 水印参数
+        """
+        mw = self.main_window
+        font = mw.text_font
+        text_color = mw.text_color
+        stroke_color = getattr(mw, 'stroke_color', QColor(255, 255, 255))
+        image_position = getattr(mw, 'image_watermark_position', None)
+        
+        return WatermarkSpec(
+            text=mw.watermark_text or "",
+            font_family=font.family(),
+            font_size=font.pointSize() if font.pointSize() > 0 else 24,
+            font_bold=font.bold(),
+            font_italic=font.italic(),
+            text_color=(text_color.red(), text_color.green(), text_color.blue(), text_color.alpha()),
+            text_opacity=mw.watermark_opacity,
+            text_position=(mw.watermark_position.x(), mw.watermark_position.y()),
+            rotation=getattr(mw, 'watermark_rotation', 0),
+            shadow=bool(getattr(mw, 'text_shadow', False)),
+            stroke=bool(getattr(mw, 'text_stroke', False)),
+            stroke_color=(stroke_color.red(), stroke_color.green(), stroke_color.blue(), stroke_color.alpha()),
+            image_enabled=bool(getattr(mw, 'image_watermark_enabled', False)),
+            image_path=getattr(mw, 'watermark_image_path', "") or "",
+            image_width=getattr(mw, 'image_watermark_width', 100),
+            image_height=getattr(mw, 'image_watermark_height', 100),
+            image_opacity=getattr(mw, 'image_watermark_opacity', 100),
+            proportional_scale=bool(getattr(mw, 'proportional_scale_enabled', False)),
+            image_position=(image_position.x(), image_position.y()) if image_position is not None else None,
+            reference_size=reference_size,
+            reference_box=reference_box
+        )
+    
+    def get_export_reference_size(self):
+        """获取导出时水印坐标的基准尺寸（当前预览图尺寸）"""
+        current_preview_pixmap = self.main_window.preview_area.pixmap()
+        if current_preview_pixmap and not current_preview_pixmap.isNull():
+            return (current_preview_pixmap.width(), current_preview_pixmap.height())
+        return None
+    
+    def build_export_spec(self):
+        """
+        生成导出用的水印参数：以当前预览图尺寸为基准；
+        还没有预览图时与命令行相同，以默认预览区域 DEFAULT_REFERENCE_BOX 为基准
+        """
+        return self.build_watermark_spec(self.get_export_reference_size(), DEFAULT_REFERENCE_BOX)
+        
+    def get_preview_size(self):
+        """获取预览区域可用于显示图片的尺寸 (最大宽度, 最大高度)"""
+        preview_rect = self.main_window.preview_area.contentsRect()
+        max_width = max(400, preview_rect.width() - 20)  # 减去边距
+        max_height = max(300, preview_rect.height() - 20)  # 减去边距
+        return (max_width, max_height)
+    
+    def prefetch_previews(self, file_paths):
+        """在后台预解码即将浏览的图片"""
+        self.preview_cache.prefetch(file_paths)
+        
+    def select_image(self, file_path):
+        """
+        切换当前图片：原图在后台解码，解码完成前先显示放大的缩略图；
+        快速切换时之前尚未开始的解码请求会被丢弃
+        """
+        self.main_window.current_image = file_path
+        self.clear_cache()
+        self.preview_cache.begin_selection(file_path)
+        self.schedule_preview(force_resize=True)
+    
+    def _on_preview_ready(self, file_path):
+        """当前图片的预览金字塔解码完成"""
+        if file_path == self.main_window.current_image:
+            self.schedule_preview(force_resize=True)
+    
+    def schedule_preview(self, force_resize=False, interactive=False):
+        """
+        请求在下一帧更新预览（同一帧内的多次设置变化只渲染一次）
+        
+        Args:
+            force_resize: 是否重新获取底图
+            interactive: 是否由连续交互引起（拖拽、滑块、数值框、文本输入），
+                         是则以草稿质量预览，输入停止 REFINE_DELAY_MS 后再以完整质量重绘
+        """
+        if interactive:
+            self._interacting = True
+            self._refine_timer.start(REFINE_DELAY_MS)
+        self.render_scheduler.request(force_resize)
+    
+    def _refine_preview(self):
+        """输入停止后以完整质量重绘"""
+        self._interacting = False
+        self.render_scheduler.request()
+    
     def update_preview(self, force_resize=False):
-        """更新预览区域，显示带水印的图片"""
+        """立即更新预览区域，显示带水印的图片"""
+        # 立即渲染后，已排队的请求不再需要
+        self.render_scheduler.cancel()
         if not self.main_window.current_image:
             return
         
-        # 获取预览区域的可用尺寸
-        preview_rect = self.main_window.preview_area.contentsRect()
-        max_width = max(400, preview_rect.width() - 20)  # 减去边距
-        max_height = max(300, preview_rect.height() - 20)  # 减去边距
-        current_size = (max_width, max_height)
+        timer = StageTimer("preview", self.main_window.current_image)
+        current_size = self.get_preview_size()
         
-        # 检查是否需要重新加载和缩放图片
+        # 检查是否需要重新获取基础图片
         need_reload = (
             force_resize or
             self._cached_image_path != self.main_window.current_image or
@@ -43,493 +162,80 @@ class WatermarkHandler:
         )
         
         if need_reload:
-            # 加载原始图片
-            image = ImageProcessor.load_image(self.main_window.current_image)
-            if not image:
+            # 从预览图缓存获取，未缓存时在后台解码，不阻塞界面
+            scaled_pixmap = self.preview_cache.get(self.main_window.current_image, current_size, timer,
+                                                   decode=False)
+            if not scaled_pixmap:
+                if self.preview_cache.request(self.main_window.current_image, current_size):
+                    self._show_placeholder(current_size)
                 return
-                
-            pixmap = ImageProcessor.pil_to_pixmap(image)
-            
-            # 缩放图片，保持宽高比
-            scaled_pixmap = pixmap.scaled(
-                max_width, 
-                max_height,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
             
+            self._placeholder_key = None
             # 更新缓存
             self._cached_image_path = self.main_window.current_image
             self._cached_base_pixmap = scaled_pixmap
             self._cached_preview_size = current_size
+            
+            # 底图层只在切换图片或预览尺寸变化时更新
+            self.main_window.preview_area.set_base(scaled_pixmap, self.main_window.current_image)
         
-        # 使用缓存的基础图片
-        base_pixmap = self._cached_base_pixmap
-        if not base_pixmap:
+        if not self._cached_base_pixmap:
             return
         
-        # 创建一个新的QPixmap用于绘制水印
-        result_pixmap = QPixmap(base_pixmap)
-        painter = QPainter(result_pixmap)
-        
-        # 绘制文本水印
-        if self.main_window.watermark_text:
-            self._draw_text_watermark(painter)
-        
-        # 绘制图片水印
-        if hasattr(self.main_window, 'image_watermark_enabled') and self.main_window.image_watermark_enabled:
-            if hasattr(self.main_window, 'watermark_image_path') and self.main_window.watermark_image_path:
-                self._draw_image_watermark(painter, base_pixmap.size())
-        
-        painter.end()
-        
-        # 显示带水印的图片
-        self.main_window.preview_area.setPixmap(result_pixmap)
+        # 水印覆盖层：只重绘水印新旧位置所在的区域，不复制、不重新合成底图；
+        # 计时在覆盖层绘制完成后记录，包含绘制耗时
+        self.main_window.preview_area.set_overlay(self.renderer, self.build_watermark_spec(), self._interacting,
+                                                  timer)
+    
+    def _show_placeholder(self, preview_size):
+        """原图解码完成前显示放大的缩略图（没有缩略图时显示灰色底图），并以草稿质量绘制水印"""
+        file_path = self.main_window.current_image
+        preview_area = self.main_window.preview_area
+        if self._placeholder_key != (file_path, preview_size):
+            max_width, max_height = preview_size
+            thumbnail = None
+            image_list_model = getattr(self.main_window, 'image_list_model', None)
+            if image_list_model is not None:
+                thumbnail = image_list_model.cached_thumbnail(file_path)
+            if thumbnail is not None:
+                placeholder = thumbnail.scaled(max_width, max_height, Qt.AspectRatioMode.KeepAspectRatio,
+                                               Qt.TransformationMode.SmoothTransformation)
+            else:
+                info = ImageProcessor.get_image_info(file_path)
+                if not info:
+                    return
+                width, height = WatermarkSpec.fit_size(info['width'], info['height'], max_width, max_height)
+                placeholder = QPixmap(max(1, width), max(1, height))
+                placeholder.fill(QColor(230, 230, 230))
+            preview_area.set_base(placeholder, file_path)
+            self._placeholder_key = (file_path, preview_size)
+        preview_area.set_overlay(self.renderer, self.build_watermark_spec(), True)
+    
+    def show_timings(self, operation, title):
+        """在状态栏中显示最近一次操作的各阶段耗时，提示信息中显示全部统计"""
+        timing_label = getattr(self.main_window, 'timing_label', None)
+        if timing_label is None:
+            return
+        timing_label.setText(timings.summary_text(operation, title))
+        timing_label.setToolTip(timings.details_text())
     
     def clear_cache(self):
-        """清除缓存，强制重新加载图片"""
+        """清除当前预览的基础图片，下次更新时重新从预览图缓存获取"""
         self._cached_image_path = None
         self._cached_base_pixmap = None
         self._cached_preview_size = None
+        self._placeholder_key = None
     
     def apply_watermark_to_image(self, image_path, output_path=None, export_settings=None):
         """将水印应用到指定图片并保存"""
-        # 加载原始图片
-        image = ImageProcessor.load_image(image_path)
-        if not image:
-            return False
-            
-        # 转换为QPixmap
-        pixmap = ImageProcessor.pil_to_pixmap(image)
-        
-        # 根据导出设置调整图片尺寸
-        if export_settings and export_settings.get('size_mode', 0) != 0:
-            pixmap = self._resize_pixmap(pixmap, export_settings)
-        
-        # 计算水印位置的缩放比例
-        # 获取当前预览图片的尺寸
-        current_preview_pixmap = self.main_window.preview_area.pixmap()
-        if current_preview_pixmap and not current_preview_pixmap.isNull():
-            # 计算从预览尺寸到原始尺寸的缩放比例
-            scale_x = pixmap.width() / current_preview_pixmap.width()
-            scale_y = pixmap.height() / current_preview_pixmap.height()
-            
-            # 根据缩放比例调整水印位置
-            watermark_x = int(self.main_window.watermark_position.x() * scale_x)
-            watermark_y = int(self.main_window.watermark_position.y() * scale_y)
-        else:
-            # 如果无法获取预览尺寸，使用原始位置
-            watermark_x = self.main_window.watermark_position.x()
-            watermark_y = self.main_window.watermark_position.y()
-        
-        # 创建一个新的QPixmap用于绘制水印
-        result_pixmap = QPixmap(pixmap)
-        painter = QPainter(result_pixmap)
-        
-        # 绘制文本水印
-        if self.main_window.watermark_text:
-            if current_preview_pixmap and not current_preview_pixmap.isNull():
-                self._draw_text_watermark_scaled(painter, watermark_x, watermark_y, scale_x, scale_y)
-            else:
-                # 保存原始位置，临时设置新位置
-                original_pos = self.main_window.watermark_position
-                self.main_window.watermark_position = QPoint(watermark_x, watermark_y)
-                self._draw_text_watermark(painter)
-                self.main_window.watermark_position = original_pos
-        
-        # 绘制图片水印
-        if hasattr(self.main_window, 'image_watermark_enabled') and self.main_window.image_watermark_enabled:
-            if hasattr(self.main_window, 'watermark_image_path') and self.main_window.watermark_image_path:
-                # 计算图片水印的缩放比例
-                if current_preview_pixmap and not current_preview_pixmap.isNull():
-                    self._draw_image_watermark_scaled(painter, pixmap.size(), scale_x, scale_y)
-                else:
-                    self._draw_image_watermark(painter, pixmap.size())
-        
-        painter.end()
-        
-        # 保存图片
-        if output_path:
-            return self._save_pixmap_with_settings(result_pixmap, output_path, export_settings)
-        else:
-            # 如果没有指定输出路径，覆盖原文件
-            return self._save_pixmap_with_settings(result_pixmap, image_path, export_settings)
-    
-    def get_watermark_preview(self, image_path):
-        """获取带水印的图片预览（不保存）"""
-        # 加载原始图片
-        image = ImageProcessor.load_image(image_path)
-        if not image:
-            return None
-            
-        # 转换为QPixmap
-        pixmap = ImageProcessor.pil_to_pixmap(image)
-        
-        # 创建一个新的QPixmap用于绘制水印
-        result_pixmap = QPixmap(pixmap)
-        painter = QPainter(result_pixmap)
-        
-        # 绘制文本水印
-        if self.main_window.watermark_text:
-            # 设置字体和颜色
-            font = QFont("Arial", 20, QFont.Weight.Bold)
-            painter.setFont(font)
-            painter.setPen(QColor(0, 0, 0))  # 设置黑色文本
-            
-            # 设置透明度
-            painter.setOpacity(self.main_window.watermark_opacity / 100.0)
-            
-            # 绘制水印文本
-            painter.drawText(
-                self.main_window.watermark_position.x(), 
-                self.main_window.watermark_position.y(), 
-                self.main_window.watermark_text
-            )
-        
-        # 绘制图片水印
-        if hasattr(self.main_window, 'image_watermark_enabled') and self.main_window.image_watermark_enabled:
-            if hasattr(self.main_window, 'watermark_image_path') and self.main_window.watermark_image_path:
-                self._draw_image_watermark(painter, pixmap.size())
-        
-        painter.end()
-        
-        return result_pixmap
-    
-    def _draw_image_watermark(self, painter, canvas_size):
-        """绘制图片水印"""
-        if not hasattr(self.main_window, 'watermark_image_path') or not self.main_window.watermark_image_path:
-            return
-            
-        if not os.path.exists(self.main_window.watermark_image_path):
-            return
-            
-        # 加载水印图片
-        watermark_pixmap = QPixmap(self.main_window.watermark_image_path)
-        if watermark_pixmap.isNull():
-            return
-            
-        # 获取缩放设置
-        if hasattr(self.main_window, 'image_watermark_width') and hasattr(self.main_window, 'image_watermark_height'):
-            target_width = self.main_window.image_watermark_width
-            target_height = self.main_window.image_watermark_height
-            
-            # 如果启用了比例缩放，保持宽高比
-            if hasattr(self.main_window, 'proportional_scale_enabled') and self.main_window.proportional_scale_enabled:
-                # 计算缩放比例，保持宽高比
-                scale_x = target_width / watermark_pixmap.width()
-                scale_y = target_height / watermark_pixmap.height()
-                scale = min(scale_x, scale_y)
-                
-                scaled_width = int(watermark_pixmap.width() * scale)
-                scaled_height = int(watermark_pixmap.height() * scale)
-            else:
-                scaled_width = target_width
-                scaled_height = target_height
-                
-            # 缩放水印图片
-            watermark_pixmap = watermark_pixmap.scaled(
-                scaled_width, scaled_height,
-                Qt.AspectRatioMode.IgnoreAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-        
-        # 获取透明度设置
-        opacity = 1.0
-        if hasattr(self.main_window, 'image_watermark_opacity'):
-            opacity = self.main_window.image_watermark_opacity / 100.0
-            
-        # 设置透明度
-        painter.setOpacity(opacity)
-        
-        # 计算水印位置（默认右上角）
-        watermark_x = canvas_size.width() - watermark_pixmap.width() - 10
-        watermark_y = 10
-        
-        # 如果有自定义位置，使用自定义位置
-        if hasattr(self.main_window, 'image_watermark_position'):
-            watermark_x = self.main_window.image_watermark_position.x()
-            watermark_y = self.main_window.image_watermark_position.y()
-        
-        # 绘制水印图片
-        painter.drawPixmap(watermark_x, watermark_y, watermark_pixmap)
-        
-        # 恢复透明度
-        painter.setOpacity(1.0)
-
-    def _resize_pixmap(self, pixmap, export_settings):
-        """根据导出设置调整图片尺寸"""
-        size_mode = export_settings.get('size_mode', 0)
-        
-        if size_mode == 1:  # 按百分比缩放
-            percent = export_settings.get('percent_scale', 100)
-            new_width = int(pixmap.width() * percent / 100)
-            new_height = int(pixmap.height() * percent / 100)
-        elif size_mode == 2:  # 自定义尺寸
-            new_width = export_settings.get('custom_width', pixmap.width())
-            new_height = export_settings.get('custom_height', pixmap.height())
-            
-            # 如果保持宽高比，重新计算尺寸
-            if export_settings.get('keep_aspect_ratio', True):
-                original_ratio = pixmap.width() / pixmap.height()
-                target_ratio = new_width / new_height
-                
-                if target_ratio > original_ratio:
-                    # 以高度为准
-                    new_width = int(new_height * original_ratio)
-                else:
-                    # 以宽度为准
-                    new_height = int(new_width / original_ratio)
-        else:
-            # 保持原始尺寸
-            return pixmap
-        
-        # 执行缩放
-        return pixmap.scaled(
-            new_width, new_height,
-            Qt.AspectRatioMode.IgnoreAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-
-    def _save_pixmap_with_settings(self, pixmap, output_path, export_settings):
-        """根据导出设置保存图片"""
-        if not export_settings:
-            return pixmap.save(output_path)
-        
-        # 获取文件格式
-        format_name = export_settings.get('format', 'jpeg').upper()
-        
-        # 如果是JPEG格式，需要特殊处理质量设置
-        if format_name == 'JPEG':
-            try:
-                # 转换QPixmap为PIL Image以支持质量设置
-                from PIL import Image
-                from PyQt6.QtCore import QBuffer, QIODevice
-                import io
-                
-                # 将QPixmap转换为字节流
-                buffer = QBuffer()
-                buffer.open(QIODevice.OpenModeFlag.WriteOnly)
-                pixmap.save(buffer, 'PNG')  # 先保存为PNG格式
-                
-                # 转换为PIL可以读取的格式
-                byte_array = io.BytesIO(buffer.data())
-                
-                # 用PIL加载
-                pil_image = Image.open(byte_array)
-                
-                # 转换为RGB模式（JPEG不支持透明度）
-                if pil_image.mode in ('RGBA', 'LA'):
-                    # 创建白色背景
-                    background = Image.new('RGB', pil_image.size, (255, 255, 255))
-                    if pil_image.mode == 'RGBA':
-                        background.paste(pil_image, mask=pil_image.split()[-1])  # 使用alpha通道作为mask
-                    else:
-                        background.paste(pil_image)
-                    pil_image = background
-                elif pil_image.mode != 'RGB':
-                    pil_image = pil_image.convert('RGB')
-                
-                # 保存为JPEG，应用质量设置
-                quality = int(export_settings.get('quality', 95))  # 确保质量是整数
-                quality = max(1, min(100, quality))  # 限制范围在1-100之间
-                
-                pil_image.save(output_path, 'JPEG', quality=quality, optimize=True)
-                return True
-                
-            except Exception as e:
-                print(f"JPEG保存失败: {e}")
-                # 如果PIL保存失败，回退到Qt保存
-                return pixmap.save(output_path, 'JPEG')
-        else:
-            # 其他格式直接保存
-            return pixmap.save(output_path, format_name)
-    
-    def _draw_text_watermark(self, painter):
-        """绘制文本水印，支持字体、颜色、样式效果和旋转"""
-        # 设置字体
-        painter.setFont(self.main_window.text_font)
-        
-        # 设置透明度
-        painter.setOpacity(self.main_window.watermark_opacity / 100.0)
-        
-        # 获取文本位置和旋转角度
-        x = self.main_window.watermark_position.x()
-        y = self.main_window.watermark_position.y()
-        text = self.main_window.watermark_text
-        rotation = getattr(self.main_window, 'watermark_rotation', 0)
-        
-        # 保存当前画笔状态
-        painter.save()
-        
-        # 如果有旋转角度，应用旋转变换
-        if rotation != 0:
-            # 将坐标系原点移动到文本位置
-            painter.translate(x, y)
-            # 应用旋转
-            painter.rotate(rotation)
-            # 重置绘制位置为原点
-            draw_x, draw_y = 0, 0
-        else:
-            draw_x, draw_y = x, y
-        
-        # 根据样式效果绘制文本
-        # 先绘制阴影效果（如果启用）
-        if hasattr(self.main_window, 'text_shadow') and self.main_window.text_shadow:
-            shadow_color = QColor(128, 128, 128, 180)  # 半透明灰色阴影
-            painter.setPen(shadow_color)
-            painter.drawText(draw_x + 2, draw_y + 2, text)  # 阴影偏移2像素
-        
-        # 如果启用描边效果，使用QPainterPath绘制
-        if hasattr(self.main_window, 'text_stroke') and self.main_window.text_stroke:
-            # 创建文本路径
-            path = QPainterPath()
-            path.addText(draw_x, draw_y, self.main_window.text_font, text)
-            
-            # 绘制描边（轮廓）
-            stroke_color = getattr(self.main_window, 'stroke_color', QColor(255, 255, 255))
-            stroke_pen = QPen(stroke_color, 3)  # 描边宽度
-            stroke_pen.setJoinStyle(Qt.PenJoinStyle.RoundJoin)
-            painter.setPen(stroke_pen)
-            painter.setBrush(Qt.BrushStyle.NoBrush)  # 不填充
-            painter.drawPath(path)
-            
-            # 绘制文本填充
-            painter.setPen(Qt.PenStyle.NoPen)  # 不要轮廓
-            painter.setBrush(self.main_window.text_color)  # 使用文本颜色填充
-            painter.drawPath(path)
-        else:
-            # 没有描边时，直接绘制文本
-            painter.setPen(self.main_window.text_color)
-            painter.drawText(draw_x, draw_y, text)
-        
-        # 恢复画笔状态
-        painter.restore()
-    
-    def _draw_text_watermark_scaled(self, painter, x, y, scale_x, scale_y):
-        """绘制缩放后的文本水印（用于导出），支持旋转"""
-        # 创建缩放后的字体
-        scaled_font = QFont(self.main_window.text_font)
-        original_size = self.main_window.text_font.pointSize()
-        scaled_size = int(original_size * max(scale_x, scale_y))
-        scaled_font.setPointSize(scaled_size)
-        
-        # 设置字体
-        painter.setFont(scaled_font)
-        
-        # 设置透明度
-        painter.setOpacity(self.main_window.watermark_opacity / 100.0)
-        
-        # 获取文本和旋转角度
-        text = self.main_window.watermark_text
-        rotation = getattr(self.main_window, 'watermark_rotation', 0)
-        
-        # 保存当前画笔状态
-        painter.save()
-        
-        # 如果有旋转角度，应用旋转变换
-        if rotation != 0:
-            # 将坐标系原点移动到文本位置
-            painter.translate(x, y)
-            # 应用旋转
-            painter.rotate(rotation)
-            # 重置绘制位置为原点
-            draw_x, draw_y = 0, 0
-        else:
-            draw_x, draw_y = x, y
-        
-        # 根据样式效果绘制文本
-        # 先绘制阴影效果（如果启用）
-        if hasattr(self.main_window, 'text_shadow') and self.main_window.text_shadow:
-            # 绘制阴影效果（阴影偏移也需要缩放）
-            shadow_offset = int(2 * max(scale_x, scale_y))
-            shadow_color = QColor(128, 128, 128, 180)
-            painter.setPen(shadow_color)
-            painter.drawText(draw_x + shadow_offset, draw_y + shadow_offset, text)
-        
-        # 如果启用描边效果，使用QPainterPath绘制
-        if hasattr(self.main_window, 'text_stroke') and self.main_window.text_stroke:
-            # 创建文本路径（使用缩放后的字体）
-            path = QPainterPath()
-            path.addText(draw_x, draw_y, scaled_font, text)
-            
-            # 绘制描边（轮廓）- 描边宽度也需要缩放
-            stroke_width = int(3 * max(scale_x, scale_y))
-            stroke_color = getattr(self.main_window, 'stroke_color', QColor(255, 255, 255))
-            stroke_pen = QPen(stroke_color, stroke_width)
-            stroke_pen.setJoinStyle(Qt.PenJoinStyle.RoundJoin)
-            painter.setPen(stroke_pen)
-            painter.setBrush(Qt.BrushStyle.NoBrush)  # 不填充
-            painter.drawPath(path)
-            
-            # 绘制文本填充
-            painter.setPen(Qt.PenStyle.NoPen)  # 不要轮廓
-            painter.setBrush(self.main_window.text_color)  # 使用文本颜色填充
-            painter.drawPath(path)
-        else:
-            # 没有描边时，直接绘制文本
-            painter.setPen(self.main_window.text_color)
-            painter.drawText(draw_x, draw_y, text)
-        
-        # 恢复画笔状态
-        painter.restore()
-    
-    def _draw_image_watermark_scaled(self, painter, canvas_size, scale_x, scale_y):
-        """绘制缩放后的图片水印（用于导出）"""
-        if not hasattr(self.main_window, 'watermark_image_path') or not self.main_window.watermark_image_path:
-            return
-            
-        if not os.path.exists(self.main_window.watermark_image_path):
-            return
-            
-        # 加载水印图片
-        watermark_pixmap = QPixmap(self.main_window.watermark_image_path)
-        if watermark_pixmap.isNull():
-            return
-            
-        # 获取缩放设置并应用导出缩放比例
-        if hasattr(self.main_window, 'image_watermark_width') and hasattr(self.main_window, 'image_watermark_height'):
-            target_width = int(self.main_window.image_watermark_width * scale_x)
-            target_height = int(self.main_window.image_watermark_height * scale_y)
-            
-            # 如果启用了比例缩放，保持宽高比
-            if hasattr(self.main_window, 'proportional_scale_enabled') and self.main_window.proportional_scale_enabled:
-                # 计算缩放比例，保持宽高比
-                scale_ratio_x = target_width / watermark_pixmap.width()
-                scale_ratio_y = target_height / watermark_pixmap.height()
-                scale_ratio = min(scale_ratio_x, scale_ratio_y)
-                
-                scaled_width = int(watermark_pixmap.width() * scale_ratio)
-                scaled_height = int(watermark_pixmap.height() * scale_ratio)
-            else:
-                scaled_width = target_width
-                scaled_height = target_height
-                
-            # 缩放水印图片
-            watermark_pixmap = watermark_pixmap.scaled(
-                scaled_width, scaled_height,
-                Qt.AspectRatioMode.IgnoreAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-        
-        # 获取透明度设置
-        opacity = 1.0
-        if hasattr(self.main_window, 'image_watermark_opacity'):
-            opacity = self.main_window.image_watermark_opacity / 100.0
-            
-        # 设置透明度
-        painter.setOpacity(opacity)
-        
-        # 计算水印位置（默认右上角，应用缩放）
-        watermark_x = int((canvas_size.width() - watermark_pixmap.width() - 10))
-        watermark_y = int(10 * scale_y)
-        
-        # 如果有自定义位置，使用自定义位置并应用缩放
-        if hasattr(self.main_window, 'image_watermark_position'):
-            watermark_x = int(self.main_window.image_watermark_position.x() * scale_x)
-            watermark_y = int(self.main_window.image_watermark_position.y() * scale_y)
-        
-        # 绘制水印图片
-        painter.drawPixmap(watermark_x, watermark_y, watermark_pixmap)
-        
-        # 恢复透明度
-        painter.setOpacity(1.0)
\ No newline at end of file
+        # 水印位置以当前预览图为基准，导出时按比例缩放到输出尺寸
+        spec = self.build_export_spec()
+        
+        # 如果没有指定输出路径，覆盖原文件
+        timer = StageTimer("export", image_path)
+        success = self.renderer.export_file(image_path, output_path or image_path, spec, export_settings, timer)
+        timings.record(timer)
+        if not success:
+            timings.count("export_failed")
+        self.show_timings("export", "导出")
+        return success
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+JPEG局部重编码测试
+"""
+
+import os
+import sys
+import shutil
+
+import pytest
+from PIL import Image
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+pytest.importorskip("PyQt6")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from core.jpeg_region import JpegRegionWriter
+from core.watermark_renderer import WatermarkRenderer, WatermarkSpec, ensure_gui_application
+
+
+@pytest.fixture
+def no_jpegtran(monkeypatch):
+    """模拟没有安装 jpegtran 的环境"""
+    monkeypatch.setattr(shutil, "which", lambda name, *args, **kwargs: None)
+    JpegRegionWriter.find_jpegtran.cache_clear()
+    yield
+    JpegRegionWriter.find_jpegtran.cache_clear()
+
+
+def test_region_only_falls_back_to_full_export_without_jpegtran(tmp_path, no_jpegtran):
+    """找不到 jpegtran 时按常规方式完整导出"""
+    ensure_gui_application()
+    source_path = str(tmp_path / "source.jpg")
+    output_path = str(tmp_path / "output.jpg")
+    Image.new('RGB', (640, 480), (120, 160, 200)).save(source_path, quality=90)
+    spec = WatermarkSpec(text="fallback", text_position=(20, 40))
+
+    assert not JpegRegionWriter.is_available()
+    renderer = WatermarkRenderer()
+    assert not renderer.export_jpeg_region(source_path, output_path, spec, {"size_mode": 0})
+
+    assert renderer.export_file(source_path, output_path, spec,
+                                {"jpeg_region_only": True, "size_mode": 0})
+    with Image.open(output_path) as image:
+        assert image.format == "JPEG"
+        assert image.size == (640, 480)
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预览金字塔测试
+"""
+
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+pytest.importorskip("PyQt6")
+
+from ui.preview_cache import PreviewPyramid
+
+
+def test_pyramid_from_draft_decoded_jpeg_keeps_source_size(tmp_path):
+    """JPEG缩小解码后，金字塔仍记录原图尺寸，更大的预览区域需要重新解码"""
+    file_path = str(tmp_path / "large.jpg")
+    Image.new('RGB', (4000, 3000), (10, 90, 30)).save(file_path)
+
+    pyramid = PreviewPyramid.build(file_path, 1000, 750)
+
+    assert pyramid.source_size == (4000, 3000)
+    assert pyramid.levels[0].width() <= 1000
+    assert pyramid.covers(800, 600)
+    assert not pyramid.covers(2000, 1500)
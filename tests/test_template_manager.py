@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+模板管理器缓存测试
+"""
+
+import os
+import sys
+
+import pytest
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from ui.template_manager import TemplateManager
+
+
+@pytest.mark.parametrize("file_name", ["templates.json", "templates.db"])
+def test_modifying_loaded_template_does_not_change_cache(tmp_path, file_name):
+    """修改已加载模板中的嵌套值后，再次加载得到的仍是保存时的数据"""
+    TemplateManager.clear_cache()
+    manager = TemplateManager(str(tmp_path / file_name))
+    assert manager.save_template("ts", {"text_color": [0, 0, 0, 255], "watermark_position": [10, 20]})
+
+    template = manager.load_template("ts")
+    template["text_color"][0] = 255
+    template["watermark_position"].append(99)
+    all_templates = manager.load_all_templates()
+    all_templates["ts"]["text_color"][1] = 255
+
+    reloaded = manager.load_template("ts")
+    assert reloaded["text_color"] == [0, 0, 0, 255]
+    assert reloaded["watermark_position"] == [10, 20]